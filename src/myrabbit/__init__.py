@@ -1,6 +1,16 @@
 from .commands import CommandBus, CommandBusAdapter, CommandWithMessage
 from .core.consumer.listener import Listener
 from .core.consumer.pika_message import PikaMessage
+from .core.publisher.background_publisher import BackgroundPublisherFactory, OverflowPolicy
+from .core.publisher.delayed_publisher import DelayedPublisher
+from .core.publisher.exchange_cache import ExchangeCache
+from .core.publisher.flow_control import ConnectionBlockedError
+from .core.publisher.outbox_publisher import OutboxPublisherFactory
+from .core.publisher.pooled_publisher import PooledPublisherFactory
+from .core.publisher.rate_limit import RateLimit, RateLimiter, RateLimitMode
+from .core.publisher.reconnect import CircuitBreaker, RetryPolicy
 from .core.publisher.reconnecting_publisher import PublisherFactory, ReconnectingPublisherFactory
+from .core.publisher.sharded_publisher import ShardedPublisherFactory
+from .core.serializer import Compressor
 from .events import EventBus, EventBusAdapter, EventWithMessage
 from .service import Service, ServiceBuilder, run_services, run_services_threaded
@@ -1,7 +1,7 @@
 import logging
 import uuid
 from functools import wraps
-from typing import Any, Callable, Optional, Union
+from typing import Any, Awaitable, Callable, Optional, Union, cast
 
 from pika import BasicProperties
 
@@ -13,8 +13,12 @@ from myrabbit.core.consumer.callbacks import Callbacks
 from myrabbit.core.consumer.listener import Exchange, Listener, Queue
 from myrabbit.core.consumer.pika_message import PikaMessage
 from myrabbit.core.consumer.reply import Reply
+from myrabbit.core.publisher.async_publisher import AsyncPublisher
+from myrabbit.core.publisher.delayed_publisher import DelayedPublisher
+from myrabbit.core.publisher.publisher import OutgoingMessage
 from myrabbit.core.publisher.reconnecting_publisher import PublisherFactory
-from myrabbit.core.serializer import JsonSerializer, Serializer
+from myrabbit.core.serializer import Compressor, JsonSerializer, Serializer, decompress
+from myrabbit.utils.functions import is_coroutine_handler
 
 logger = logging.getLogger(__name__)
 
@@ -27,9 +31,15 @@ class CommandBus:
         default_exchange_params: Optional[dict] = None,
         default_queue_params: Optional[dict] = None,
         callbacks: Optional[Callbacks] = None,
+        async_publisher: Optional[AsyncPublisher] = None,
+        compressor: Optional[Compressor] = None,
+        delayed_publisher: Optional[DelayedPublisher] = None,
     ):
         self._publisher_factory = publisher_factory
+        self._async_publisher = async_publisher
         self._serializer: Serializer = serializer or JsonSerializer()
+        self._compressor = compressor
+        self._delayed_publisher = delayed_publisher
         self.default_exchange_params = default_exchange_params or {}
         self.default_queue_params = default_queue_params or {}
         self._callbacks = callbacks
@@ -45,7 +55,61 @@ class CommandBus:
         body: Optional[dict] = None,
         properties: Optional[BasicProperties] = None,
         reply_headers: Optional[dict] = None,
+        delay: Optional[float] = None,
     ) -> None:
+        """Send command, with ``delay`` (seconds) it is delivered later."""
+        message = self._make_message(
+            command_sender,
+            command_destination,
+            command_name,
+            body,
+            properties,
+            reply_headers,
+        )
+        if delay:
+            self.delayed_publisher.publish(*message, delay=delay)
+            return
+
+        with self._publisher_factory.publisher() as publisher:
+            publisher.publish(*message)
+
+    @property
+    def delayed_publisher(self) -> DelayedPublisher:
+        if self._delayed_publisher is None:
+            self._delayed_publisher = DelayedPublisher(self._publisher_factory)
+        return self._delayed_publisher
+
+    async def send_async(
+        self,
+        command_sender: str,
+        command_destination: str,
+        command_name: str,
+        body: Optional[dict] = None,
+        properties: Optional[BasicProperties] = None,
+        reply_headers: Optional[dict] = None,
+    ) -> None:
+        if self._async_publisher is None:
+            raise RuntimeError("CommandBus is created without async publisher")
+
+        message = self._make_message(
+            command_sender,
+            command_destination,
+            command_name,
+            body,
+            properties,
+            reply_headers,
+        )
+        await self._async_publisher.publish(*message)
+
+    def _make_message(
+        self,
+        command_sender: str,
+        command_destination: str,
+        command_name: str,
+        body: Optional[dict] = None,
+        properties: Optional[BasicProperties] = None,
+        reply_headers: Optional[dict] = None,
+    ) -> OutgoingMessage:
         properties = properties or BasicProperties()
 
         body = body or {}
@@ -64,14 +128,19 @@ class CommandBus:
         if reply_headers:
             self._set_reply_headers(properties, reply_headers)
 
-        with self._publisher_factory.publisher() as publisher:
-            publisher.publish(
-                self._exchange(command_destination),
-                self._routing_key(command_name),
-                binary_body,
-                properties,
+        exchange = self._exchange(command_destination)
+        if self._compressor is not None:
+            binary_body, properties = self._compressor.compress(
+                exchange, binary_body, properties
             )
 
+        return OutgoingMessage(
+            exchange,
+            self._routing_key(command_name),
+            binary_body,
+            properties,
+        )
+
     def _set_reply_headers(
         self, properties: BasicProperties, reply_headers: dict
     ) -> None:
@@ -99,6 +168,7 @@ class CommandBus:
         callback: Callable[[CommandWithMessage], Optional[Union[CommandReply, Any]]],
         exchange_params: Optional[dict] = None,
         queue_params: Optional[dict] = None,
+        listener_params: Optional[dict] = None,
     ) -> Listener:
         queue_params = queue_params or {}
         queue_params = {**self.default_queue_params, **queue_params}
@@ -120,41 +190,76 @@ class CommandBus:
             try:
                 callback_result: Optional[Union[CommandReply, Any]] = callback(
                     CommandWithMessage(
-                        self._serializer.deserialize(message.body), message
+                        self._deserialize(message), message
                     )
                 )
             except Exception as e:
-                logger.exception(
-                    "Exception happened during handling message %s using handler %s",
-                    message,
-                    callback,
-                )
-                return (
-                    command_outcome.exception(e)
-                    .with_headers(reply_headers)
-                    .to_reply(self._serializer)
-                )
+                return self._exception_reply(e, message, callback, reply_headers)
+
+            return self._callback_reply(callback_result, reply_headers)
 
-            if callback_result is None:
-                return None
+        @wraps(callback)
+        async def deserialize_command_and_handle_reply_async(
+            message: PikaMessage,
+        ) -> Optional[Reply]:
+            reply_headers = self._get_reply_headers(message.properties.headers)
 
-            if isinstance(callback_result, CommandReply):
-                return callback_result.with_headers(reply_headers).to_reply(
-                    self._serializer
+            try:
+                command = CommandWithMessage(self._deserialize(message), message)
+                callback_result: Optional[Union[CommandReply, Any]] = await cast(
+                    Awaitable, callback(command)
                 )
+            except Exception as e:
+                return self._exception_reply(e, message, callback, reply_headers)
 
-            return (
-                command_outcome.success(body=callback_result)
-                .with_headers(reply_headers)
-                .to_reply(self._serializer)
-            )
+            return self._callback_reply(callback_result, reply_headers)
 
         return Listener(
             exchange=Exchange(**exchange_params),
             queue=Queue(**queue_params),
             routing_key=self._routing_key(command_name),
-            handle_message=deserialize_command_and_handle_reply,
+            handle_message=(
+                deserialize_command_and_handle_reply_async
+                if is_coroutine_handler(callback)
+                else deserialize_command_and_handle_reply
+            ),
             callbacks=self._callbacks,
+            **(listener_params or {}),
+        )
+
+    def _exception_reply(
+        self,
+        e: Exception,
+        message: PikaMessage,
+        callback: Callable,
+        reply_headers: dict,
+    ) -> Reply:
+        logger.exception(
+            "Exception happened during handling message %s using handler %s",
+            message,
+            callback,
+        )
+        return (
+            command_outcome.exception(e)
+            .with_headers(reply_headers)
+            .to_reply(self._serializer)
+        )
+
+    def _callback_reply(
+        self, callback_result: Optional[Union[CommandReply, Any]], reply_headers: dict
+    ) -> Optional[Reply]:
+        if callback_result is None:
+            return None
+
+        if isinstance(callback_result, CommandReply):
+            return callback_result.with_headers(reply_headers).to_reply(
+                self._serializer
+            )
+
+        return (
+            command_outcome.success(body=callback_result)
+            .with_headers(reply_headers)
+            .to_reply(self._serializer)
         )
 
     def reply_listener(
@@ -162,9 +267,10 @@ class CommandBus:
         command_sender: str,
         command_destination: str,
         command_name: str,
-        callback: Callable[[ReplyWithMessage], None],
+        callback: Callable[[ReplyWithMessage], Any],
         exchange_params: Optional[dict] = None,
         queue_params: Optional[dict] = None,
+        listener_params: Optional[dict] = None,
     ) -> Listener:
         queue_params = queue_params or {}
         queue_params = {**self.default_queue_params, **queue_params}
@@ -180,9 +286,9 @@ class CommandBus:
         exchange_params.setdefault("name", self._exchange(command_destination))
 
         @wraps(callback)
-        def deserialize_message(message: PikaMessage) -> None:
-            reply: dict = self._serializer.deserialize(message.body)
-            callback(ReplyWithMessage(reply=reply, message=message))
+        def deserialize_message(message: PikaMessage) -> Any:
+            reply: dict = self._deserialize(message)
+            return callback(ReplyWithMessage(reply=reply, message=message))
 
         return Listener(
             exchange=Exchange(**exchange_params),
@@ -190,6 +296,12 @@ class CommandBus:
             routing_key=routing_key,
             handle_message=deserialize_message,
             callbacks=self._callbacks,
+            **(listener_params or {}),
+        )
+
+    def _deserialize(self, message: PikaMessage) -> Any:
+        return self._serializer.deserialize(
+            decompress(message.body, message.properties)
         )
 
     def _exchange(self, command_destination: str) -> str:
@@ -35,6 +35,7 @@ class CommandBusAdapter:
         command: CommandType,
         properties: Optional[BasicProperties] = None,
         reply_headers: Optional[dict] = None,
+        delay: Optional[float] = None,
     ) -> None:
         command_name, body = self.get_converter(command).name_and_body(command)
         self.command_bus.send(
@@ -44,6 +45,25 @@ class CommandBusAdapter:
             body,
             properties,
             reply_headers,
+            delay,
+        )
+
+    async def send_async(
+        self,
+        command_sender: str,
+        command_destination: str,
+        command: CommandType,
+        properties: Optional[BasicProperties] = None,
+        reply_headers: Optional[dict] = None,
+    ) -> None:
+        command_name, body = self.get_converter(command).name_and_body(command)
+        await self.command_bus.send_async(
+            command_sender,
+            command_destination,
+            command_name,
+            body,
+            properties,
+            reply_headers,
         )
 
     def listener(
@@ -53,6 +73,7 @@ class CommandBusAdapter:
         callback: Callable[[CommandWithMessage], Optional[Union[CommandReply, Any]]],
         exchange_params: Optional[dict] = None,
         queue_params: Optional[dict] = None,
+        listener_params: Optional[dict] = None,
     ) -> Listener:
         converter = self.get_converter(command_type)
 
@@ -73,6 +94,7 @@ class CommandBusAdapter:
             callback=instantiate_command,
             exchange_params=exchange_params,
             queue_params=queue_params,
+            listener_params=listener_params,
         )
 
     def reply_listener(
@@ -80,17 +102,18 @@ class CommandBusAdapter:
         command_sender: str,
         command_destination: str,
         command_type: Type[CommandType],
-        callback: Callable[[ReplyWithMessage], None],
+        callback: Callable[[ReplyWithMessage], Any],
         reply_type: Optional[Type[CommandReplyType]] = None,
         exchange_params: Optional[dict] = None,
         queue_params: Optional[dict] = None,
+        listener_params: Optional[dict] = None,
     ) -> Listener:
         @wraps(callback)
-        def instantiate_reply(reply: ReplyWithMessage) -> None:
+        def instantiate_reply(reply: ReplyWithMessage) -> Any:
             if reply_type is not None:
                 converter = self.get_converter(reply_type)
                 reply.reply = converter.instantiate(reply_type, reply.reply)
-            callback(reply)
+            return callback(reply)
 
         command_name = self.get_converter(command_type).name(command_type)
 
@@ -101,4 +124,5 @@ class CommandBusAdapter:
             callback=instantiate_reply,
             exchange_params=exchange_params,
             queue_params=queue_params,
+            listener_params=listener_params,
         )
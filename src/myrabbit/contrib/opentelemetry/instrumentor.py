@@ -53,17 +53,19 @@ class MyrabbitInstrumentor(BaseInstrumentor):
             routing_key: str,
             message: bytes,
             properties: Optional[BasicProperties] = None,
-        ) -> None:
+        ) -> typing.Any:
             original_implementation = original_publish.__get__(self, self.__class__)
 
             if context.get_value("suppress_instrumentation"):
-                original_implementation(exchange, routing_key, message, properties)
-                return None
+                return original_implementation(
+                    exchange, routing_key, message, properties
+                )
 
             # Following semantic conventions is used:
             # https://github.com/open-telemetry/opentelemetry-specification/blob/master/specification/trace/semantic_conventions/messaging.md
 
             exception = None
+            result = None
             span_name = f"{exchange}.{routing_key} send".lower()
 
             properties = properties or BasicProperties()
@@ -121,7 +123,9 @@ class MyrabbitInstrumentor(BaseInstrumentor):
                 properties.headers = headers
 
                 try:
-                    original_implementation(exchange, routing_key, message, properties)
+                    result = original_implementation(
+                        exchange, routing_key, message, properties
+                    )
                 except Exception as exc:
                     exception = exc
                     span.set_status(Status(StatusCanonicalCode.UNKNOWN))
@@ -131,6 +135,8 @@ class MyrabbitInstrumentor(BaseInstrumentor):
             if exception is not None:
                 raise exception.with_traceback(exception.__traceback__)
 
+            return result
+
         def instrumented_handle_message(
             self,
             unused_channel: Channel,
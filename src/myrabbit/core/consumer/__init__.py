@@ -1 +1,4 @@
+from .asyncio_consumer import AsyncioConsumer
 from .consumer import Consumer, ThreadedConsumer
+from .process_consumer import ProcessPoolConsumer
+from .multi_connection_consumer import MultiConnectionConsumer, ShardStrategy
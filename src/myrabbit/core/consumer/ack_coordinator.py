@@ -0,0 +1,164 @@
+import logging
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Iterable, List, Set, Tuple
+
+from pika.channel import Channel
+
+logger = logging.getLogger(__name__)
+
+
+def call_threadsafe(ioloop: Any, fn: Callable[[], None]) -> None:
+    """Run ``fn`` on the I/O loop, pika's IOLoop or an asyncio loop."""
+    schedule = getattr(ioloop, "call_soon_threadsafe", None)
+    if schedule is None:
+        schedule = ioloop.add_callback_threadsafe
+    schedule(fn)
+
+
+@dataclass
+class AckStats:
+    acked: int = 0
+    rejected: int = 0
+    # Basic.Ack and Basic.Reject frames sent.
+    frames: int = 0
+    # Callbacks scheduled on the I/O loop from other threads.
+    wakeups: int = 0
+
+
+class AckCoordinator:
+    """Coalesces acknowledgements of a consumed channel.
+
+    Deliveries are tracked in order on the I/O loop thread. Acks made on that
+    thread are sent at once, acks from other threads are buffered and sent by
+    the I/O loop when ``batch_size`` of them are pending or ``max_delay``
+    seconds after the first one. Acknowledged deliveries at the head of the
+    unacknowledged ones are sent as one ``basic_ack(multiple=True)``, the
+    rest one by one. Rejects are not delayed.
+
+    All acks and rejects of the channel must go through the coordinator.
+    """
+
+    def __init__(
+        self, channel: Channel, batch_size: int = 100, max_delay: float = 0.05
+    ):
+        self.stats = AckStats()
+        self._channel = channel
+        self._batch_size = batch_size
+        self._max_delay = max_delay
+        self._io_thread = threading.get_ident()
+        # Touched on the I/O thread only.
+        self._unacked: Deque[int] = deque()
+
+        self._lock = threading.Lock()
+        self._acked: Set[int] = set()
+        self._rejected: List[Tuple[int, bool]] = []
+        self._flush_requested = False
+        self._timer_requested = False
+
+    @property
+    def pending(self) -> int:
+        """Acks and rejects not sent yet."""
+        with self._lock:
+            return len(self._acked) + len(self._rejected)
+
+    def track(self, delivery_tag: int) -> None:
+        """Register a delivery, called by the consumer on the I/O thread."""
+        self._unacked.append(delivery_tag)
+
+    def ack(self, delivery_tag: int) -> None:
+        self.ack_many([delivery_tag])
+
+    def ack_many(self, delivery_tags: Iterable[int]) -> None:
+        with self._lock:
+            self._acked.update(delivery_tags)
+            pending = len(self._acked)
+
+        if self._in_io_thread():
+            self.flush()
+        else:
+            self._request_flush(now=pending >= self._batch_size)
+
+    def reject(self, delivery_tag: int, requeue: bool = True) -> None:
+        self.nack_many([delivery_tag], requeue)
+
+    def nack_many(self, delivery_tags: Iterable[int], requeue: bool = True) -> None:
+        with self._lock:
+            self._rejected.extend((tag, requeue) for tag in delivery_tags)
+
+        if self._in_io_thread():
+            self.flush()
+        else:
+            self._request_flush(now=True)
+
+    def flush(self) -> None:
+        """Send pending acks and rejects, must be called on the I/O thread."""
+        with self._lock:
+            acked, self._acked = self._acked, set()
+            rejected, self._rejected = self._rejected, []
+            self._flush_requested = False
+
+        if not acked and not rejected:
+            return
+        if not self._channel.is_open:
+            # Broker redelivers unacknowledged messages of a closed channel.
+            logger.info(
+                "Channel closed, dropping %d ack(s)", len(acked) + len(rejected)
+            )
+            return
+
+        for tag, requeue in rejected:
+            self._channel.basic_reject(tag, requeue=requeue)
+            self._forget(tag)
+            self.stats.rejected += 1
+            self.stats.frames += 1
+
+        last_tag = None
+        count = 0
+        while self._unacked and self._unacked[0] in acked:
+            last_tag = self._unacked.popleft()
+            acked.discard(last_tag)
+            count += 1
+        if last_tag is not None:
+            self._channel.basic_ack(last_tag, multiple=count > 1)
+            self.stats.frames += 1
+
+        for tag in sorted(acked):
+            self._channel.basic_ack(tag)
+            self._forget(tag)
+            self.stats.frames += 1
+        self.stats.acked += count + len(acked)
+
+    def _forget(self, delivery_tag: int) -> None:
+        try:
+            self._unacked.remove(delivery_tag)
+        except ValueError:
+            pass
+
+    def _request_flush(self, now: bool) -> None:
+        with self._lock:
+            if self._flush_requested:
+                return
+            if now:
+                self._flush_requested = True
+                callback = self.flush
+            elif self._timer_requested:
+                return
+            else:
+                self._timer_requested = True
+                callback = self._start_timer
+            self.stats.wakeups += 1
+
+        call_threadsafe(self._channel.connection.ioloop, callback)
+
+    def _start_timer(self) -> None:
+        self._channel.connection.ioloop.call_later(self._max_delay, self._on_timer)
+
+    def _on_timer(self) -> None:
+        with self._lock:
+            self._timer_requested = False
+        self.flush()
+
+    def _in_io_thread(self) -> bool:
+        return threading.get_ident() == self._io_thread
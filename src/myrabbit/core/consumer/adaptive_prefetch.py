@@ -0,0 +1,199 @@
+import logging
+import math
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, List
+
+from myrabbit.core.consumer.channel import ConsumedChannel
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PrefetchDecision:
+    at: float
+    queue: str
+    old: int
+    new: int
+    service_time: float
+    ack_rate: float
+    saturated: bool
+
+
+@dataclass
+class PrefetchStats:
+    queue: str
+    prefetch_count: int
+    in_flight: int
+    backlog: int
+    # Exponential moving average of handling time, seconds.
+    service_time: float
+    # Acknowledged or rejected messages per second in the last interval.
+    ack_rate: float
+    target: int
+
+
+class _ChannelState:
+    def __init__(
+        self, channel: ConsumedChannel, prefetch_count: int, workers: int
+    ) -> None:
+        self.channel = channel
+        self.prefetch_count = prefetch_count
+        self.target = prefetch_count
+        self.workers = workers
+        self.service_time = 0.0
+        self.ack_rate = 0.0
+        # Since the last tick.
+        self.handled = 0
+        self.outstanding = 0
+        self.last_tick = time.monotonic()
+        self.last_acks = 0
+
+
+class AdaptivePrefetch:
+    """Adjusts ``basic_qos`` of consumed channels to observed handler latency.
+
+    Every ``interval`` seconds the prefetch count of a channel is set to
+    the workers of the listener plus the messages they handle while acks
+    travel to the broker and new messages arrive (``refill_time`` plus the
+    ack delay of the consumer), by Little's law. The handling rate is the
+    capacity of the workers when they were saturated, the observed ack rate
+    otherwise. Counts within ``hysteresis`` of the current one are not
+    applied. Decisions are kept in ``decisions``.
+
+    Used by concurrent consumers, pass it as ``adaptive_prefetch``.
+    """
+
+    def __init__(
+        self,
+        min_prefetch: int = 1,
+        max_prefetch: int = 1000,
+        interval: float = 1.0,
+        refill_time: float = 0.05,
+        hysteresis: float = 0.2,
+        smoothing: float = 0.3,
+        max_decisions: int = 100,
+    ):
+        if not 1 <= min_prefetch <= max_prefetch:
+            raise ValueError("Prefetch bounds must satisfy 1 <= min <= max")
+
+        self.min_prefetch = min_prefetch
+        self.max_prefetch = max_prefetch
+        self.interval = interval
+        self.refill_time = refill_time
+        self.hysteresis = hysteresis
+        self.smoothing = smoothing
+        self.decisions: Deque[PrefetchDecision] = deque(maxlen=max_decisions)
+
+        self._lock = threading.Lock()
+        self._channels: Dict[int, _ChannelState] = {}
+
+    def watch(
+        self,
+        channel: ConsumedChannel,
+        prefetch_count: int,
+        workers: int,
+        ack_delay: float = 0.0,
+    ) -> None:
+        """Start tuning the channel, called on the I/O loop thread."""
+        state = _ChannelState(channel, prefetch_count, workers)
+        with self._lock:
+            self._channels[id(channel)] = state
+        self._schedule(state, ack_delay)
+
+    def record(self, channel: ConsumedChannel, service_time: float) -> None:
+        """Register a handled message, may be called from any thread."""
+        with self._lock:
+            state = self._channels.get(id(channel))
+            if state is None:
+                return
+            state.handled += 1
+            state.outstanding += channel.in_flight + len(channel.backlog)
+            if state.service_time:
+                state.service_time += self.smoothing * (
+                    service_time - state.service_time
+                )
+            else:
+                state.service_time = service_time
+
+    def stats(self) -> List[PrefetchStats]:
+        with self._lock:
+            return [
+                PrefetchStats(
+                    queue=state.channel.queue.name,
+                    prefetch_count=state.prefetch_count,
+                    in_flight=state.channel.in_flight,
+                    backlog=len(state.channel.backlog),
+                    service_time=state.service_time,
+                    ack_rate=state.ack_rate,
+                    target=state.target,
+                )
+                for state in self._channels.values()
+            ]
+
+    def _schedule(self, state: _ChannelState, ack_delay: float) -> None:
+        ioloop = state.channel.pika_channel.connection.ioloop
+        ioloop.call_later(self.interval, lambda: self._tick(state, ack_delay))
+
+    def _tick(self, state: _ChannelState, ack_delay: float) -> None:
+        channel = state.channel
+        if not channel.pika_channel.is_open or channel.cancelled:
+            with self._lock:
+                self._channels.pop(id(channel), None)
+            return
+
+        now = time.monotonic()
+        with self._lock:
+            elapsed = now - state.last_tick
+            handled, state.handled = state.handled, 0
+            outstanding, state.outstanding = state.outstanding, 0
+            state.last_tick = now
+            service_time = state.service_time
+
+            if channel.acks is not None:
+                acks = channel.acks.stats.acked + channel.acks.stats.rejected
+                state.ack_rate = (acks - state.last_acks) / elapsed
+                state.last_acks = acks
+            else:
+                state.ack_rate = handled / elapsed
+
+        if handled and service_time > 0:
+            # Workers had messages waiting for them on average.
+            saturated = outstanding / handled > state.workers
+            rate = state.workers / service_time if saturated else state.ack_rate
+            target = state.workers + math.ceil(
+                rate * (self.refill_time + ack_delay)
+            )
+            state.target = min(self.max_prefetch, max(self.min_prefetch, target))
+
+            band = self.hysteresis * state.prefetch_count
+            if abs(state.target - state.prefetch_count) > band:
+                self._apply(state, service_time, saturated, now)
+
+        self._schedule(state, ack_delay)
+
+    def _apply(
+        self, state: _ChannelState, service_time: float, saturated: bool, now: float
+    ) -> None:
+        decision = PrefetchDecision(
+            at=now,
+            queue=state.channel.queue.name,
+            old=state.prefetch_count,
+            new=state.target,
+            service_time=service_time,
+            ack_rate=state.ack_rate,
+            saturated=saturated,
+        )
+        logger.info(
+            "Prefetch of %s: %d -> %d (service time %.4f s, %.1f acks/s)",
+            decision.queue,
+            decision.old,
+            decision.new,
+            service_time,
+            decision.ack_rate,
+        )
+        state.channel.pika_channel.basic_qos(prefetch_count=state.target)
+        state.prefetch_count = state.target
+        self.decisions.append(decision)
@@ -0,0 +1,148 @@
+import asyncio
+import logging
+import time
+from functools import partial
+from typing import Any, List, Optional
+
+import pika
+from pika.adapters.asyncio_connection import AsyncioConnection
+from pika.channel import Channel
+from pika.spec import Basic
+
+from myrabbit.core.consumer.batch import MessageBatcher
+from myrabbit.core.consumer.channel import ConsumedChannel
+from myrabbit.core.consumer.consumer import Consumer
+from myrabbit.core.consumer.listener import Listener
+from myrabbit.core.consumer.pika_message import PikaMessage
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncioConsumer(Consumer):
+    """Consumer running on an asyncio event loop.
+
+    Coroutine handlers run as tasks on the loop, at most ``max_concurrency``
+    (``prefetch_count`` by default) per listener; their acknowledgements and
+    replies are sent to the channel directly. Synchronous handlers run in the
+    listener executor or the default executor of the loop.
+    """
+
+    def __init__(
+        self,
+        amqp_url: str,
+        listeners: List[Listener],
+        prefetch_count: int = 1,
+        max_concurrency: Optional[int] = None,
+        loop: Optional[asyncio.AbstractEventLoop] = None,
+        **kwargs: Any,
+    ):
+        super().__init__(amqp_url, listeners, prefetch_count, **kwargs)
+        self._max_concurrency = max_concurrency
+        self._loop = loop or asyncio.new_event_loop()
+
+    def connect(self) -> AsyncioConnection:  # type: ignore
+        logger.info("Connecting to %s", self._url)
+        return AsyncioConnection(
+            parameters=pika.URLParameters(self._url),
+            on_open_callback=self.on_connection_open,
+            on_open_error_callback=self.on_connection_open_error,
+            on_close_callback=self.on_connection_closed,
+            custom_ioloop=self._loop,
+        )
+
+    def _dispatch(
+        self,
+        unused_channel: Channel,
+        basic_deliver: Basic.Deliver,
+        properties: pika.BasicProperties,
+        body: bytes,
+        channel: ConsumedChannel,
+    ) -> None:
+        delivery = (unused_channel, basic_deliver, properties, body, channel)
+        if not self._reserve(channel, delivery):
+            return
+
+        listener = channel.listener
+        future: asyncio.Future
+        if listener.is_async:
+            message = PikaMessage(
+                unused_channel,
+                basic_deliver,
+                properties,
+                body,
+                in_ioloop=True,
+                acks=channel.acks,
+            )
+            future = self._loop.create_task(listener.handle_async(message))
+        else:
+            message = PikaMessage(
+                unused_channel, basic_deliver, properties, body, acks=channel.acks
+            )
+            future = self._loop.run_in_executor(
+                listener.executor, listener.handle, message
+            )
+        future.add_done_callback(
+            partial(
+                self._on_task_done,
+                channel=channel,
+                properties=properties,
+                started=time.monotonic(),
+            )
+        )
+
+    def _on_task_done(
+        self,
+        future: asyncio.Future,
+        channel: ConsumedChannel,
+        properties: pika.BasicProperties,
+        started: float,
+    ) -> None:
+        if not future.cancelled() and future.exception() is not None:
+            logger.error(
+                "Exception happened while handling a message. "
+                "Listener: %s, properties: %s",
+                channel.listener,
+                properties,
+                exc_info=future.exception(),
+            )
+        if self._adaptive_prefetch is not None:
+            self._adaptive_prefetch.record(channel, time.monotonic() - started)
+        if self._release(channel):
+            self._drain(channel)
+
+    def _flush_batcher(self, channel: ConsumedChannel, batcher: MessageBatcher) -> None:
+        # Like other synchronous handlers, off the event loop.
+        self._loop.run_in_executor(channel.listener.executor, batcher.flush)
+
+    def _max_concurrency_for(self, listener: Listener) -> int:
+        if listener.max_concurrency:
+            return listener.max_concurrency
+        return self._max_concurrency or self._prefetch_count_for(listener)
+
+    def run(self) -> None:
+        self._connection = self.connect()
+        self._loop.run_forever()
+
+    def stop(self) -> None:
+        if self._loop.is_running() and not self._in_loop_thread():
+            self._loop.call_soon_threadsafe(self.stop)
+            return
+
+        if self._connection is None or self._closing:
+            return
+
+        self._closing = True
+        logger.info("Stopping")
+        if self._consuming:
+            self.stop_consuming()
+            if not self._loop.is_running():
+                self._loop.run_forever()
+        else:
+            self._loop.stop()
+        logger.info("Stopped")
+
+    def _in_loop_thread(self) -> bool:
+        try:
+            return asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
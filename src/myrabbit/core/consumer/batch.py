@@ -0,0 +1,147 @@
+import logging
+import threading
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional
+
+from pika.channel import Channel
+
+from myrabbit.core.consumer.pika_message import PikaMessage
+
+logger = logging.getLogger(__name__)
+
+
+class MessageBatcher:
+    """Message handler collecting messages into batches for ``handle_batch``.
+
+    A batch is handled when it has ``max_size`` messages or ``max_wait``
+    seconds after its first message, in the thread of the last message or in
+    a timer thread. Messages of a handled batch are acknowledged together.
+    If ``handle_batch`` raises they are all rejected: requeued, or with
+    ``requeue=False`` dead-lettered by the broker if the queue has a
+    dead letter exchange.
+
+    Consumers flush the batcher when a consumer is cancelled, where they run
+    other handlers, and wait until the batch is handled before closing the
+    channel. Messages of a channel
+    closed in the meantime are dropped unhandled, the broker redelivers them.
+
+    Should be used with the ``ManualHandle`` strategy.
+    """
+
+    def __init__(
+        self,
+        handle_batch: Callable[[List[PikaMessage]], Any],
+        max_size: int = 100,
+        max_wait: float = 1.0,
+        requeue: bool = True,
+        auto_ack: bool = False,
+    ):
+        if max_size < 1:
+            raise ValueError("Batch max_size must be positive")
+
+        self.handle_batch = handle_batch
+        self.max_size = max_size
+        self.max_wait = max_wait
+        self.requeue = requeue
+        self.auto_ack = auto_ack
+
+        self._lock = threading.Lock()
+        self._messages: List[PikaMessage] = []
+        self._timer: Optional[threading.Timer] = None
+        # Messages buffered or being handled, by id of their channel.
+        self._pending: Counter = Counter()
+
+    def __call__(self, message: PikaMessage) -> None:
+        with self._lock:
+            self._messages.append(message)
+            self._pending[id(message.channel)] += 1
+            if len(self._messages) < self.max_size:
+                if self._timer is None:
+                    self._timer = threading.Timer(self.max_wait, self.flush)
+                    self._timer.daemon = True
+                    self._timer.start()
+                return
+            batch = self._take()
+
+        self._handle(batch)
+
+    def flush(self) -> None:
+        """Handle collected messages now."""
+        with self._lock:
+            batch = self._take()
+        if batch:
+            self._handle(batch)
+
+    def pending(self, channel: Channel) -> int:
+        """Messages of the channel which are buffered or being handled."""
+        with self._lock:
+            return self._pending[id(channel)]
+
+    def discard(self, channel: Channel) -> int:
+        """Drop buffered messages of a closed channel without handling them."""
+        with self._lock:
+            dropped = [m for m in self._messages if m.channel is channel]
+            if not dropped:
+                return 0
+            self._messages = [m for m in self._messages if m.channel is not channel]
+            if not self._messages:
+                self._take()
+            self._forget(dropped)
+
+        logger.info("Dropped %d buffered message(s) of closed channel", len(dropped))
+        return len(dropped)
+
+    def _take(self) -> List[PikaMessage]:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._messages = self._messages, []
+        return batch
+
+    def _handle(self, batch: List[PikaMessage]) -> None:
+        logger.info("Handling batch of %d message(s)", len(batch))
+        try:
+            self.handle_batch(batch)
+        except Exception:
+            logger.exception(
+                "Exception happened during handling batch of %d message(s)",
+                len(batch),
+            )
+            self._settle(batch, success=False)
+        else:
+            self._settle(batch, success=True)
+        finally:
+            with self._lock:
+                self._forget(batch)
+
+    def _forget(self, messages: List[PikaMessage]) -> None:
+        for message in messages:
+            key = id(message.channel)
+            self._pending[key] -= 1
+            if self._pending[key] <= 0:
+                del self._pending[key]
+
+    def _settle(self, batch: List[PikaMessage], success: bool) -> None:
+        if self.auto_ack:
+            return
+
+        # Messages received before a reconnect belong to another channel.
+        by_channel: Dict[int, List[PikaMessage]] = {}
+        for message in batch:
+            by_channel.setdefault(id(message.channel), []).append(message)
+
+        for messages in by_channel.values():
+            acks = messages[0].acks
+            if acks is None:
+                for message in messages:
+                    if success:
+                        message.acknowledge()
+                    else:
+                        message.reject(requeue=self.requeue)
+                continue
+
+            tags = [message.basic_deliver.delivery_tag for message in messages]
+            if success:
+                acks.ack_many(tags)
+            else:
+                acks.nack_many(tags, requeue=self.requeue)
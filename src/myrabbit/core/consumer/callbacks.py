@@ -1,5 +1,6 @@
+import inspect
 from collections import defaultdict
-from contextlib import ExitStack, contextmanager
+from contextlib import AsyncExitStack, ExitStack, asynccontextmanager, contextmanager
 from typing import Callable, ContextManager, DefaultDict, List, Optional, Union
 
 from myrabbit.core.consumer.pika_message import PikaMessage
@@ -15,6 +16,15 @@ class Callbacks:
     def add_callback(self, name: str, callback: Union[Callback, Middleware]) -> None:
         self._callbacks[name].append(callback)
 
+    @property
+    def is_async(self) -> bool:
+        """Whether any callback is a coroutine or async generator function."""
+        return any(
+            inspect.iscoroutinefunction(cb) or inspect.isasyncgenfunction(cb)
+            for callbacks in self._callbacks.values()
+            for cb in callbacks
+        )
+
     def before_request(self, message: PikaMessage) -> None:
         for cb in self._callbacks.get("before_request", []):
             cb(self, message)
@@ -31,6 +41,31 @@ class Callbacks:
 
             return stack.pop_all()
 
+    async def before_request_async(self, message: PikaMessage) -> None:
+        for cb in self._callbacks.get("before_request", []):
+            result = cb(self, message)
+            if inspect.isawaitable(result):
+                await result
+
+    async def after_request_async(self, message: PikaMessage) -> None:
+        for cb in self._callbacks.get("after_request", []):
+            result = cb(self, message)
+            if inspect.isawaitable(result):
+                await result
+
+    async def run_middleware_async(self, message: PikaMessage) -> AsyncExitStack:
+        """Enter middleware, async generator functions are supported too."""
+        async with AsyncExitStack() as stack:
+            for middleware in self._callbacks.get("middleware", []):
+                if inspect.isasyncgenfunction(middleware):
+                    await stack.enter_async_context(
+                        asynccontextmanager(middleware)(self, message)
+                    )
+                else:
+                    stack.enter_context(contextmanager(middleware)(self, message))
+
+            return stack.pop_all()
+
     def __eq__(self, other):
         if not isinstance(other, Callbacks):
             return False
@@ -1,7 +1,11 @@
-from dataclasses import dataclass
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Optional, Set, Tuple
 
 from pika.channel import Channel
 
+from myrabbit.core.consumer.ack_coordinator import AckCoordinator
 from myrabbit.core.consumer.listener import Exchange, Listener, Queue
 
 
@@ -10,6 +14,14 @@ class ConsumedChannel:
     listener: Listener
     pika_channel: Channel
     consumer_tag: str = ""
+    acks: Optional[AckCoordinator] = None
+    # Used by consumers handling messages concurrently.
+    in_flight: int = 0
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    backlog: Deque[Tuple[Any, ...]] = field(default_factory=deque)
+    cancelled: bool = False
+    # Topology setup steps not confirmed yet.
+    pending_setup: Set[str] = field(default_factory=set)
 
     @property
     def exchange(self) -> Exchange:
@@ -1,23 +1,37 @@
 import functools
 import logging
+import time
+from concurrent.futures import Executor
 from concurrent.futures.thread import ThreadPoolExecutor
+from dataclasses import dataclass
 from functools import partial
-from typing import Any, Callable, Dict, List, Optional
+from typing import Any, Dict, Hashable, List, Optional, Set, Tuple
 
 import pika
 from pika import SelectConnection
 from pika.adapters.asyncio_connection import AsyncioConnection
 from pika.channel import Channel
 from pika.connection import Connection
-from pika.spec import Basic, Exchange, Queue
+from pika.spec import NOT_FOUND, Basic, Exchange, Queue
 
+from myrabbit.core.consumer.ack_coordinator import AckCoordinator, call_threadsafe
+from myrabbit.core.consumer.adaptive_prefetch import AdaptivePrefetch
+from myrabbit.core.consumer.batch import MessageBatcher
 from myrabbit.core.consumer.channel import ConsumedChannel
 from myrabbit.core.consumer.listener import Listener
+from myrabbit.core.consumer.partition import PartitionedExecutor
 from myrabbit.core.consumer.pika_message import PikaMessage
+from myrabbit.core.consumer.topology import TopologyCache, exchange_key
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass
+class ConsumerStats:
+    messages: int = 0
+    bytes: int = 0
+
+
 class Consumer(object):
     """This is an example consumer that will handle unexpected interactions
     with RabbitMQ such as channel and connection closures.
@@ -29,8 +43,19 @@ class Consumer(object):
     commands that were issued and that should surface in the output as well.
     """
 
+    # Acks from handler threads are sent in batches of up to this size
+    # (half of the channel prefetch at most) or after this many seconds.
+    ack_batch_size = 100
+    ack_max_delay = 0.05
+
     def __init__(
-        self, amqp_url: str, listeners: List[Listener], prefetch_count: int = 1
+        self,
+        amqp_url: str,
+        listeners: List[Listener],
+        prefetch_count: int = 1,
+        topology_cache: Optional[TopologyCache] = None,
+        passive_topology: bool = False,
+        adaptive_prefetch: Optional[AdaptivePrefetch] = None,
     ):
         """Create a new instance of the consumer class, passing in the AMQP
         URL used to connect to RabbitMQ.
@@ -49,6 +74,21 @@ class Consumer(object):
         # In production, experiment with higher prefetch values
         # for higher consumer throughput
         self._prefetch_count = prefetch_count
+        self.stats = ConsumerStats()
+
+        # Topology is only verified in passive mode, declaring fails for
+        # missing exchanges and queues.
+        self._passive_topology = passive_topology
+        # Tunes prefetch of concurrent consumers, see AdaptivePrefetch.
+        self._adaptive_prefetch = adaptive_prefetch
+        # Skips declaring cached exchanges and queues, e.g. after reconnects.
+        self._topology_cache = topology_cache
+        # Exchanges declared on this connection and channels waiting for the
+        # declaration, the first one declares it.
+        self._declared_exchanges: Set[Tuple[Hashable, ...]] = set()
+        self._declaring_exchanges: Dict[
+            Tuple[Hashable, ...], List[ConsumedChannel]
+        ] = {}
 
     def connect(self) -> SelectConnection:
         """This method connects to RabbitMQ, returning the connection handle.
@@ -141,10 +181,19 @@ class Consumer(object):
         """
         logger.info("Channel opened")
         consumed_channel = ConsumedChannel(listener=listener, pika_channel=channel)
+        if not listener.auto_ack:
+            consumed_channel.acks = AckCoordinator(
+                channel,
+                batch_size=max(
+                    1,
+                    min(self.ack_batch_size, self._prefetch_count_for(listener) // 2),
+                ),
+                max_delay=self.ack_max_delay,
+            )
         self.remember_channel(consumed_channel)
 
         self.add_on_channel_close_callback(consumed_channel)
-        self.setup_exchange(consumed_channel)
+        self.setup_topology(consumed_channel)
 
     def remember_channel(self, channel: ConsumedChannel) -> None:
         self._channels[int(channel.pika_channel)] = channel
@@ -171,24 +220,79 @@ class Consumer(object):
         """
         logger.warning("Channel %i was closed: %s", channel, reason)
         self.forget_channel(consumed_channel)
+        batcher = self._batcher(consumed_channel)
+        if batcher is not None:
+            batcher.discard(channel)
+        self._hand_over_exchange(consumed_channel)
+
+        if self._forget_missing_topology(reason, consumed_channel.listener):
+            # Cached topology was deleted, declare it again.
+            logger.info("Redeclaring topology of %s", consumed_channel.listener)
+            self.open_channel(consumed_channel.listener)
+            return
+
         self.maybe_close_connection()
 
+    def _hand_over_exchange(self, channel: ConsumedChannel) -> None:
+        # Channels waiting for an exchange declared by a closed channel.
+        key = exchange_key(channel.exchange)
+        waiting = self._declaring_exchanges.get(key)
+        if not waiting or waiting[0] is not channel:
+            return
+        del self._declaring_exchanges[key]
+        for other in waiting[1:]:
+            if other.pika_channel.is_open:
+                self.setup_exchange(other)
+
+    def _forget_missing_topology(self, reason: Exception, listener: Listener) -> bool:
+        cache = self._usable_cache()
+        if cache is None or self._closing:
+            return False
+        if getattr(reason, "reply_code", None) != NOT_FOUND:
+            return False
+        return cache.forget(self._url, listener)
+
+    def setup_topology(self, channel: ConsumedChannel) -> None:
+        """Declare the exchange and the queue and set QoS of the channel.
+
+        The commands are issued at once, pika sends each after the previous
+        one is confirmed, and the queue is bound when all are done. Exchanges
+        are declared once per connection and topology from the cache is not
+        declared again.
+        """
+        channel.pending_setup = {"exchange", "queue", "qos"}
+        self.setup_exchange(channel)
+        self.setup_queue(channel)
+        self.set_qos(channel)
+
     def setup_exchange(self, consumed_channel: ConsumedChannel) -> None:
         """
         Setup the exchange on RabbitMQ by invoking the Exchange.Declare RPC
         command. When it is complete, the on_exchange_declareok method will
         be invoked by pika.
         """
-        logger.info("Declaring exchange: %s", consumed_channel.exchange)
         exchange = consumed_channel.exchange
+        key = exchange_key(exchange)
+        cache = self._usable_cache()
 
-        if exchange.name == "":
-            self.setup_queue(consumed_channel)
+        declared = key in self._declared_exchanges or (
+            cache is not None and cache.has_exchange(self._url, exchange)
+        )
+        if exchange.name == "" or declared:
+            self.on_setup_done(consumed_channel, "exchange")
             return
 
+        waiting = self._declaring_exchanges.get(key)
+        if waiting is not None:
+            waiting.append(consumed_channel)
+            return
+
+        logger.info("Declaring exchange: %s", exchange)
+        self._declaring_exchanges[key] = [consumed_channel]
         consumed_channel.pika_channel.exchange_declare(
             exchange=exchange.name,
             exchange_type=exchange.type,
+            passive=self._passive_topology,
             callback=functools.partial(
                 self.on_exchange_declareok, channel=consumed_channel
             ),
@@ -204,7 +308,14 @@ class Consumer(object):
         Exchange.Declare RPC command.
         """
         logger.info("Exchange declared: %s", channel.exchange)
-        self.setup_queue(channel)
+        key = exchange_key(channel.exchange)
+        self._declared_exchanges.add(key)
+        cache = self._usable_cache()
+        if cache is not None:
+            cache.add_exchange(self._url, channel.exchange)
+
+        for waiting in self._declaring_exchanges.pop(key, [channel]):
+            self.on_setup_done(waiting, "exchange")
 
     def setup_queue(self, channel: ConsumedChannel) -> None:
         """
@@ -212,11 +323,17 @@ class Consumer(object):
         command. When it is complete, the on_queue_declareok method will
         be invoked by pika.
         """
-        logger.info("Declaring queue %s", channel.queue)
-        cb = functools.partial(self.on_queue_declareok, channel=channel)
         queue = channel.queue
+        cache = self._usable_cache()
+        if cache is not None and cache.has_queue(self._url, queue):
+            self.on_setup_done(channel, "queue")
+            return
+
+        logger.info("Declaring queue %s", queue)
+        cb = functools.partial(self.on_queue_declareok, channel=channel)
         channel.pika_channel.queue_declare(
             queue=queue.name,
+            passive=self._passive_topology,
             durable=queue.durable,
             exclusive=queue.exclusive,
             auto_delete=queue.auto_delete,
@@ -226,15 +343,27 @@ class Consumer(object):
     def on_queue_declareok(
         self, _unused_frame: Queue.DeclareOk, channel: ConsumedChannel
     ) -> None:
-        """
-        Method invoked by pika when the Queue.Declare RPC call made in
-        setup_queue has completed. In this method we will bind the queue
-        and exchange together with the routing key by issuing the Queue.Bind
-        RPC command. When this command is complete, the on_bindok method will
-        be invoked by pika.
-        """
-        if channel.exchange.name == "":
-            self.set_qos(channel)
+        logger.info("Queue declared: %s", channel.queue)
+        cache = self._usable_cache()
+        if cache is not None:
+            cache.add_queue(self._url, channel.queue)
+        self.on_setup_done(channel, "queue")
+
+    def on_setup_done(self, channel: ConsumedChannel, step: str) -> None:
+        channel.pending_setup.discard(step)
+        if not channel.pending_setup and channel.pika_channel.is_open:
+            self.bind_queue(channel)
+
+    def bind_queue(self, channel: ConsumedChannel) -> None:
+        """
+        Bind the queue and exchange together with the routing key by issuing
+        the Queue.Bind RPC command. When this command is complete, the
+        on_bindok method will be invoked by pika. Bindings can not be
+        verified, in passive mode consuming starts right away. Otherwise they
+        are declared on every connection, even with a topology cache.
+        """
+        if channel.exchange.name == "" or self._passive_topology:
+            self.start_consuming(channel)
             return
 
         logger.info(
@@ -254,10 +383,10 @@ class Consumer(object):
     def on_bindok(self, _unused_frame: Queue.BindOk, channel: ConsumedChannel) -> None:
         """
         Invoked by pika when the Queue.Bind method has completed. At this
-        point we will set the prefetch count for the channel.
+        point we will start consuming.
         """
         logger.info("Queue bound: %s", channel.queue)
-        self.set_qos(channel)
+        self.start_consuming(channel)
 
     def set_qos(self, channel: ConsumedChannel) -> None:
         """
@@ -267,7 +396,7 @@ class Consumer(object):
         with different prefetch values to achieve desired performance.
         """
         channel.pika_channel.basic_qos(
-            prefetch_count=self._prefetch_count,
+            prefetch_count=self._prefetch_count_for(channel.listener),
             callback=partial(self.on_basic_qos_ok, channel=channel),
         )
 
@@ -275,13 +404,22 @@ class Consumer(object):
         self, _unused_frame: Basic.QosOk, channel: ConsumedChannel
     ) -> None:
         """
-        Invoked by pika when the Basic.QoS method has completed. At this
-        point we will start consuming messages by calling start_consuming
-        which will invoke the needed RPC commands to start the process.
+        Invoked by pika when the Basic.QoS method has completed.
         :param pika.frame.Method _unused_frame: The Basic.QosOk response frame
         """
-        logger.info("QOS set to: %d", self._prefetch_count)
-        self.start_consuming(channel)
+        logger.info("QOS set to: %d", self._prefetch_count_for(channel.listener))
+        self.on_setup_done(channel, "qos")
+
+    def _usable_cache(self) -> Optional[TopologyCache]:
+        # Passive mode verifies the topology on every connection.
+        return None if self._passive_topology else self._topology_cache
+
+    def _prefetch_count_for(self, listener: Listener) -> int:
+        return listener.prefetch_count or self._prefetch_count
+
+    def _max_concurrency_for(self, listener: Listener) -> int:
+        """Messages of the listener handled at once by concurrent consumers."""
+        return listener.max_concurrency or self._prefetch_count_for(listener)
 
     def start_consuming(self, channel: ConsumedChannel) -> None:
         """
@@ -306,6 +444,14 @@ class Consumer(object):
         self.was_consuming = True
         self._consuming = True
 
+        if self._adaptive_prefetch is not None:
+            self._adaptive_prefetch.watch(
+                channel,
+                self._prefetch_count_for(channel.listener),
+                self._max_concurrency_for(channel.listener),
+                ack_delay=self.ack_max_delay if channel.acks is not None else 0.0,
+            )
+
     def add_on_cancel_callback(self, channel: ConsumedChannel) -> None:
         """Add a callback that will be invoked if RabbitMQ cancels the consumer
         for some reason. If RabbitMQ does cancel the consumer,
@@ -351,6 +497,20 @@ class Consumer(object):
             channel.consumer_tag,
             properties.correlation_id,
         )
+        self.stats.messages += 1
+        self.stats.bytes += len(body)
+        if channel.acks is not None:
+            channel.acks.track(basic_deliver.delivery_tag)
+        self._dispatch(unused_channel, basic_deliver, properties, body, channel)
+
+    def _dispatch(
+        self,
+        unused_channel: Channel,
+        basic_deliver: Basic.Deliver,
+        properties: pika.BasicProperties,
+        body: bytes,
+        channel: ConsumedChannel,
+    ) -> None:
         self._handle_message(unused_channel, basic_deliver, properties, body, channel)
 
     def _handle_message(
@@ -362,7 +522,9 @@ class Consumer(object):
         channel: ConsumedChannel,
     ) -> None:
         channel.listener.handle(
-            PikaMessage(unused_channel, basic_deliver, properties, body),
+            PikaMessage(
+                unused_channel, basic_deliver, properties, body, acks=channel.acks
+            ),
         )
 
     def stop_consuming(self) -> None:
@@ -383,6 +545,18 @@ class Consumer(object):
         This will invoke the on_channel_closed method once the channel has been
         closed, which will in-turn close the connection.
         """
+        # Let running handlers acknowledge their messages before closing.
+        with channel.lock:
+            channel.cancelled = True
+            waiting = channel.in_flight + len(channel.backlog)
+        if waiting:
+            logger.info(
+                "Waiting for %d message(s) of consumer %s",
+                waiting,
+                channel.consumer_tag,
+            )
+            return
+
         if not self._channels:
             self._consuming = False
 
@@ -390,14 +564,96 @@ class Consumer(object):
             "RabbitMQ acknowledged the cancellation of the consumer: %s",
             channel.consumer_tag,
         )
+        self._close_when_handled(channel)
+
+    def _reserve(self, channel: ConsumedChannel, delivery: Tuple[Any, ...]) -> bool:
+        """
+        Take a slot for concurrent handling of the delivery, or put it to
+        the channel backlog when all slots are taken. Deliveries are
+        dispatched in order, the backlog goes first.
+        """
+        with channel.lock:
+            # Dispatch rebuilds the delivery tuple, Basic.Deliver is the same.
+            from_backlog = (
+                bool(channel.backlog) and channel.backlog[0][1] is delivery[1]
+            )
+            if channel.in_flight >= self._max_concurrency_for(channel.listener) or (
+                channel.backlog and not from_backlog
+            ):
+                if not from_backlog:
+                    channel.backlog.append(delivery)
+                return False
+            if from_backlog:
+                channel.backlog.popleft()
+            channel.in_flight += 1
+            return True
+
+    def _release(self, channel: ConsumedChannel) -> bool:
+        """
+        Free the slot of a handled message, may be called from any thread.
+        Returns whether the I/O loop has to drain the channel.
+        """
+        with channel.lock:
+            channel.in_flight -= 1
+            return bool(channel.backlog) or (
+                channel.cancelled and not channel.in_flight
+            )
+
+    def _drain(self, channel: ConsumedChannel) -> None:
+        """
+        Invoked on the I/O loop to dispatch backlog deliveries and to close
+        a cancelled channel once its messages are handled.
+        """
+        limit = self._max_concurrency_for(channel.listener)
+        while True:
+            with channel.lock:
+                if not channel.backlog or channel.in_flight >= limit:
+                    break
+                # Taken from the backlog by _reserve.
+                delivery = channel.backlog[0]
+            self._dispatch(*delivery)
+
+        with channel.lock:
+            done = channel.cancelled and not channel.in_flight and not channel.backlog
+        if done:
+            self._close_when_handled(channel)
+
+    def _close_when_handled(
+        self, channel: ConsumedChannel, flushed: bool = False
+    ) -> None:
+        """
+        Close a cancelled channel after the messages buffered by its batcher
+        are handled, checking again later while a batch is being handled.
+        """
+        if not channel.pika_channel.is_open:
+            return
+        batcher = self._batcher(channel)
+        if batcher is not None:
+            if not flushed:
+                self._flush_batcher(channel, batcher)
+            if batcher.pending(channel.pika_channel):
+                channel.pika_channel.connection.ioloop.call_later(
+                    0.1, partial(self._close_when_handled, channel, True)
+                )
+                return
         self.close_channel(channel)
 
+    def _batcher(self, channel: ConsumedChannel) -> Optional[MessageBatcher]:
+        handler = channel.listener.handle_message
+        return handler if isinstance(handler, MessageBatcher) else None
+
+    def _flush_batcher(self, channel: ConsumedChannel, batcher: MessageBatcher) -> None:
+        # Handlers of this consumer run on the I/O loop anyway.
+        batcher.flush()
+
     def close_channel(self, channel: ConsumedChannel) -> None:
         """
         Call to close the channel with RabbitMQ cleanly by issuing the
         Channel.Close RPC command.
         """
         logger.info("Closing the channel")
+        if channel.acks is not None:
+            channel.acks.flush()
         channel.pika_channel.close()
 
     def run(self) -> None:
@@ -408,6 +664,18 @@ class Consumer(object):
         assert self._connection
         self._connection.ioloop.start()
 
+    def interrupt(self) -> bool:
+        """Stop the I/O loop from any thread, making ``run`` return.
+
+        ``stop`` should be called afterwards in the thread of ``run``.
+        Returns False if the consumer is not connecting yet.
+        """
+        if self._connection is None:
+            return False
+        ioloop = self._connection.ioloop
+        call_threadsafe(ioloop, ioloop.stop)
+        return True
+
     def stop(self) -> None:
         """Cleanly shutdown the connection to RabbitMQ by stopping the consumer
         with RabbitMQ. When RabbitMQ confirms the cancellation, on_cancelok
@@ -434,13 +702,42 @@ class Consumer(object):
 
 
 class ThreadedConsumer(Consumer):
+    """Consumer running message handlers on a thread pool.
+
+    A channel has at most ``max_concurrency`` (``prefetch_count`` by default)
+    messages handled at once, deliveries above that wait in the channel
+    backlog. Listeners may have a dedicated executor. Acknowledgements and
+    replies are sent by the I/O loop, so heartbeats keep going while
+    handlers run.
+
+    Messages of a listener with ``partition_key`` are handled on serial
+    lanes by key, so messages with the same key keep their order. The key is
+    computed on the I/O loop thread and should be cheap.
+    """
+
     def __init__(  # type: ignore
         self, *args, executor: Optional[ThreadPoolExecutor] = None, **kwargs
     ) -> None:
         super().__init__(*args, **kwargs)
-        self._executor = executor or ThreadPoolExecutor()
+        self._executor = executor or ThreadPoolExecutor(
+            max_workers=max(
+                1,
+                sum(
+                    self._max_concurrency_for(listener)
+                    for listener in self._listeners
+                    if listener.executor is None and listener.partition_key is None
+                ),
+            )
+        )
+        self._lanes: Dict[int, PartitionedExecutor] = {
+            id(listener): PartitionedExecutor(
+                listener.partitions or self._max_concurrency_for(listener)
+            )
+            for listener in self._listeners
+            if listener.partition_key is not None
+        }
 
-    def _handle_message(
+    def _dispatch(
         self,
         unused_channel: Channel,
         basic_deliver: Basic.Deliver,
@@ -448,23 +745,74 @@ class ThreadedConsumer(Consumer):
         body: bytes,
         channel: ConsumedChannel,
     ) -> None:
-        def log_exceptions(fn: Callable, *args: Any, **kwargs: Any) -> None:
-            try:
-                fn(*args, **kwargs)
-            except Exception:
-                logger.exception(
-                    "Exception happened while handling a message. Listener: %s, properties: %s",
-                    channel.listener,
-                    properties,
-                )
+        delivery = (unused_channel, basic_deliver, properties, body, channel)
+        if not self._reserve(channel, delivery):
+            return
 
-        self._executor.submit(
-            log_exceptions(
-                channel.listener.handle,
-                PikaMessage(unused_channel, basic_deliver, properties, body),
+        lanes = self._lanes.get(id(channel.listener))
+        if lanes is not None:
+            message = PikaMessage(unused_channel, basic_deliver, properties, body)
+            lanes.submit(
+                self._partition_key(channel, message), self._run_handler, *delivery
             )
-        )
+        else:
+            self._executor_for(channel.listener).submit(self._run_handler, *delivery)
+
+    def _partition_key(
+        self, channel: ConsumedChannel, message: PikaMessage
+    ) -> Hashable:
+        partition_key = channel.listener.partition_key
+        assert partition_key
+        try:
+            return partition_key(message)
+        except Exception:
+            # Messages without a key are still handled, on the lane of None.
+            logger.exception(
+                "Partition key failed, listener: %s, properties: %s",
+                channel.listener,
+                message.properties,
+            )
+            return None
+
+    def _executor_for(self, listener: Listener) -> Executor:
+        return listener.executor or self._executor
+
+    def _flush_batcher(self, channel: ConsumedChannel, batcher: MessageBatcher) -> None:
+        # The last batch is handled off the I/O loop like the others, its acks
+        # are sent by the I/O loop.
+        self._executor_for(channel.listener).submit(batcher.flush)
+
+    def _run_handler(
+        self,
+        unused_channel: Channel,
+        basic_deliver: Basic.Deliver,
+        properties: pika.BasicProperties,
+        body: bytes,
+        channel: ConsumedChannel,
+    ) -> None:
+        started = time.monotonic()
+        try:
+            self._handle_message(
+                unused_channel, basic_deliver, properties, body, channel
+            )
+        except Exception:
+            logger.exception(
+                "Exception happened while handling a message. "
+                "Listener: %s, properties: %s",
+                channel.listener,
+                properties,
+            )
+        finally:
+            if self._adaptive_prefetch is not None:
+                self._adaptive_prefetch.record(channel, time.monotonic() - started)
+            # The I/O loop is woken up only when it has something to do.
+            if self._release(channel):
+                call_threadsafe(
+                    unused_channel.connection.ioloop, partial(self._drain, channel)
+                )
 
     def stop(self) -> None:
         super().stop()
         self._executor.shutdown()
+        for lanes in self._lanes.values():
+            lanes.shutdown()
@@ -1,6 +1,7 @@
 import abc
+import inspect
 import logging
-from typing import Optional
+from typing import Any, Optional
 
 from myrabbit.core.consumer.message_handler import MessageHandler
 from myrabbit.core.consumer.pika_message import PikaMessage
@@ -14,6 +15,12 @@ class HandleMessageStrategy(abc.ABC):
     def __call__(self, handle_message: MessageHandler, message: PikaMessage) -> None:
         pass
 
+    async def call_async(
+        self, handle_message: MessageHandler, message: PikaMessage
+    ) -> None:
+        """Handle message with a handler that may return an awaitable."""
+        self(handle_message, message)
+
 
 class BaseStrategy(HandleMessageStrategy):
     def __init__(self, auto_ack: bool):
@@ -22,12 +29,29 @@ class BaseStrategy(HandleMessageStrategy):
     def __call__(self, handle_message: MessageHandler, message: PikaMessage) -> None:
         # todo: add retry support on expected exceptions
         try:
-            result: Optional[Reply] = handle_message(message)
+            result: Optional[Reply] = handle_message(message)  # type: ignore
+        except Exception:
+            logger.exception("Exception happened during handling message %s", message)
+            message.requeue()
+            return
+
+        self._settle(message, result)
+
+    async def call_async(
+        self, handle_message: MessageHandler, message: PikaMessage
+    ) -> None:
+        try:
+            result: Any = handle_message(message)
+            if inspect.isawaitable(result):
+                result = await result
         except Exception:
             logger.exception("Exception happened during handling message %s", message)
             message.requeue()
             return
 
+        self._settle(message, result)
+
+    def _settle(self, message: PikaMessage, result: Optional[Reply]) -> None:
         reply_to = message.properties.reply_to
 
         if not self._auto_ack:
@@ -40,3 +64,10 @@ class BaseStrategy(HandleMessageStrategy):
 class ManualHandle(HandleMessageStrategy):
     def __call__(self, handle_message: MessageHandler, message: PikaMessage) -> None:
         handle_message(message)
+
+    async def call_async(
+        self, handle_message: MessageHandler, message: PikaMessage
+    ) -> None:
+        result = handle_message(message)
+        if inspect.isawaitable(result):
+            await result
@@ -1,8 +1,11 @@
+import asyncio
 import logging
+from concurrent.futures import Executor
 from dataclasses import dataclass
-from typing import Optional
+from typing import Callable, Hashable, Optional
 
 from myrabbit.core.consumer.message_handler import MessageHandler
+from myrabbit.utils.functions import is_coroutine_handler
 
 from . import handle_message_strategy as strategy
 from .callbacks import Callbacks
@@ -36,8 +39,27 @@ class Listener:
     auto_ack: bool = False
     handle_message_strategy: Optional[strategy.HandleMessageStrategy] = None
     callbacks: Optional[Callbacks] = None
+    # Override consumer settings for the channel of this listener.
+    prefetch_count: Optional[int] = None
+    max_concurrency: Optional[int] = None
+    # Runs synchronous handlers instead of the consumer's executor.
+    executor: Optional[Executor] = None
+    # Messages with the same key are handled in order by concurrent
+    # consumers, on one of ``partitions`` serial lanes (max concurrency by
+    # default). See myrabbit.core.consumer.partition.
+    partition_key: Optional[Callable[[PikaMessage], Hashable]] = None
+    partitions: Optional[int] = None
+
+    @property
+    def is_async(self) -> bool:
+        return is_coroutine_handler(self.handle_message)
 
     def handle(self, message: PikaMessage) -> None:
+        if self.is_async or self._callbacks().is_async:
+            # Coroutine handler or callbacks run by a synchronous consumer.
+            asyncio.run(self.handle_async(message))
+            return
+
         self._callbacks().before_request(message)
         execute_strategy = self._get_strategy()
         logger.info("Handling message with %s strategy", execute_strategy)
@@ -45,6 +67,15 @@ class Listener:
             execute_strategy(self.handle_message, message)  # type: ignore
         self._callbacks().after_request(message)
 
+    async def handle_async(self, message: PikaMessage) -> None:
+        callbacks = self._callbacks()
+        await callbacks.before_request_async(message)
+        execute_strategy = self._get_strategy()
+        logger.info("Handling message with %s strategy", execute_strategy)
+        async with await callbacks.run_middleware_async(message):
+            await execute_strategy.call_async(self.handle_message, message)
+        await callbacks.after_request_async(message)
+
     def _callbacks(self) -> Callbacks:
         return self.callbacks or Callbacks()
 
@@ -1,6 +1,8 @@
-from typing import Callable, Optional
+from typing import Awaitable, Callable, Optional, Union
 
 from myrabbit.core.consumer.pika_message import PikaMessage
 from myrabbit.core.consumer.reply import Reply
 
-MessageHandler = Callable[[PikaMessage], Optional[Reply]]
+MessageHandler = Callable[
+    [PikaMessage], Union[Optional[Reply], Awaitable[Optional[Reply]]]
+]
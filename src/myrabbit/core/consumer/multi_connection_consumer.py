@@ -0,0 +1,214 @@
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from enum import Enum
+from typing import Callable, List, Optional, Type
+
+from myrabbit.core.consumer.consumer import Consumer, ConsumerStats, ThreadedConsumer
+from myrabbit.core.consumer.listener import Listener
+
+logger = logging.getLogger(__name__)
+
+
+class ShardStrategy(Enum):
+    ROUND_ROBIN = "round_robin"
+    WEIGHTED = "weighted"
+
+
+def default_weight(listener: Listener) -> float:
+    return listener.max_concurrency or listener.prefetch_count or 1
+
+
+def shard_listeners(
+    listeners: List[Listener],
+    shards: int,
+    strategy: ShardStrategy = ShardStrategy.ROUND_ROBIN,
+    weight: Callable[[Listener], float] = default_weight,
+) -> List[List[Listener]]:
+    """Split listeners into ``shards`` groups, some may be empty.
+
+    Weighted assignment puts the heaviest listeners first, each on the
+    least loaded group.
+    """
+    if shards < 1:
+        raise ValueError("Number of connections must be positive")
+
+    groups: List[List[Listener]] = [[] for _ in range(shards)]
+    if strategy is ShardStrategy.ROUND_ROBIN:
+        for index, listener in enumerate(listeners):
+            groups[index % shards].append(listener)
+        return groups
+
+    loads = [0.0] * shards
+    for listener in sorted(listeners, key=weight, reverse=True):
+        index = loads.index(min(loads))
+        groups[index].append(listener)
+        loads[index] += weight(listener)
+    return groups
+
+
+@dataclass
+class ConnectionStats:
+    index: int
+    queues: List[str]
+    consuming: bool
+    messages: int
+    bytes: int
+    reconnects: int
+    # Average since the consumer was started.
+    messages_per_second: float
+
+
+class _Shard:
+    def __init__(self, index: int, listeners: List[Listener]) -> None:
+        self.index = index
+        self.listeners = listeners
+        self.consumer: Optional[Consumer] = None
+        self.thread: Optional[threading.Thread] = None
+        self.stats = ConsumerStats()
+        self.reconnects = 0
+        self.interrupted = False
+
+
+class MultiConnectionConsumer:
+    """Consumer spreading listeners over several connections.
+
+    Every connection is served by its own consumer of ``consumer_cls`` with
+    its own I/O loop thread, so frame parsing of busy listeners is not
+    limited to one socket and one thread. Listeners are assigned round-robin
+    or by weight, see :func:`shard_listeners`.
+
+    A connection that is closed by the broker is reconnected with increasing
+    delay on its own, the others keep consuming. ``stop`` stops all of them.
+    """
+
+    def __init__(
+        self,
+        amqp_url: str,
+        listeners: List[Listener],
+        prefetch_count: int = 1,
+        *,
+        connections: int = 2,
+        strategy: ShardStrategy = ShardStrategy.ROUND_ROBIN,
+        weight: Callable[[Listener], float] = default_weight,
+        consumer_cls: Type[Consumer] = ThreadedConsumer,
+        consumer_kwargs: Optional[dict] = None,
+    ) -> None:
+        # Compatibility with ReconnectingConsumer, shards reconnect themselves.
+        self.should_reconnect = False
+
+        self._url = amqp_url
+        self._prefetch_count = prefetch_count
+        self._consumer_cls = consumer_cls
+        self._consumer_kwargs = consumer_kwargs or {}
+        self._shards = [
+            _Shard(index, group)
+            for index, group in enumerate(
+                shard_listeners(listeners, connections, strategy, weight)
+            )
+            if group
+        ]
+
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._started_at: Optional[float] = None
+
+    @property
+    def was_consuming(self) -> bool:
+        return any(
+            shard.consumer is not None and shard.consumer.was_consuming
+            for shard in self._shards
+        )
+
+    def stats(self) -> List[ConnectionStats]:
+        elapsed = time.monotonic() - self._started_at if self._started_at else 0.0
+        result = []
+        for shard in self._shards:
+            consumer = shard.consumer
+            consuming = False
+            if consumer is not None:
+                consuming = consumer.was_consuming and not consumer.should_reconnect
+            result.append(
+                ConnectionStats(
+                    index=shard.index,
+                    queues=[listener.queue.name for listener in shard.listeners],
+                    consuming=consuming,
+                    messages=shard.stats.messages,
+                    bytes=shard.stats.bytes,
+                    reconnects=shard.reconnects,
+                    messages_per_second=(
+                        shard.stats.messages / elapsed if elapsed > 0 else 0.0
+                    ),
+                )
+            )
+        return result
+
+    def run(self) -> None:
+        """Start a thread per connection and wait until all are stopped."""
+        self._started_at = time.monotonic()
+        for shard in self._shards:
+            shard.thread = threading.Thread(
+                target=self._run_shard,
+                args=(shard,),
+                name=f"myrabbit-connection-{shard.index}",
+                daemon=True,
+            )
+            shard.thread.start()
+
+        for shard in self._shards:
+            assert shard.thread
+            shard.thread.join()
+
+    def stop(self) -> None:
+        """Stop all connections, can be called from any thread."""
+        with self._lock:
+            self._stopping.set()
+
+        for shard in self._shards:
+            while shard.thread is not None and shard.thread.is_alive():
+                # A consumer may be created but not connecting yet.
+                if not shard.interrupted and shard.consumer is not None:
+                    shard.interrupted = shard.consumer.interrupt()
+                shard.thread.join(0.1)
+        logger.info("Stopped %d connection(s)", len(self._shards))
+
+    def _make_consumer(self, shard: _Shard) -> Consumer:
+        consumer = self._consumer_cls(
+            amqp_url=self._url,
+            listeners=shard.listeners,
+            prefetch_count=self._prefetch_count,
+            **self._consumer_kwargs,
+        )
+        # Counted over reconnects.
+        consumer.stats = shard.stats
+        return consumer
+
+    def _run_shard(self, shard: _Shard) -> None:
+        reconnect_delay = 0
+        while True:
+            with self._lock:
+                if self._stopping.is_set():
+                    return
+                consumer = shard.consumer = self._make_consumer(shard)
+
+            consumer.run()
+
+            if self._stopping.is_set():
+                consumer.stop()
+                return
+            if not consumer.should_reconnect:
+                logger.warning("Connection %d stopped unexpectedly", shard.index)
+                return
+
+            consumer.stop()
+            shard.reconnects += 1
+            reconnect_delay = 0 if consumer.was_consuming else reconnect_delay + 1
+            reconnect_delay = min(reconnect_delay, 30)
+            logger.info(
+                "Reconnecting connection %d after %d seconds",
+                shard.index,
+                reconnect_delay,
+            )
+            if self._stopping.wait(reconnect_delay):
+                return
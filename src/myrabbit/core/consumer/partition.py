@@ -0,0 +1,61 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, List
+
+from myrabbit.core.consumer.pika_message import PikaMessage
+
+PartitionKey = Callable[[PikaMessage], Hashable]
+
+
+def header_key(name: str) -> PartitionKey:
+    def key(message: PikaMessage) -> Hashable:
+        headers: Dict[str, Hashable] = message.properties.headers or {}
+        return headers.get(name)
+
+    return key
+
+
+def routing_key(message: PikaMessage) -> Hashable:
+    return str(message.basic_deliver.routing_key)
+
+
+def parse_partition_key(spec: str) -> PartitionKey:
+    """Partition key from ``"routing_key"`` or ``"header:<name>"``."""
+    if spec == "routing_key":
+        return routing_key
+    kind, _, name = spec.partition(":")
+    if kind == "header" and name:
+        return header_key(name)
+    raise ValueError(
+        f"Invalid partition key {spec!r}, expected 'routing_key' or 'header:<name>'"
+    )
+
+
+class PartitionedExecutor:
+    """Runs calls with the same key one by one, in order of submission.
+
+    A key is hashed to one of ``lanes`` single threads, calls with different
+    keys may run in parallel.
+    """
+
+    def __init__(self, lanes: int, thread_name_prefix: str = "myrabbit-lane"):
+        if lanes < 1:
+            raise ValueError("Number of lanes must be positive")
+
+        self._lanes: List[ThreadPoolExecutor] = [
+            ThreadPoolExecutor(1, thread_name_prefix=f"{thread_name_prefix}-{i}")
+            for i in range(lanes)
+        ]
+
+    @property
+    def lanes(self) -> int:
+        return len(self._lanes)
+
+    def lane_for(self, key: Hashable) -> int:
+        return hash(key) % len(self._lanes)
+
+    def submit(self, key: Hashable, fn: Callable, *args: Any) -> Future:
+        return self._lanes[self.lane_for(key)].submit(fn, *args)
+
+    def shutdown(self, wait: bool = True) -> None:
+        for lane in self._lanes:
+            lane.shutdown(wait)
@@ -1,10 +1,12 @@
 import logging
 from dataclasses import dataclass
+from typing import Callable, Optional
 
 import pika
 from pika.channel import Channel
 from pika.spec import Basic
 
+from myrabbit.core.consumer.ack_coordinator import AckCoordinator, call_threadsafe
 from myrabbit.core.consumer.reply import Reply
 
 logger = logging.getLogger(__name__)
@@ -16,18 +18,36 @@ class PikaMessage:
     basic_deliver: Basic.Deliver
     properties: pika.BasicProperties
     body: bytes
+    # Message is handled on the I/O loop thread, channel may be used directly.
+    in_ioloop: bool = False
+    # Acks and rejects go through the coordinator of the channel if set.
+    acks: Optional[AckCoordinator] = None
 
     def requeue(self) -> None:
         logger.info("Requeue message %s", self)
-        self.channel.connection.ioloop.add_callback_threadsafe(
+        self._reject(requeue=True)
+
+    def reject(self, requeue: bool = False) -> None:
+        """Reject message, without requeue it is dead-lettered or dropped."""
+        logger.info("Reject message %s", self)
+        self._reject(requeue)
+
+    def _reject(self, requeue: bool) -> None:
+        if self.acks is not None:
+            self.acks.reject(self.basic_deliver.delivery_tag, requeue=requeue)
+            return
+        self._run_in_ioloop(
             lambda: self.channel.basic_reject(
-                self.basic_deliver.delivery_tag, requeue=True
+                self.basic_deliver.delivery_tag, requeue=requeue
             )
         )
 
     def acknowledge(self) -> None:
         logger.info("Acknowledging message %s", self)
-        self.channel.connection.ioloop.add_callback_threadsafe(
+        if self.acks is not None:
+            self.acks.ack(self.basic_deliver.delivery_tag)
+            return
+        self._run_in_ioloop(
             lambda: self.channel.basic_ack(self.basic_deliver.delivery_tag)
         )
 
@@ -58,7 +78,7 @@ class PikaMessage:
         if properties.correlation_id is None:
             properties.correlation_id = self.properties.correlation_id
 
-        self.channel.connection.ioloop.add_callback_threadsafe(
+        self._run_in_ioloop(
             lambda: self.channel.basic_publish(
                 exchange=reply_exchange,
                 routing_key=reply_rk,
@@ -66,3 +86,10 @@ class PikaMessage:
                 properties=properties,
             )
         )
+
+    def _run_in_ioloop(self, fn: Callable[[], None]) -> None:
+        if self.in_ioloop:
+            fn()
+            return
+
+        call_threadsafe(self.channel.connection.ioloop, fn)
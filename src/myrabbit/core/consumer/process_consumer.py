@@ -0,0 +1,248 @@
+import importlib
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from typing import Any, Dict, List, Optional, Tuple
+
+import pika
+from pika.channel import Channel
+from pika.spec import Basic
+
+from myrabbit.core.consumer.channel import ConsumedChannel
+from myrabbit.core.consumer.consumer import ThreadedConsumer
+from myrabbit.core.consumer.listener import Listener
+from myrabbit.core.consumer.pika_message import PikaMessage
+
+logger = logging.getLogger(__name__)
+
+ListenerKey = Tuple[str, str, str]
+# Channel method name, positional and keyword arguments.
+Action = Tuple[str, Tuple[Any, ...], Dict[str, Any]]
+
+_worker_listeners: Dict[ListenerKey, Listener] = {}
+
+
+def load_listeners(path: str) -> List[Listener]:
+    """Import listeners from ``"package.module:attribute"``.
+
+    The attribute may be a listener, a service, a list of them or a callable
+    returning any of these.
+    """
+    module_name, _, attribute = path.partition(":")
+    if not attribute:
+        raise ValueError(
+            f"Invalid listeners path {path!r}, expected 'module:attribute'"
+        )
+
+    obj = getattr(importlib.import_module(module_name), attribute)
+    if callable(obj):
+        obj = obj()
+
+    listeners: List[Listener] = []
+    for item in obj if isinstance(obj, (list, tuple)) else [obj]:
+        listeners.extend(item.listeners if hasattr(item, "listeners") else [item])
+    return listeners
+
+
+def listener_key(listener: Listener) -> ListenerKey:
+    return listener.exchange.name, listener.queue.name, listener.routing_key
+
+
+class _RecordingChannel:
+    """Stands in for the pika channel in worker processes.
+
+    Calls made by the handler are recorded to be replayed by the parent.
+    Acks with ``multiple`` are refused: the worker does not know which
+    earlier deliveries are still handled by other workers.
+    """
+
+    def __init__(self) -> None:
+        self.actions: List[Action] = []
+        self.connection = self
+        self.ioloop = self
+
+    def add_callback_threadsafe(self, callback: Any) -> None:
+        callback()
+
+    def basic_ack(self, delivery_tag: int = 0, multiple: bool = False) -> None:
+        self._check_single(multiple)
+        self.actions.append(("basic_ack", (delivery_tag,), {}))
+
+    def basic_nack(
+        self, delivery_tag: int = 0, multiple: bool = False, requeue: bool = True
+    ) -> None:
+        self._check_single(multiple)
+        self.actions.append(("basic_nack", (delivery_tag,), {"requeue": requeue}))
+
+    def basic_reject(self, delivery_tag: int = 0, requeue: bool = True) -> None:
+        self.actions.append(("basic_reject", (delivery_tag,), {"requeue": requeue}))
+
+    def basic_publish(
+        self,
+        exchange: str,
+        routing_key: str,
+        body: bytes,
+        properties: Optional[pika.BasicProperties] = None,
+        mandatory: bool = False,
+    ) -> None:
+        self.actions.append(
+            (
+                "basic_publish",
+                (),
+                dict(
+                    exchange=exchange,
+                    routing_key=routing_key,
+                    body=body,
+                    properties=properties,
+                    mandatory=mandatory,
+                ),
+            )
+        )
+
+    def _check_single(self, multiple: bool) -> None:
+        if multiple:
+            raise ValueError(
+                "Acks with multiple=True are not supported in worker processes, "
+                "acknowledge the message itself"
+            )
+
+
+def _init_worker(listeners_path: str) -> None:
+    _worker_listeners.clear()
+    for listener in load_listeners(listeners_path):
+        _worker_listeners[listener_key(listener)] = listener
+
+
+def _handle_in_worker(
+    key: ListenerKey,
+    basic_deliver: Basic.Deliver,
+    properties: pika.BasicProperties,
+    body: bytes,
+) -> List[Action]:
+    channel = _RecordingChannel()
+    message = PikaMessage(channel, basic_deliver, properties, body)  # type: ignore
+    try:
+        _worker_listeners[key].handle(message)
+    except Exception:
+        logger.exception(
+            "Exception happened while handling a message. "
+            "Listener: %s, properties: %s",
+            key,
+            properties,
+        )
+    return channel.actions
+
+
+class ProcessPoolConsumer(ThreadedConsumer):
+    """Consumer running message handlers in worker processes.
+
+    Useful for CPU-bound handlers. The I/O loop stays in this process, each
+    worker imports the listeners from ``listeners_path`` (see
+    :func:`load_listeners`), handles the messages and sends back the
+    acknowledgements and replies to be performed by the I/O loop. Handlers
+    should not use the pika channel for anything else.
+
+    In-flight messages are bounded by ``prefetch_count`` as in
+    :class:`ThreadedConsumer`. If a worker crashes the pool is restarted and
+    the message is requeued, or rejected when it was already redelivered.
+    """
+
+    def __init__(
+        self,
+        amqp_url: str,
+        listeners: Optional[List[Listener]] = None,
+        prefetch_count: int = 1,
+        *,
+        listeners_path: str,
+        max_workers: Optional[int] = None,
+        start_method: str = "spawn",
+        **kwargs: Any,
+    ) -> None:
+        if listeners is None:
+            listeners = load_listeners(listeners_path)
+        if len({listener_key(listener) for listener in listeners}) != len(listeners):
+            raise ValueError(
+                "Listeners must differ by exchange, queue or routing key"
+            )
+
+        super().__init__(amqp_url, listeners, prefetch_count, **kwargs)
+        self._listeners_path = listeners_path
+        self._max_workers = max_workers
+        self._mp_context = multiprocessing.get_context(start_method)
+        self._pool_lock = threading.Lock()
+        self._pool = self._make_pool()
+
+    def _make_pool(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self._max_workers,
+            mp_context=self._mp_context,
+            initializer=_init_worker,
+            initargs=(self._listeners_path,),
+        )
+
+    def _restart_pool(self, broken: ProcessPoolExecutor) -> None:
+        with self._pool_lock:
+            if self._pool is broken:
+                logger.warning("Worker process crashed, restarting process pool")
+                self._pool = self._make_pool()
+        broken.shutdown(wait=False)
+
+    def _executor_for(self, listener: Listener) -> Executor:
+        # Threads wait for the pool, a listener executor is not used.
+        return self._executor
+
+    def _handle_message(
+        self,
+        unused_channel: Channel,
+        basic_deliver: Basic.Deliver,
+        properties: pika.BasicProperties,
+        body: bytes,
+        channel: ConsumedChannel,
+    ) -> None:
+        pool = self._pool
+        try:
+            actions = pool.submit(
+                _handle_in_worker,
+                listener_key(channel.listener),
+                basic_deliver,
+                properties,
+                body,
+            ).result()
+        except BrokenProcessPool:
+            self._restart_pool(pool)
+            actions = self._crash_actions(basic_deliver, channel)
+
+        ioloop = unused_channel.connection.ioloop
+        for name, args, kwargs in actions:
+            if channel.acks is not None and name == "basic_ack":
+                channel.acks.ack(*args)
+            elif channel.acks is not None and name == "basic_reject":
+                channel.acks.reject(*args, **kwargs)
+            elif channel.acks is not None and name == "basic_nack":
+                channel.acks.nack_many(args, requeue=kwargs["requeue"])
+            else:
+                ioloop.add_callback_threadsafe(
+                    partial(getattr(unused_channel, name), *args, **kwargs)
+                )
+
+    def _crash_actions(
+        self, basic_deliver: Basic.Deliver, channel: ConsumedChannel
+    ) -> List[Action]:
+        if channel.listener.auto_ack:
+            logger.error("Message %s was lost in a crashed worker", basic_deliver)
+            return []
+
+        requeue = not basic_deliver.redelivered
+        logger.error(
+            "Worker crashed while handling message %s, %s",
+            basic_deliver,
+            "requeueing" if requeue else "rejecting",
+        )
+        return [("basic_reject", (basic_deliver.delivery_tag,), {"requeue": requeue})]
+
+    def stop(self) -> None:
+        super().stop()
+        self._pool.shutdown()
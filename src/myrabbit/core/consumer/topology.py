@@ -0,0 +1,86 @@
+import threading
+from typing import Hashable, Set, Tuple
+
+from myrabbit.core.consumer.listener import Exchange, Listener, Queue
+
+
+def exchange_key(exchange: Exchange) -> Tuple[Hashable, ...]:
+    return (
+        "exchange",
+        exchange.name,
+        exchange.type,
+        exchange.durable,
+        exchange.auto_delete,
+    )
+
+
+def queue_key(queue: Queue) -> Tuple[Hashable, ...]:
+    return ("queue", queue.name, queue.durable, queue.auto_delete, queue.exclusive)
+
+
+def is_persistent_exchange(exchange: Exchange) -> bool:
+    return exchange.durable and not exchange.auto_delete
+
+
+def is_persistent_queue(queue: Queue) -> bool:
+    return queue.durable and not queue.auto_delete and not queue.exclusive
+
+
+class TopologyCache:
+    """Exchanges and queues declared by this process, per broker URL.
+
+    Only entities surviving a reconnect are remembered: durable ones which
+    are not auto-deleted or exclusive. Consumers given the cache skip
+    declaring them again, bindings are always declared. If topology is
+    deleted outside of the process the cache should be cleared; a consumer
+    forgets the entities of a listener whose channel is closed with
+    ``NOT_FOUND``.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._declared: Set[Tuple[str, Hashable]] = set()
+
+    def __contains__(self, item: Tuple[str, Hashable]) -> bool:
+        with self._lock:
+            return item in self._declared
+
+    def __len__(self) -> int:
+        return len(self._declared)
+
+    def has_exchange(self, url: str, exchange: Exchange) -> bool:
+        return (url, exchange_key(exchange)) in self
+
+    def has_queue(self, url: str, queue: Queue) -> bool:
+        return (url, queue_key(queue)) in self
+
+    def add_exchange(self, url: str, exchange: Exchange) -> None:
+        if is_persistent_exchange(exchange):
+            self._add(url, exchange_key(exchange))
+
+    def add_queue(self, url: str, queue: Queue) -> None:
+        if is_persistent_queue(queue):
+            self._add(url, queue_key(queue))
+
+    def forget(self, url: str, listener: Listener) -> bool:
+        """Forget topology of the listener, return True if any was cached."""
+        keys = {
+            (url, exchange_key(listener.exchange)),
+            (url, queue_key(listener.queue)),
+        }
+        with self._lock:
+            cached = bool(keys & self._declared)
+            self._declared -= keys
+        return cached
+
+    def clear(self) -> None:
+        with self._lock:
+            self._declared.clear()
+
+    def _add(self, url: str, key: Tuple[Hashable, ...]) -> None:
+        with self._lock:
+            self._declared.add((url, key))
+
+
+# May be shared by consumers of the process, survives reconnects.
+DEFAULT_TOPOLOGY_CACHE = TopologyCache()
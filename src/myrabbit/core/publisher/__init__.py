@@ -1 +1,4 @@
-from .publisher import Publisher, make_publisher
+from .async_publisher import AsyncPublisher
+from .confirms import PublishFailedError, PublishNackedError
+from .publisher import BasePublisher, OutgoingMessage, Publisher, make_publisher
+from .rpc import RpcClient
@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from types import TracebackType
+from typing import Any, Optional, Type
+
+import pika
+from pika import BasicProperties
+from pika.adapters.asyncio_connection import AsyncioConnection
+from pika.channel import Channel
+from pika.exceptions import ChannelClosedByBroker
+
+from myrabbit.core.publisher.confirms import ConfirmTracker
+from myrabbit.core.publisher.exchange_cache import missing_exchange_name
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncPublisher:
+    """Publisher for asyncio applications built on pika ``AsyncioConnection``.
+
+    One instance keeps a single connection and channel open and is meant to
+    be shared by all coroutines of an event loop. Publishing only writes to
+    the transport, so many concurrent publishes are pipelined over the
+    connection; in confirm mode every ``publish`` awaits its own confirm.
+    The connection is opened lazily and reopened after failures.
+
+    The publisher is bound to the event loop that uses it first. Using it
+    from another running loop raises ``RuntimeError``; after its loop is
+    closed (e.g. by ``asyncio.run``) it reconnects on the next loop.
+    """
+
+    def __init__(
+        self,
+        amqp_url: str,
+        confirm_delivery: bool = False,
+        confirm_window: int = 1024,
+    ):
+        self._amqp_url = amqp_url
+        self._confirm_delivery = confirm_delivery
+        self._confirm_window = confirm_window
+
+        self._connection: Optional[AsyncioConnection] = None
+        self._channel: Optional[Channel] = None
+        self._confirms: Optional[ConfirmTracker] = None
+        self._has_space: Optional[asyncio.Event] = None
+        self._connecting: Optional[asyncio.Future] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def is_open(self) -> bool:
+        if self._connection is None or self._channel is None:
+            return False
+        return bool(self._connection.is_open and self._channel.is_open)
+
+    async def connect(self) -> None:
+        self._check_loop()
+        if self.is_open:
+            return
+
+        # Concurrent publishers wait for the same connection attempt.
+        if self._connecting is None:
+            self._connecting = asyncio.ensure_future(self._connect())
+        try:
+            await asyncio.shield(self._connecting)
+        finally:
+            if self._connecting is not None and self._connecting.done():
+                self._connecting = None
+
+    async def publish(
+        self,
+        exchange: str,
+        routing_key: str,
+        message: bytes,
+        properties: Optional[BasicProperties] = None,
+    ) -> None:
+        await self.connect()
+        assert self._channel is not None
+
+        confirms = self._confirms
+        if confirms is None:
+            self._channel.basic_publish(exchange, routing_key, message, properties)
+            return
+
+        while confirms.is_full:
+            assert self._has_space is not None
+            self._has_space.clear()
+            await self._has_space.wait()
+
+        confirmation = confirms.track()
+        self._channel.basic_publish(exchange, routing_key, message, properties)
+
+        try:
+            await confirmation
+        except ChannelClosedByBroker as e:
+            # Messages in flight to other exchanges are lost with the channel.
+            if int(e.reply_code) != 404 or missing_exchange_name(e) != exchange:
+                raise
+            logger.warning(
+                "Can not publish message because exchange does not exist: %s %s",
+                e.reply_code,
+                e.reply_text,
+            )
+
+    async def close(self) -> None:
+        self._check_loop()
+        connection, self._connection = self._connection, None
+        self._channel = None
+        if connection is None or connection.is_closing or connection.is_closed:
+            return
+
+        closed = asyncio.get_event_loop().create_future()
+
+        def on_closed(_connection: AsyncioConnection, _reason: Exception) -> None:
+            if not closed.done():
+                closed.set_result(None)
+
+        connection.add_on_close_callback(on_closed)
+        connection.close()
+        await closed
+
+    async def _connect(self) -> None:
+        loop = asyncio.get_event_loop()
+
+        if self._connection is None or not self._connection.is_open:
+            opened = loop.create_future()
+            self._connection = AsyncioConnection(
+                parameters=pika.URLParameters(self._amqp_url),
+                on_open_callback=lambda connection: opened.set_result(None),
+                on_open_error_callback=lambda connection, err: opened.set_exception(
+                    err
+                ),
+                on_close_callback=self._on_connection_closed,
+                custom_ioloop=loop,
+            )
+            await opened
+
+        channel_opened = loop.create_future()
+        self._connection.channel(on_open_callback=channel_opened.set_result)
+        channel: Channel = await channel_opened
+
+        if self._confirm_delivery:
+            confirms = ConfirmTracker(
+                self._confirm_window,
+                on_settled=self._on_confirms_settled,
+                future_factory=loop.create_future,
+            )
+            selected = loop.create_future()
+            channel.confirm_delivery(
+                ack_nack_callback=confirms.on_confirm, callback=selected.set_result
+            )
+            await selected
+            channel.add_on_close_callback(
+                lambda _channel, reason: confirms.fail_all(reason)
+            )
+            self._confirms = confirms
+            self._has_space = asyncio.Event()
+
+        self._channel = channel
+
+    def _check_loop(self) -> None:
+        loop = asyncio.get_event_loop()
+        if loop is self._loop:
+            return
+        if self._loop is not None and not self._loop.is_closed():
+            raise RuntimeError("AsyncPublisher is bound to another event loop")
+
+        # The connection of a closed loop is gone with it.
+        self._loop = loop
+        self._connection = None
+        self._channel = None
+        self._confirms = None
+        self._has_space = None
+        self._connecting = None
+
+    def _on_confirms_settled(self) -> None:
+        if self._has_space is not None:
+            self._has_space.set()
+
+    def _on_connection_closed(
+        self, _connection: AsyncioConnection, reason: Exception
+    ) -> None:
+        if self._connection is not None:
+            logger.warning("Async publisher connection closed: %s", reason)
+        self._connection = None
+        self._channel = None
+
+    async def __aenter__(self) -> AsyncPublisher:
+        await self.connect()
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: Optional[Type[Exception]],
+        exc_val: Optional[Any],
+        exc_tb: Optional[TracebackType],
+    ) -> None:
+        await self.close()
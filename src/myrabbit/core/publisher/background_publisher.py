@@ -0,0 +1,331 @@
+import atexit
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from dataclasses import dataclass
+from enum import Enum
+from typing import Deque, Iterable, List, Optional
+
+import pika
+from pika import BasicProperties
+
+from myrabbit.core.consumer.pika_message import PikaMessage
+from myrabbit.core.publisher.confirms import PublishFailedError, PublishNackedError
+from myrabbit.core.publisher.exchange_cache import is_missing_exchange
+from myrabbit.core.publisher.publisher import BasePublisher, OutgoingMessage, Publisher
+from myrabbit.core.publisher.reconnecting_publisher import PublisherFactory
+
+logger = logging.getLogger(__name__)
+
+
+class OverflowPolicy(Enum):
+    BLOCK = "block"
+    DROP_OLDEST = "drop_oldest"
+    RAISE = "raise"
+
+
+class QueueFullError(Exception):
+    pass
+
+
+@dataclass
+class BackgroundPublisherStats:
+    queue_depth: int = 0
+    published: int = 0
+    dropped: int = 0
+    failed: int = 0
+    flushes: int = 0
+    last_flush_latency: float = 0.0
+    max_flush_latency: float = 0.0
+    total_flush_latency: float = 0.0
+
+
+class BackgroundPublisher(BasePublisher):
+    """Publisher that hands messages over to the factory I/O thread."""
+
+    def __init__(self, factory: "BackgroundPublisherFactory"):
+        self._factory = factory
+
+    def publish(
+        self,
+        exchange: str,
+        routing_key: str,
+        message: bytes,
+        properties: Optional[BasicProperties] = None,
+    ) -> Optional["Future[None]"]:
+        self._factory.enqueue(
+            [OutgoingMessage(exchange, routing_key, message, properties)]
+        )
+        return None
+
+    def publish_many(
+        self, messages: Iterable[OutgoingMessage], burst_size: int = 1000
+    ) -> List[Optional["Future[None]"]]:
+        batch = list(messages)
+        self._factory.enqueue(batch)
+        return [None] * len(batch)
+
+    def rpc(
+        self,
+        exchange: str,
+        routing_key: str,
+        message: bytes,
+        properties: Optional[BasicProperties] = None,
+        timeout: Optional[int] = 1,
+    ) -> PikaMessage:
+        # Replies can not be awaited through the queue, rpc stays synchronous.
+        with self._factory.publisher_factory.publisher() as publisher:
+            return publisher.rpc(exchange, routing_key, message, properties, timeout)
+
+    def close(self) -> None:
+        pass
+
+
+class BackgroundPublisherFactory(PublisherFactory):
+    """Publisher factory that publishes from a dedicated I/O thread.
+
+    Publishes only append messages to a bounded in-memory queue. The I/O
+    thread owns a publisher obtained from ``publisher_factory`` and writes
+    queued messages in batches of up to ``batch_size``. When the queue is
+    full, ``overflow`` decides whether callers block, the oldest messages
+    are dropped or :class:`QueueFullError` is raised.
+
+    With a confirming ``publisher_factory`` only unconfirmed messages of a
+    batch are sent again, up to ``max_retries`` times. Messages to missing
+    exchanges count as failed right away, messages skipped by the publisher
+    as dropped.
+    """
+
+    def __init__(
+        self,
+        publisher_factory: PublisherFactory,
+        max_queue_size: int = 10000,
+        overflow: OverflowPolicy = OverflowPolicy.BLOCK,
+        block_timeout: Optional[float] = None,
+        batch_size: int = 500,
+        max_retries: int = 3,
+        retry_delay: float = 1.0,
+        idle_interval: float = 1.0,
+        flush_on_exit: bool = True,
+    ):
+        self.publisher_factory = publisher_factory
+        self._max_queue_size = max_queue_size
+        self._overflow = overflow
+        self._block_timeout = block_timeout
+        self._batch_size = batch_size
+        self._max_retries = max_retries
+        self._retry_delay = retry_delay
+        self._idle_interval = idle_interval
+
+        self._queue: Deque[OutgoingMessage] = deque()
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+        self._all_sent = threading.Condition(self._lock)
+        self._unfinished = 0
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+        self._publisher: Optional[BasePublisher] = None
+        self._stats = BackgroundPublisherStats()
+
+        self._flush_on_exit = flush_on_exit
+        if flush_on_exit:
+            atexit.register(self.close)
+
+    def get_connection(self) -> pika.BlockingConnection:
+        return self.publisher_factory.get_connection()
+
+    def publisher(self) -> BasePublisher:
+        return BackgroundPublisher(self)
+
+    def stats(self) -> BackgroundPublisherStats:
+        with self._lock:
+            self._stats.queue_depth = len(self._queue)
+            return BackgroundPublisherStats(**vars(self._stats))
+
+    def enqueue(self, messages: List[OutgoingMessage]) -> None:
+        with self._lock:
+            if self._stopping:
+                raise RuntimeError("Background publisher is closed")
+            self._ensure_started()
+
+            for message in messages:
+                self._wait_for_space()
+                self._queue.append(message)
+                self._unfinished += 1
+                self._not_empty.notify()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every queued message is handed over to the broker."""
+        with self._lock:
+            return self._all_sent.wait_for(lambda: self._unfinished == 0, timeout)
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Stop accepting messages, flush the queue and stop the I/O thread."""
+        with self._lock:
+            if self._stopping:
+                return
+            self._stopping = True
+            self._not_empty.notify()
+            thread = self._thread
+
+        if self._flush_on_exit:
+            atexit.unregister(self.close)
+        if thread is not None:
+            thread.join(timeout)
+            if thread.is_alive():
+                logger.warning(
+                    "Background publisher did not flush %d message(s) in %s s",
+                    len(self._queue),
+                    timeout,
+                )
+
+    def _ensure_started(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="myrabbit-background-publisher", daemon=True
+            )
+            self._thread.start()
+
+    def _wait_for_space(self) -> None:
+        if len(self._queue) < self._max_queue_size:
+            return
+
+        if self._overflow is OverflowPolicy.RAISE:
+            raise QueueFullError(f"Publish queue is full ({self._max_queue_size})")
+
+        if self._overflow is OverflowPolicy.DROP_OLDEST:
+            self._queue.popleft()
+            self._stats.dropped += 1
+            self._task_done(1)
+            return
+
+        has_space = self._not_full.wait_for(
+            lambda: len(self._queue) < self._max_queue_size, self._block_timeout
+        )
+        if not has_space:
+            raise QueueFullError(
+                f"Publish queue is still full after {self._block_timeout} s"
+            )
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                if not self._queue and not self._stopping:
+                    self._not_empty.wait(self._idle_interval)
+
+                if not self._queue:
+                    if self._stopping:
+                        break
+                    batch = []
+                else:
+                    count = min(self._batch_size, len(self._queue))
+                    batch = [self._queue.popleft() for _ in range(count)]
+                    self._not_full.notify_all()
+
+            if batch:
+                self._send(batch)
+            else:
+                self._keep_alive()
+
+        self._close_publisher()
+
+    def _send(self, batch: List[OutgoingMessage]) -> None:
+        confirm = self.publisher_factory.confirm_delivery
+        for attempt in range(1, self._max_retries + 1):
+            started = time.monotonic()
+            futures: List[Optional["Future[None]"]] = []
+            try:
+                publisher = self._get_publisher()
+                futures = publisher.publish_many(batch)
+                publisher.wait_for_confirms()
+            except (PublishFailedError, PublishNackedError):
+                # Settled per message below, the publisher reopens its channel.
+                pass
+            except Exception:
+                logger.exception(
+                    "Background publish of %d message(s) failed (attempt %d/%d)",
+                    len(batch),
+                    attempt,
+                    self._max_retries,
+                )
+                self._close_publisher()
+
+            published = dropped = failed = 0
+            unconfirmed = []
+            for message, future in zip(batch, futures):
+                if future is None:
+                    if confirm:
+                        dropped += 1
+                    else:
+                        published += 1
+                elif not future.done():
+                    unconfirmed.append(message)
+                elif future.exception() is None:
+                    published += 1
+                elif is_missing_exchange(future.exception(), message.exchange):
+                    failed += 1
+                else:
+                    unconfirmed.append(message)
+            if not futures:
+                # Nothing was handed over, publish_many raised.
+                unconfirmed = batch
+
+            latency = time.monotonic() - started
+            with self._lock:
+                self._stats.published += published
+                self._stats.dropped += dropped
+                self._stats.failed += failed
+                if futures:
+                    self._stats.flushes += 1
+                    self._stats.last_flush_latency = latency
+                    self._stats.total_flush_latency += latency
+                    self._stats.max_flush_latency = max(
+                        self._stats.max_flush_latency, latency
+                    )
+                self._task_done(published + dropped + failed)
+
+            batch = unconfirmed
+            if not batch:
+                return
+            if attempt < self._max_retries:
+                logger.warning(
+                    "Background publisher retries %d unconfirmed message(s)",
+                    len(batch),
+                )
+                time.sleep(self._retry_delay)
+
+        with self._lock:
+            self._stats.failed += len(batch)
+            self._task_done(len(batch))
+
+    def _keep_alive(self) -> None:
+        # Let an idle connection answer broker heartbeats.
+        if not isinstance(self._publisher, Publisher):
+            return
+        try:
+            self._publisher.process_data_events()
+        except Exception:
+            logger.info("Background publisher connection lost", exc_info=True)
+            self._close_publisher()
+
+    def _get_publisher(self) -> BasePublisher:
+        if self._publisher is None:
+            self._publisher = self.publisher_factory.publisher()
+        return self._publisher
+
+    def _close_publisher(self) -> None:
+        publisher, self._publisher = self._publisher, None
+        if publisher is None:
+            return
+        try:
+            publisher.close()
+        except Exception:
+            logger.debug("Error while closing background publisher", exc_info=True)
+
+    def _task_done(self, count: int) -> None:
+        self._unfinished -= count
+        if self._unfinished == 0:
+            self._all_sent.notify_all()
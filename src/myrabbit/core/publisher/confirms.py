@@ -0,0 +1,122 @@
+import logging
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, List, Optional
+
+import pika.frame
+from pika.spec import Basic
+
+logger = logging.getLogger(__name__)
+
+
+class PublishNackedError(Exception):
+    def __init__(self, delivery_tags: List[int]):
+        super().__init__(f"Broker rejected {len(delivery_tags)} message(s)")
+        self.delivery_tags = delivery_tags
+
+
+class PublishFailedError(Exception):
+    """Messages were not confirmed because their channel was closed."""
+
+    def __init__(self, count: int, reason: BaseException):
+        super().__init__(f"{count} message(s) were not confirmed: {reason}")
+        self.count = count
+        self.reason = reason
+
+
+class ConfirmTracker:
+    """Keeps track of messages published in confirm mode.
+
+    Delivery tags are assigned by the broker sequentially per channel,
+    starting from 1, so the tracker can number messages itself and settle
+    them when Basic.Ack / Basic.Nack frames arrive, including the ones that
+    confirm everything up to a tag with ``multiple`` flag set.
+
+    ``future_factory`` creates per-message futures, it can be
+    ``loop.create_future`` to track confirms on an asyncio channel.
+    """
+
+    def __init__(
+        self,
+        window: int,
+        on_settled: Optional[Callable[[], None]] = None,
+        future_factory: Callable[[], Any] = Future,
+    ):
+        if window < 1:
+            raise ValueError(f"Confirm window must be positive, got {window}")
+
+        self._window = window
+        self._on_settled = on_settled
+        self._future_factory = future_factory
+        self._next_tag = 1
+        self._pending: "OrderedDict[int, Any]" = OrderedDict()
+        self._nacked: List[int] = []
+        self._failure: Optional[PublishFailedError] = None
+
+    @property
+    def outstanding(self) -> int:
+        return len(self._pending)
+
+    @property
+    def is_full(self) -> bool:
+        return len(self._pending) >= self._window
+
+    def track(self) -> Any:
+        future = self._future_factory()
+        self._pending[self._next_tag] = future
+        self._next_tag += 1
+        return future
+
+    def on_confirm(self, frame: pika.frame.Method) -> None:
+        method = frame.method
+        acked = isinstance(method, Basic.Ack)
+
+        if method.multiple:
+            tags = []
+            for tag in self._pending:
+                if tag > method.delivery_tag:
+                    break
+                tags.append(tag)
+        else:
+            tags = [method.delivery_tag]
+
+        for tag in tags:
+            future = self._pending.pop(tag, None)
+            if future is None:
+                logger.warning("Received confirm for unknown delivery tag %s", tag)
+                continue
+
+            if not acked:
+                self._nacked.append(tag)
+
+            if future.done():
+                # Cancelled by the caller, nothing to report.
+                continue
+
+            if acked:
+                future.set_result(None)
+            else:
+                future.set_exception(PublishNackedError([tag]))
+
+        if self._on_settled:
+            self._on_settled()
+
+    def take_nacked(self) -> List[int]:
+        nacked, self._nacked = self._nacked, []
+        return nacked
+
+    def take_failure(self) -> Optional[PublishFailedError]:
+        failure, self._failure = self._failure, None
+        return failure
+
+    def fail_all(self, exc: BaseException) -> None:
+        pending, self._pending = self._pending, OrderedDict()
+        if pending:
+            failed = self._failure.count if self._failure is not None else 0
+            self._failure = PublishFailedError(failed + len(pending), exc)
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(exc)
+
+        if self._on_settled:
+            self._on_settled()
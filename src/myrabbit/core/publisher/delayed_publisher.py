@@ -0,0 +1,202 @@
+import bisect
+import heapq
+import itertools
+import logging
+import threading
+import time
+from collections import Counter
+from typing import List, Optional, Sequence, Set, Tuple
+
+from pika import BasicProperties
+from pika.exceptions import ChannelClosedByBroker
+
+from myrabbit.core.publisher.publisher import OutgoingMessage
+from myrabbit.core.publisher.reconnecting_publisher import PublisherFactory
+
+logger = logging.getLogger(__name__)
+
+# Seconds.
+DEFAULT_BUCKETS = (1, 5, 10, 30, 60, 300, 600, 1800, 3600, 6 * 3600, 24 * 3600)
+
+
+class DelayedPublisher:
+    """Publishes messages after a delay.
+
+    Delayed messages wait in the broker: for every target exchange and delay
+    bucket a queue with ``x-message-ttl`` of the bucket is declared, expired
+    messages are dead-lettered to the target exchange with their original
+    routing key. A delay is rounded up to the closest bucket. Each bucket
+    queue is fed by a fanout exchange of the same name, which keeps the
+    routing key intact.
+
+    The target exchange is checked when its bucket queue is declared,
+    messages to a missing exchange are dropped with a warning and counted
+    per exchange in ``dropped``. If the exchange is deleted while messages
+    wait, e.g. an ``auto_delete`` exchange losing its last binding, the
+    broker drops them silently when they expire, so targets of long delays
+    should be durable exchanges which are not auto-deleted.
+
+    Delays shorter than ``local_threshold`` are kept in a heap in process
+    memory and published by one scheduler thread instead. They are precise,
+    but lost if the process exits before they are due.
+    """
+
+    def __init__(
+        self,
+        publisher_factory: PublisherFactory,
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+        local_threshold: float = 0.0,
+        prefix: str = "myrabbit.delay",
+    ):
+        if not buckets:
+            raise ValueError("At least one delay bucket is required")
+
+        self.publisher_factory = publisher_factory
+        self.buckets = sorted(buckets)
+        self.local_threshold = local_threshold
+        self.prefix = prefix
+
+        self._declared: Set[Tuple[str, int]] = set()
+        self._declare_lock = threading.Lock()
+        self.dropped: Counter = Counter()
+
+        self._heap: List[Tuple[float, int, OutgoingMessage]] = []
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+
+    @property
+    def scheduled(self) -> int:
+        """Number of messages waiting in the local scheduler."""
+        return len(self._heap)
+
+    def publish(
+        self,
+        exchange: str,
+        routing_key: str,
+        message: bytes,
+        properties: Optional[BasicProperties] = None,
+        delay: float = 0.0,
+    ) -> None:
+        outgoing = OutgoingMessage(exchange, routing_key, message, properties)
+        if delay <= 0:
+            self._publish([outgoing])
+        elif delay < self.local_threshold:
+            self._schedule(outgoing, delay)
+        else:
+            self._publish_delayed(outgoing, delay)
+
+    def bucket_for(self, delay: float) -> int:
+        """Return bucket TTL in milliseconds for the delay in seconds."""
+        index = bisect.bisect_left(self.buckets, delay)
+        if index == len(self.buckets):
+            raise ValueError(
+                f"Delay {delay} s is longer than the largest bucket "
+                f"({self.buckets[-1]} s)"
+            )
+        return int(self.buckets[index] * 1000)
+
+    def delay_queue_name(self, exchange: str, ttl_ms: int) -> str:
+        return f"{self.prefix}.{exchange}.{ttl_ms}ms"
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Stop the scheduler, messages scheduled locally are dropped."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+            thread = self._thread
+            if self._heap:
+                logger.warning(
+                    "Dropping %d locally scheduled message(s)", len(self._heap)
+                )
+
+        if thread is not None:
+            thread.join(timeout)
+
+    def _publish_delayed(self, message: OutgoingMessage, delay: float) -> None:
+        ttl_ms = self.bucket_for(delay)
+        name = self._declare(message.exchange, ttl_ms)
+        if name is None:
+            logger.warning(
+                "Can not delay message because exchange does not exist: %s",
+                message.exchange,
+            )
+            self.dropped[message.exchange] += 1
+            return
+        self._publish([message._replace(exchange=name)])
+
+    def _declare(self, exchange: str, ttl_ms: int) -> Optional[str]:
+        """Declare the bucket queue, return None if the exchange is missing."""
+        name = self.delay_queue_name(exchange, ttl_ms)
+        if (exchange, ttl_ms) in self._declared:
+            return name
+
+        with self._declare_lock:
+            if (exchange, ttl_ms) in self._declared:
+                return name
+
+            with self.publisher_factory.get_connection() as connection:
+                channel = connection.channel()
+                if exchange:
+                    try:
+                        channel.exchange_declare(exchange, passive=True)
+                    except ChannelClosedByBroker as e:
+                        if e.reply_code != 404:
+                            raise
+                        return None
+                channel.exchange_declare(name, exchange_type="fanout", durable=True)
+                channel.queue_declare(
+                    name,
+                    durable=True,
+                    arguments={
+                        "x-message-ttl": ttl_ms,
+                        "x-dead-letter-exchange": exchange,
+                    },
+                )
+                channel.queue_bind(name, name)
+            logger.info("Declared delay queue %s", name)
+            self._declared.add((exchange, ttl_ms))
+        return name
+
+    def _publish(self, messages: List[OutgoingMessage]) -> None:
+        with self.publisher_factory.publisher() as publisher:
+            publisher.publish_many(messages)
+
+    def _schedule(self, message: OutgoingMessage, delay: float) -> None:
+        with self._cond:
+            if self._stopping:
+                raise RuntimeError("Delayed publisher is closed")
+            heapq.heappush(
+                self._heap, (time.monotonic() + delay, next(self._counter), message)
+            )
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="myrabbit-delayed-publisher", daemon=True
+                )
+                self._thread.start()
+            self._cond.notify()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._stopping:
+                    timeout = (
+                        self._heap[0][0] - time.monotonic() if self._heap else None
+                    )
+                    if timeout is not None and timeout <= 0:
+                        break
+                    self._cond.wait(timeout)
+
+                if self._stopping:
+                    return
+
+                now = time.monotonic()
+                due = []
+                while self._heap and self._heap[0][0] <= now:
+                    due.append(heapq.heappop(self._heap)[2])
+
+            try:
+                self._publish(due)
+            except Exception:
+                logger.exception("Failed to publish %d delayed message(s)", len(due))
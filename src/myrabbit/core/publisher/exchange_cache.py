@@ -0,0 +1,93 @@
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from pika.adapters.blocking_connection import BlockingChannel
+from pika.exceptions import ChannelClosedByBroker
+
+logger = logging.getLogger(__name__)
+
+_MISSING_EXCHANGE_RE = re.compile(r"no exchange '(.*)' in vhost")
+
+
+def missing_exchange_name(error: ChannelClosedByBroker) -> Optional[str]:
+    """Extract exchange name from 404 ``NOT_FOUND - no exchange 'x' ...`` error."""
+    match = _MISSING_EXCHANGE_RE.search(str(error.reply_text))
+    return match.group(1) if match else None
+
+
+def is_missing_exchange(error: Optional[BaseException], exchange: str) -> bool:
+    """Whether the channel was closed because ``exchange`` does not exist."""
+    if not isinstance(error, ChannelClosedByBroker) or error.reply_code != 404:
+        return False
+    return missing_exchange_name(error) == exchange
+
+
+class ExchangeCache:
+    """Remembers which exchanges exist, shared by publishers of a factory.
+
+    Publishing to a missing exchange makes the broker close the channel, so
+    publishers check unknown exchanges with a passive declare on a separate
+    channel and skip messages to exchanges known to be missing. Knowledge
+    expires after ``ttl`` seconds. With ``auto_declare`` set to
+    ``exchange_declare`` arguments (e.g. ``{"exchange_type": "topic"}``)
+    missing exchanges are declared instead.
+    """
+
+    def __init__(
+        self, ttl: float = 30.0, auto_declare: Optional[Dict[str, Any]] = None
+    ):
+        self.ttl = ttl
+        self.auto_declare = auto_declare
+        self.skipped: Counter = Counter()
+        self.returned: Counter = Counter()
+
+        self._lock = threading.Lock()
+        self._exchanges: Dict[str, Tuple[bool, float]] = {}
+
+    def get(self, exchange: str) -> Optional[bool]:
+        """Return whether exchange exists or ``None`` if it is unknown."""
+        with self._lock:
+            entry = self._exchanges.get(exchange)
+            if entry is None:
+                return None
+            exists, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._exchanges[exchange]
+                return None
+            return exists
+
+    def set(self, exchange: str, exists: bool) -> None:
+        with self._lock:
+            self._exchanges[exchange] = (exists, time.monotonic() + self.ttl)
+
+    def invalidate(self, exchange: Optional[str] = None) -> None:
+        with self._lock:
+            if exchange is None:
+                self._exchanges.clear()
+            else:
+                self._exchanges.pop(exchange, None)
+
+    def check(self, exchange: str, channel: Callable[[], BlockingChannel]) -> bool:
+        """Find out whether exchange exists with a passive declare.
+
+        ``channel`` returns an open channel, the broker closes it when the
+        exchange is missing.
+        """
+        try:
+            channel().exchange_declare(exchange, passive=True)
+        except ChannelClosedByBroker as e:
+            if int(e.reply_code) != 404:
+                raise
+            if self.auto_declare is None:
+                self.set(exchange, False)
+                return False
+
+            channel().exchange_declare(exchange, **self.auto_declare)
+            logger.info("Declared missing exchange %s", exchange)
+
+        self.set(exchange, True)
+        return True
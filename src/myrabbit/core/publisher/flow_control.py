@@ -0,0 +1,36 @@
+import threading
+from typing import Dict, Optional
+
+
+class ConnectionBlockedError(Exception):
+    """Broker blocked the connection because of a memory or disk alarm."""
+
+
+class FlowControl:
+    """Tracks ``connection.blocked`` state of the publishers of a factory.
+
+    Publishers report their connections being blocked and unblocked, the
+    factory is considered blocked while any of them is. Services may check
+    :attr:`is_blocked` to shed load before publishing.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._blocked: Dict[int, str] = {}
+
+    @property
+    def is_blocked(self) -> bool:
+        return bool(self._blocked)
+
+    @property
+    def reason(self) -> Optional[str]:
+        with self._lock:
+            return next(iter(self._blocked.values()), None)
+
+    def set_blocked(self, publisher: object, reason: Optional[str]) -> None:
+        """Record publisher state, ``None`` reason means unblocked."""
+        with self._lock:
+            if reason is None:
+                self._blocked.pop(id(publisher), None)
+            else:
+                self._blocked[id(publisher)] = reason
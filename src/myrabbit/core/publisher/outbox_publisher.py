@@ -0,0 +1,494 @@
+import logging
+import mmap
+import os
+import struct
+import threading
+import zlib
+from collections import Counter
+from concurrent.futures import Future
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import pika
+from pika import BasicProperties
+
+from myrabbit.core.consumer.pika_message import PikaMessage
+from myrabbit.core.publisher.confirms import PublishFailedError, PublishNackedError
+from myrabbit.core.publisher.exchange_cache import is_missing_exchange
+from myrabbit.core.publisher.publisher import BasePublisher, OutgoingMessage
+from myrabbit.core.publisher.reconnecting_publisher import PublisherFactory
+
+logger = logging.getLogger(__name__)
+
+# Record frame: payload length and its crc32, zero length marks the end of data.
+_HEADER = struct.Struct("<II")
+# Record payload: lengths of exchange, routing key and encoded properties.
+_FIELDS = struct.Struct("<HHI")
+_CHECKPOINT = struct.Struct("<QQ")
+
+_SEGMENT_SUFFIX = ".seg"
+_CHECKPOINT_NAME = "checkpoint"
+
+
+class OutboxPosition(NamedTuple):
+    segment: int
+    offset: int
+
+
+def _encode(message: OutgoingMessage) -> bytes:
+    exchange = message.exchange.encode()
+    routing_key = message.routing_key.encode()
+    properties = b"".join((message.properties or BasicProperties()).encode())
+    return b"".join(
+        (
+            _FIELDS.pack(len(exchange), len(routing_key), len(properties)),
+            exchange,
+            routing_key,
+            properties,
+            message.body,
+        )
+    )
+
+
+def _decode(record: bytes) -> OutgoingMessage:
+    exchange_len, routing_key_len, properties_len = _FIELDS.unpack_from(record)
+    routing_key_start = _FIELDS.size + exchange_len
+    properties_start = routing_key_start + routing_key_len
+    body_start = properties_start + properties_len
+
+    exchange = record[_FIELDS.size:routing_key_start].decode()
+    routing_key = record[routing_key_start:properties_start].decode()
+    properties = BasicProperties()
+    properties.decode(record[properties_start:body_start])
+    return OutgoingMessage(exchange, routing_key, record[body_start:], properties)
+
+
+class _Segment:
+    def __init__(self, path: str, size: int):
+        self.path = path
+        exists = os.path.exists(path)
+        self._file = open(path, "r+b" if exists else "w+b")
+        if not exists:
+            self._file.truncate(size)
+        self.mmap = mmap.mmap(self._file.fileno(), 0)
+        self.size = len(self.mmap)
+
+    def read_record(self, offset: int, limit: int) -> Optional[bytes]:
+        """Return record at ``offset`` or ``None`` at the end of valid data."""
+        if offset + _HEADER.size > limit:
+            return None
+        length, crc = _HEADER.unpack_from(self.mmap, offset)
+        start = offset + _HEADER.size
+        end = start + length
+        if length == 0 or end > limit:
+            return None
+        record = self.mmap[start:end]
+        if zlib.crc32(record) != crc:
+            # Torn write of a crashed process.
+            return None
+        return record
+
+    def close(self) -> None:
+        self.mmap.close()
+        self._file.close()
+
+
+class OutboxLog:
+    """Segmented append-only log of outgoing messages on local disk.
+
+    Segments are preallocated files mapped into memory, so appending a
+    message is a memory copy. The position of the last message confirmed by
+    the broker is kept in a checkpoint file and segments before it are
+    deleted. With ``fsync`` every append is flushed to disk, otherwise
+    messages survive process crashes but may be lost on power failure.
+    """
+
+    def __init__(
+        self, directory: str, segment_size: int = 64 * 1024 * 1024, fsync: bool = False
+    ):
+        os.makedirs(directory, exist_ok=True)
+        self._directory = directory
+        self._segment_size = segment_size
+        self._fsync = fsync
+        self._lock = threading.Lock()
+
+        ids = sorted(
+            int(name[: -len(_SEGMENT_SUFFIX)])
+            for name in os.listdir(directory)
+            if name.endswith(_SEGMENT_SUFFIX)
+        )
+        committed = self._load_checkpoint()
+        if committed is None:
+            committed = OutboxPosition(ids[0] if ids else 1, 0)
+
+        self._segments: Dict[int, _Segment] = {}
+        for segment_id in ids:
+            if segment_id < committed.segment:
+                os.remove(self._segment_path(segment_id))
+            else:
+                self._segments[segment_id] = _Segment(
+                    self._segment_path(segment_id), segment_size
+                )
+        if not self._segments:
+            self._segments[committed.segment] = _Segment(
+                self._segment_path(committed.segment), segment_size
+            )
+
+        self._committed = committed
+        self._cursor = committed
+        last = max(self._segments)
+        self._write_pos = OutboxPosition(last, self._scan_end(self._segments[last]))
+        self._pending = sum(1 for _ in self._iter_records(committed, self._write_pos))
+
+    @property
+    def pending(self) -> int:
+        """Number of appended messages that are not committed yet."""
+        return self._pending
+
+    @property
+    def has_unread(self) -> bool:
+        return self._cursor != self._write_pos
+
+    def append(self, message: OutgoingMessage) -> None:
+        record = _encode(message)
+        frame_size = _HEADER.size + len(record)
+
+        with self._lock:
+            segment_id, offset = self._write_pos
+            segment = self._segments[segment_id]
+            if offset + frame_size + _HEADER.size > segment.size:
+                segment_id, offset = segment_id + 1, 0
+                segment = self._segments[segment_id] = _Segment(
+                    self._segment_path(segment_id),
+                    max(self._segment_size, frame_size + _HEADER.size),
+                )
+
+            # Header goes last, readers never see a partially written record.
+            data_start = offset + _HEADER.size
+            end = data_start + len(record)
+            segment.mmap[data_start:end] = record
+            _HEADER.pack_into(segment.mmap, end, 0, 0)
+            segment.mmap[offset:data_start] = _HEADER.pack(
+                len(record), zlib.crc32(record)
+            )
+            if self._fsync:
+                segment.mmap.flush()
+
+            self._write_pos = OutboxPosition(segment_id, end)
+            self._pending += 1
+
+    def read(self, max_count: int) -> List[Tuple[OutboxPosition, OutgoingMessage]]:
+        """Read next messages, each with the position right after it."""
+        with self._lock:
+            write_pos = self._write_pos
+        batch = []
+        for position, record in self._iter_records(self._cursor, write_pos):
+            batch.append((position, _decode(record)))
+            if len(batch) >= max_count:
+                break
+        if batch:
+            self._cursor = batch[-1][0]
+        return batch
+
+    def rewind(self) -> None:
+        """Read again starting from the last committed message."""
+        self._cursor = self._committed
+
+    def commit(self, position: OutboxPosition, count: int) -> None:
+        """Mark ``count`` messages up to ``position`` as delivered."""
+        self._save_checkpoint(position)
+        with self._lock:
+            self._committed = position
+            self._pending -= count
+            obsolete = [s for s in self._segments if s < position.segment]
+            segments = [self._segments.pop(s) for s in obsolete]
+
+        for segment in segments:
+            segment.close()
+            os.remove(segment.path)
+
+    def close(self) -> None:
+        with self._lock:
+            segments, self._segments = self._segments, {}
+        for segment in segments.values():
+            segment.mmap.flush()
+            segment.close()
+
+    def _iter_records(
+        self, start: OutboxPosition, stop: OutboxPosition
+    ) -> Iterable[Tuple[OutboxPosition, bytes]]:
+        segment_id, offset = start
+        while segment_id <= stop.segment:
+            with self._lock:
+                segment = self._segments.get(segment_id)
+            if segment is None:
+                return
+
+            limit = stop.offset if segment_id == stop.segment else segment.size
+            record = segment.read_record(offset, limit)
+            if record is None:
+                segment_id, offset = segment_id + 1, 0
+                continue
+
+            offset += _HEADER.size + len(record)
+            yield OutboxPosition(segment_id, offset), record
+
+    def _scan_end(self, segment: _Segment) -> int:
+        offset = 0
+        while True:
+            record = segment.read_record(offset, segment.size)
+            if record is None:
+                return offset
+            offset += _HEADER.size + len(record)
+
+    def _segment_path(self, segment_id: int) -> str:
+        return os.path.join(self._directory, f"{segment_id:010d}{_SEGMENT_SUFFIX}")
+
+    def _load_checkpoint(self) -> Optional[OutboxPosition]:
+        try:
+            with open(os.path.join(self._directory, _CHECKPOINT_NAME), "rb") as f:
+                return OutboxPosition(*_CHECKPOINT.unpack(f.read(_CHECKPOINT.size)))
+        except FileNotFoundError:
+            return None
+
+    def _save_checkpoint(self, position: OutboxPosition) -> None:
+        path = os.path.join(self._directory, _CHECKPOINT_NAME)
+        with open(path + ".tmp", "wb") as f:
+            f.write(_CHECKPOINT.pack(*position))
+            if self._fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(path + ".tmp", path)
+
+
+class OutboxPublisher(BasePublisher):
+    """Publisher that appends messages to the factory outbox log."""
+
+    def __init__(self, factory: "OutboxPublisherFactory"):
+        self._factory = factory
+
+    def publish(
+        self,
+        exchange: str,
+        routing_key: str,
+        message: bytes,
+        properties: Optional[BasicProperties] = None,
+    ) -> Optional["Future[None]"]:
+        self._factory.append(
+            [OutgoingMessage(exchange, routing_key, message, properties)]
+        )
+        return None
+
+    def publish_many(
+        self, messages: Iterable[OutgoingMessage], burst_size: int = 1000
+    ) -> List[Optional["Future[None]"]]:
+        batch = list(messages)
+        self._factory.append(batch)
+        return [None] * len(batch)
+
+    def rpc(
+        self,
+        exchange: str,
+        routing_key: str,
+        message: bytes,
+        properties: Optional[BasicProperties] = None,
+        timeout: Optional[int] = 1,
+    ) -> PikaMessage:
+        # Replies need a live broker, rpc is not buffered.
+        with self._factory.publisher_factory.publisher() as publisher:
+            return publisher.rpc(exchange, routing_key, message, properties, timeout)
+
+    def close(self) -> None:
+        pass
+
+
+class OutboxPublisherFactory(PublisherFactory):
+    """Publisher factory that stores messages in a local outbox first.
+
+    Publishing appends messages to an :class:`OutboxLog` in ``directory``
+    and never touches the network, so it keeps working while the broker is
+    unavailable. A drainer thread replays the log in order through
+    ``publisher_factory`` and commits messages once the broker confirmed
+    them, which requires ``publisher_factory`` to use ``confirm_delivery``.
+    Delivery is at-least-once: unconfirmed messages are sent again.
+    Messages left on disk by a stopped process are sent on the next start.
+
+    Messages that can not be delivered do not block the ones after them.
+    Messages to a missing exchange, skipped by the publisher (exchange cache
+    or rate limiter) or nacked by the broker ``max_attempts`` times are
+    dropped with a warning and counted per exchange in ``dropped``.
+    """
+
+    def __init__(
+        self,
+        publisher_factory: PublisherFactory,
+        directory: str,
+        segment_size: int = 64 * 1024 * 1024,
+        fsync: bool = False,
+        batch_size: int = 500,
+        retry_delay: float = 1.0,
+        idle_interval: float = 1.0,
+        max_attempts: int = 5,
+    ):
+        if not publisher_factory.confirm_delivery:
+            raise ValueError("Outbox requires a publisher factory with confirm_delivery")
+
+        self.publisher_factory = publisher_factory
+        self.log = OutboxLog(directory, segment_size, fsync)
+        self._batch_size = batch_size
+        self._retry_delay = retry_delay
+        self._idle_interval = idle_interval
+        self._max_attempts = max_attempts
+        self.dropped: Counter = Counter()
+
+        self._cond = threading.Condition()
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+        self._publisher: Optional[BasePublisher] = None
+
+        if self.log.pending:
+            logger.info("Replaying %d message(s) from outbox", self.log.pending)
+            with self._cond:
+                self._ensure_started()
+
+    def get_connection(self) -> pika.BlockingConnection:
+        return self.publisher_factory.get_connection()
+
+    def publisher(self) -> BasePublisher:
+        return OutboxPublisher(self)
+
+    def append(self, messages: List[OutgoingMessage]) -> None:
+        if self._stopping:
+            raise RuntimeError("Outbox publisher is closed")
+
+        for message in messages:
+            self.log.append(message)
+
+        with self._cond:
+            self._ensure_started()
+            self._cond.notify()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every message in the outbox is confirmed by the broker."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self.log.pending == 0, timeout)
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Stop the drainer, undelivered messages stay in the outbox."""
+        with self._cond:
+            if self._stopping:
+                return
+            self._stopping = True
+            self._cond.notify_all()
+            thread = self._thread
+
+        if thread is not None:
+            thread.join(timeout)
+        if thread is None or not thread.is_alive():
+            self.log.close()
+
+    def _ensure_started(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="myrabbit-outbox-drainer", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            batch = self.log.read(self._batch_size)
+            if batch:
+                self._send(batch)
+                continue
+
+            with self._cond:
+                if self._stopping:
+                    break
+                if not self.log.has_unread:
+                    self._cond.wait(self._idle_interval)
+
+        self._close_publisher()
+
+    def _send(self, batch: List[Tuple[OutboxPosition, OutgoingMessage]]) -> None:
+        settled = [False] * len(batch)
+        nacks = [0] * len(batch)
+        committed = 0
+        while True:
+            unsettled = [i for i in range(committed, len(batch)) if not settled[i]]
+            futures: List[Optional["Future[None]"]] = []
+            try:
+                if self._publisher is None:
+                    self._publisher = self.publisher_factory.publisher()
+                futures = self._publisher.publish_many(batch[i][1] for i in unsettled)
+                self._publisher.wait_for_confirms()
+            except (PublishFailedError, PublishNackedError):
+                # Settled per message below, the publisher reopens its channel.
+                pass
+            except Exception:
+                logger.warning(
+                    "Outbox failed to publish %d message(s)",
+                    len(unsettled),
+                    exc_info=True,
+                )
+                self._close_publisher()
+
+            for i, future in zip(unsettled, futures):
+                message = batch[i][1]
+                if future is None:
+                    self._drop(message, "skipped by publisher")
+                elif not future.done():
+                    continue
+                elif future.exception() is None:
+                    settled[i] = True
+                    continue
+                elif is_missing_exchange(future.exception(), message.exchange):
+                    self._drop(message, "exchange does not exist")
+                elif isinstance(future.exception(), PublishNackedError):
+                    nacks[i] += 1
+                    if nacks[i] < self._max_attempts:
+                        continue
+                    self._drop(message, f"nacked {nacks[i]} time(s)")
+                else:
+                    # Channel or connection failure, sent again.
+                    continue
+                settled[i] = True
+
+            # Messages are committed in order, up to the first unsettled one.
+            confirmed = committed
+            while confirmed < len(batch) and settled[confirmed]:
+                confirmed += 1
+            if confirmed > committed:
+                self.log.commit(batch[confirmed - 1][0], confirmed - committed)
+                committed = confirmed
+                with self._cond:
+                    self._cond.notify_all()
+            if committed == len(batch):
+                return
+
+            logger.warning(
+                "Outbox retries %d unconfirmed message(s) in %s s",
+                settled.count(False),
+                self._retry_delay,
+            )
+            with self._cond:
+                if self._stopping:
+                    self.log.rewind()
+                    return
+                self._cond.wait(self._retry_delay)
+
+    def _drop(self, message: OutgoingMessage, reason: str) -> None:
+        logger.warning(
+            "Outbox dropped message to %s with routing key %s: %s",
+            message.exchange,
+            message.routing_key,
+            reason,
+        )
+        self.dropped[message.exchange] += 1
+
+    def _close_publisher(self) -> None:
+        publisher, self._publisher = self._publisher, None
+        if publisher is None:
+            return
+        try:
+            publisher.close()
+        except Exception:
+            logger.debug("Error while closing outbox publisher", exc_info=True)
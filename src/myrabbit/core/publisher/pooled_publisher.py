@@ -0,0 +1,189 @@
+import logging
+import threading
+import time
+from typing import Any, List, Optional
+
+import pika
+from pika.exceptions import AMQPError
+
+from myrabbit.core.publisher import Publisher
+from myrabbit.core.publisher.reconnecting_publisher import ReconnectingPublisherFactory
+
+logger = logging.getLogger(__name__)
+
+
+class PoolExhaustedError(Exception):
+    pass
+
+
+class PooledPublisher(Publisher):
+    """Publisher that goes back to its pool instead of closing the connection."""
+
+    def __init__(
+        self,
+        connection: pika.BlockingConnection,
+        pool: "PooledPublisherFactory",
+        **kwargs: Any,
+    ):
+        super().__init__(connection, **kwargs)
+        self._pool = pool
+
+    def close(self) -> None:
+        try:
+            if self.is_open:
+                self.wait_for_confirms()
+        finally:
+            self._pool.release(self)
+
+    def dispose(self) -> None:
+        if self._flow_control is not None:
+            self._flow_control.set_blocked(self, None)
+        try:
+            if self._connection.is_open:
+                self._connection.close()
+        except AMQPError:
+            logger.debug("Error while closing pooled publisher", exc_info=True)
+
+
+class PooledPublisherFactory(ReconnectingPublisherFactory):
+    """Publisher factory that keeps long-lived connections and channels.
+
+    Each publisher owns one connection and is checked out by a single thread
+    at a time, so the pool is safe to share between threads. Leaving the
+    ``with factory.publisher()`` block returns the publisher to the pool,
+    in confirm mode after all its messages are confirmed.
+
+    A channel closed by the broker, e.g. by a publish to a missing exchange,
+    is reopened by the next publish of the same block. Without confirms the
+    messages published after the failing one until the publisher notices
+    the closed channel are lost, which is logged.
+    """
+
+    def __init__(
+        self,
+        amqp_url: str,
+        max_size: int = 8,
+        min_size: int = 0,
+        acquire_timeout: Optional[float] = None,
+        **kwargs: Any,
+    ):
+        super().__init__(amqp_url, **kwargs)
+        if max_size < 1 or not 0 <= min_size <= max_size:
+            raise ValueError(f"Invalid pool size: min={min_size}, max={max_size}")
+
+        self._max_size = max_size
+        self._min_size = min_size
+        self._acquire_timeout = acquire_timeout
+
+        # Idle publishers are reused LIFO so that rarely used connections
+        # stay idle and the hot ones keep their TCP windows warm.
+        self._idle: List[PooledPublisher] = []
+        self._size = 0
+        self._cond = threading.Condition()
+        self._closed = False
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    @property
+    def idle(self) -> int:
+        return len(self._idle)
+
+    def publisher(self) -> Publisher:
+        return self.acquire()
+
+    def warm(self, size: Optional[int] = None) -> None:
+        """Open publishers up front so first publishes skip the handshake."""
+        target = min(self._min_size if size is None else size, self._max_size)
+        while True:
+            with self._cond:
+                if self._size >= target:
+                    break
+                self._size += 1
+            self.release(self._create())
+
+        logger.info("Publisher pool warmed up to %d connections", self._size)
+
+    def acquire(self) -> PooledPublisher:
+        while True:
+            publisher = self._checkout()
+            if publisher is None:
+                return self._create()
+            if self._revive(publisher):
+                return publisher
+
+    def release(self, publisher: PooledPublisher) -> None:
+        if self._closed or not publisher._connection.is_open:
+            self._discard(publisher)
+            return
+
+        with self._cond:
+            self._idle.append(publisher)
+            self._cond.notify()
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+
+        for publisher in idle:
+            self._discard(publisher)
+
+    def _checkout(self) -> Optional[PooledPublisher]:
+        """Take an idle publisher or reserve a slot for a new one (``None``)."""
+        deadline = (
+            None
+            if self._acquire_timeout is None
+            else time.monotonic() + self._acquire_timeout
+        )
+
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Publisher pool is closed")
+
+                if self._idle:
+                    return self._idle.pop()
+
+                if self._size < self._max_size:
+                    self._size += 1
+                    return None
+
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise PoolExhaustedError(
+                        f"No publisher available within {self._acquire_timeout} s "
+                        f"(pool size {self._max_size})"
+                    )
+                self._cond.wait(remaining)
+
+    def _create(self) -> PooledPublisher:
+        try:
+            return PooledPublisher(
+                self.get_connection(), self, **self._publisher_kwargs()
+            )
+        except Exception:
+            self._free_slot()
+            raise
+
+    def _revive(self, publisher: PooledPublisher) -> bool:
+        try:
+            # Idle connections do not answer heartbeats, this both
+            # services them and detects connections dropped by the broker.
+            publisher.process_data_events()
+            publisher.reopen_channel()
+        except AMQPError:
+            logger.info("Dropping dead pooled publisher connection", exc_info=True)
+            self._discard(publisher)
+            return False
+        return True
+
+    def _discard(self, publisher: PooledPublisher) -> None:
+        publisher.dispose()
+        self._free_slot()
+
+    def _free_slot(self) -> None:
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
@@ -1,27 +1,42 @@
 from __future__ import annotations
 
+import abc
 import logging
+import time
+from concurrent.futures import Future
 from contextlib import contextmanager
 from functools import wraps
 from types import TracebackType
-from typing import Any, Callable, Generator, Optional, Type
+from typing import Any, Callable, Generator, Iterable, List, NamedTuple, Optional, Type
 
 import pika
+import pika.connection
+import pika.frame
 from pika import BasicProperties, URLParameters
 from pika.adapters.blocking_connection import BlockingChannel
+from pika.channel import Channel
 from pika.exceptions import ChannelClosedByBroker
+from pika.spec import Basic
 
 from myrabbit.core.consumer.pika_message import PikaMessage
+from myrabbit.core.publisher.confirms import ConfirmTracker, PublishNackedError
+from myrabbit.core.publisher.exchange_cache import ExchangeCache, missing_exchange_name
+from myrabbit.core.publisher.flow_control import ConnectionBlockedError, FlowControl
+from myrabbit.core.publisher.rate_limit import RateLimiter
 from myrabbit.core.publisher.rpc import rpc
 
 logger = logging.getLogger(__name__)
 
 
+def _noop() -> None:
+    pass
+
+
 def ignore_missing_exchange(fn: Callable) -> Callable:
     @wraps(fn)
-    def handle(*args: Any, **kwargs: Any) -> Any:
+    def handle(self: Publisher, *args: Any, **kwargs: Any) -> Any:
         try:
-            return fn(*args, **kwargs)
+            return fn(self, *args, **kwargs)
         except ChannelClosedByBroker as e:
             if int(e.reply_code) == 404:
                 logger.warning(
@@ -29,34 +44,40 @@ def ignore_missing_exchange(fn: Callable) -> Callable:
                     e.reply_code,
                     e.reply_text,
                 )
+                self._on_missing_exchange(e)
             else:
                 raise
 
     return handle
 
 
-class Publisher:
-    def __init__(self, connection: pika.BlockingConnection):
-        self._connection = connection
-        self._channel: BlockingChannel = self._connection.channel()
+class OutgoingMessage(NamedTuple):
+    exchange: str
+    routing_key: str
+    body: bytes
+    properties: Optional[BasicProperties] = None
 
-    @ignore_missing_exchange
+
+class BasePublisher(abc.ABC):
+    @abc.abstractmethod
     def publish(
         self,
         exchange: str,
         routing_key: str,
         message: bytes,
         properties: Optional[BasicProperties] = None,
-    ) -> None:
-        self._channel.basic_publish(
-            exchange, routing_key, message, properties,
-        )
+    ) -> Optional[Future[None]]:
+        pass
 
-    @ignore_missing_exchange
-    def close(self) -> None:
-        self._channel.close()
-        self._connection.close()
+    def publish_many(
+        self, messages: Iterable[OutgoingMessage], burst_size: int = 1000
+    ) -> List[Optional[Future[None]]]:
+        return [self.publish(*message) for message in messages]
+
+    def wait_for_confirms(self, timeout: Optional[float] = None) -> None:
+        pass
 
+    @abc.abstractmethod
     def rpc(
         self,
         exchange: str,
@@ -65,11 +86,13 @@ class Publisher:
         properties: Optional[BasicProperties] = None,
         timeout: Optional[int] = 1,
     ) -> PikaMessage:
-        return rpc(
-            self._connection, exchange, routing_key, message, properties, timeout
-        )
+        pass
 
-    def __enter__(self) -> Publisher:
+    @abc.abstractmethod
+    def close(self) -> None:
+        pass
+
+    def __enter__(self) -> BasePublisher:
         return self
 
     def __exit__(
@@ -81,8 +104,374 @@ class Publisher:
         self.close()
 
 
+class Publisher(BasePublisher):
+    """Publishes messages over a channel of a blocking connection.
+
+    ``publish_timeout`` limits how long a publish waits for the broker to
+    unblock the connection (``ConnectionBlockedError``) or to free the
+    confirm window (``TimeoutError``). ``0`` fails fast, ``None`` waits.
+    """
+
+    def __init__(
+        self,
+        connection: pika.BlockingConnection,
+        confirm_delivery: bool = False,
+        confirm_window: int = 1024,
+        exchange_cache: Optional[ExchangeCache] = None,
+        mandatory: bool = False,
+        publish_timeout: Optional[float] = None,
+        flow_control: Optional[FlowControl] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+    ):
+        self._connection = connection
+        self._confirm_delivery = confirm_delivery
+        self._confirm_window = confirm_window
+        self._exchange_cache = exchange_cache
+        self._mandatory = mandatory
+        self._publish_timeout = publish_timeout
+        self._flow_control = flow_control
+        self._rate_limiter = rate_limiter
+        self._blocked_reason: Optional[str] = None
+        self._confirms: Optional[ConfirmTracker] = None
+        self._waiting = False
+        self._probe_channel: Optional[BlockingChannel] = None
+        self._channel: BlockingChannel = self._open_channel()
+
+        connection.add_on_connection_blocked_callback(self._on_blocked)
+        connection.add_on_connection_unblocked_callback(self._on_unblocked)
+
+    @ignore_missing_exchange
+    def publish(
+        self,
+        exchange: str,
+        routing_key: str,
+        message: bytes,
+        properties: Optional[BasicProperties] = None,
+    ) -> Optional[Future[None]]:
+        """Publish message.
+
+        In confirm mode returns a future which is resolved when the broker
+        confirms the message. Futures are resolved while the publisher does
+        I/O, e.g. in subsequent publishes or in :meth:`wait_for_confirms`.
+        Messages to exchanges known to be missing and messages dropped by
+        the rate limiter are skipped.
+        """
+        if not self._should_publish(exchange, routing_key):
+            return None
+
+        self._check_blocked()
+        if self._confirms is None:
+            try:
+                self._channel.basic_publish(
+                    exchange, routing_key, message, properties, self._mandatory
+                )
+            except ChannelClosedByBroker as e:
+                # Closed because of an earlier message, this one is lost too.
+                if missing_exchange_name(e) != exchange:
+                    logger.warning(
+                        "Message to %s was lost, channel was closed by broker: %s",
+                        exchange,
+                        e.reply_text,
+                    )
+                raise
+            return None
+
+        confirms = self._confirms
+        if confirms.is_full:
+            self._wait_for_window(confirms)
+
+        future: Future[None] = confirms.track()
+        self._channel.basic_publish(
+            exchange, routing_key, message, properties, self._mandatory
+        )
+        return future
+
+    def publish_many(
+        self, messages: Iterable[OutgoingMessage], burst_size: int = 1000
+    ) -> List[Optional[Future[None]]]:
+        """Publish messages writing them to the socket in bursts.
+
+        Unlike :meth:`publish` output is not flushed after every message but
+        once per ``burst_size`` messages, so large batches need few syscalls.
+        Returns a confirm future per message in confirm mode.
+        """
+        futures: List[Optional[Future[None]]] = []
+
+        for count, message in enumerate(messages, start=1):
+            if not self._should_publish(message.exchange, message.routing_key):
+                futures.append(None)
+                continue
+
+            self._check_blocked()
+            # The channel is reopened with a new tracker if the broker closed it.
+            confirms = self._confirms
+            if confirms is None:
+                futures.append(None)
+            else:
+                if confirms.is_full:
+                    self._wait_for_window(confirms)
+                futures.append(confirms.track())
+
+            self._channel._impl.basic_publish(*message, mandatory=self._mandatory)
+
+            if count % burst_size == 0:
+                self._flush()
+
+        self._flush()
+        return futures
+
+    def wait_for_confirms(self, timeout: Optional[float] = None) -> None:
+        """Block until every published message is confirmed by the broker.
+
+        :raises PublishNackedError: if the broker rejected any of the messages
+            published since the previous call.
+        :raises PublishFailedError: if the channel was closed before messages
+            were confirmed, e.g. by publishing to a missing exchange.
+        :raises TimeoutError: if confirms did not arrive in time.
+        """
+        confirms = self._confirms
+        if confirms is None:
+            return
+
+        if not self._wait_for(lambda: confirms.outstanding == 0, timeout):
+            raise TimeoutError(
+                f"{confirms.outstanding} message(s) were not confirmed "
+                f"within {timeout} s"
+            )
+
+        failure = confirms.take_failure()
+        if failure is not None:
+            reason = failure.reason
+            if isinstance(reason, ChannelClosedByBroker) and reason.reply_code == 404:
+                self._on_missing_exchange(reason)
+            raise failure
+
+        nacked = confirms.take_nacked()
+        if nacked:
+            raise PublishNackedError(nacked)
+
+    @property
+    def is_open(self) -> bool:
+        return bool(self._connection.is_open and self._channel.is_open)
+
+    @property
+    def is_blocked(self) -> bool:
+        """Whether the broker blocked the connection (memory or disk alarm)."""
+        return self._blocked_reason is not None
+
+    def wait_until_unblocked(self, timeout: Optional[float] = None) -> bool:
+        """Process I/O until the connection is unblocked or timeout passes."""
+        if self._blocked_reason is not None:
+            self.process_data_events()
+        return self._wait_for(lambda: self._blocked_reason is None, timeout)
+
+    def reopen_channel(self) -> None:
+        """Open a new channel if the current one was closed by the broker."""
+        if not self._channel.is_open:
+            self._channel = self._open_channel()
+        if self._probe_channel is not None and not self._probe_channel.is_open:
+            self._probe_channel = None
+
+    def process_data_events(self) -> None:
+        """Process pending I/O without blocking.
+
+        Services heartbeats and surfaces connection errors for idle publishers.
+        """
+        self._connection.process_data_events(time_limit=0)
+
+    @ignore_missing_exchange
+    def close(self) -> None:
+        try:
+            if self._confirms is not None and self.is_open:
+                self.wait_for_confirms()
+        finally:
+            if self._flow_control is not None:
+                self._flow_control.set_blocked(self, None)
+            if self._channel.is_open:
+                self._channel.close()
+            self._connection.close()
+
+    def _open_channel(self) -> BlockingChannel:
+        channel = self._connection.channel()
+        if self._confirm_delivery:
+            self._enable_confirms(channel)
+        if self._mandatory:
+            channel._impl.add_on_return_callback(self._on_return)
+        return channel
+
+    def _check_blocked(self) -> None:
+        if self._blocked_reason is None or self._publish_timeout is None:
+            return
+        if not self.wait_until_unblocked(self._publish_timeout):
+            raise ConnectionBlockedError(
+                f"Connection is blocked by broker: {self._blocked_reason}"
+            )
+
+    def _wait_for_window(self, confirms: ConfirmTracker) -> None:
+        if not self._wait_for(lambda: not confirms.is_full, self._publish_timeout):
+            raise TimeoutError(
+                f"Confirm window is still full after {self._publish_timeout} s"
+            )
+
+    def _on_blocked(
+        self,
+        _connection: pika.connection.Connection,
+        frame: pika.frame.Method,
+    ) -> None:
+        self._blocked_reason = str(frame.method.reason)
+        logger.warning("Connection is blocked by broker: %s", self._blocked_reason)
+        if self._flow_control is not None:
+            self._flow_control.set_blocked(self, self._blocked_reason)
+        self._wake()
+
+    def _on_unblocked(
+        self,
+        _connection: pika.connection.Connection,
+        _frame: pika.frame.Method,
+    ) -> None:
+        logger.info("Connection is unblocked by broker")
+        self._blocked_reason = None
+        if self._flow_control is not None:
+            self._flow_control.set_blocked(self, None)
+        self._wake()
+
+    def _ensure_channel(self) -> None:
+        if self._connection.is_open and not self._channel.is_open:
+            if self._confirms is None:
+                # Without confirms nothing tells which messages were dropped.
+                logger.warning(
+                    "Reopening publisher channel closed by broker, messages "
+                    "published since it was closed are lost"
+                )
+            else:
+                logger.info("Reopening publisher channel closed by broker")
+            self._channel = self._open_channel()
+
+    def _should_publish(self, exchange: str, routing_key: str) -> bool:
+        if not self._exchange_exists(exchange):
+            return False
+        return self._rate_limiter is None or self._rate_limiter.acquire(
+            exchange, routing_key
+        )
+
+    def _exchange_exists(self, exchange: str) -> bool:
+        self._ensure_channel()
+
+        cache = self._exchange_cache
+        if cache is None or not exchange:
+            return True
+
+        exists = cache.get(exchange)
+        if exists is None:
+            exists = cache.check(exchange, self._get_probe_channel)
+        if not exists:
+            cache.skipped[exchange] += 1
+            logger.debug("Skipping message to missing exchange %s", exchange)
+        return exists
+
+    def _get_probe_channel(self) -> BlockingChannel:
+        # Passive declares of missing exchanges close the channel, they
+        # are made on a separate one to keep the publishing channel alive.
+        if self._probe_channel is None or not self._probe_channel.is_open:
+            self._probe_channel = self._connection.channel()
+        return self._probe_channel
+
+    def _on_missing_exchange(self, error: ChannelClosedByBroker) -> None:
+        exchange = missing_exchange_name(error)
+        if self._exchange_cache is not None and exchange is not None:
+            self._exchange_cache.set(exchange, False)
+        if self._connection.is_open:
+            self._ensure_channel()
+
+    def _on_return(
+        self,
+        _channel: Channel,
+        method: Basic.Return,
+        _properties: BasicProperties,
+        _body: bytes,
+    ) -> None:
+        logger.debug(
+            "Message to %s with routing key %s was returned: %s",
+            method.exchange,
+            method.routing_key,
+            method.reply_text,
+        )
+        if self._exchange_cache is not None:
+            self._exchange_cache.returned[method.exchange] += 1
+
+    def _enable_confirms(self, channel: BlockingChannel) -> None:
+        # BlockingChannel.confirm_delivery() makes every basic_publish wait for
+        # its confirm, so confirms are tracked on the underlying channel instead
+        # and many messages can be in flight at once.
+        confirms = ConfirmTracker(self._confirm_window, on_settled=self._wake)
+        selected = False
+
+        def on_select_ok(_frame: pika.frame.Method) -> None:
+            nonlocal selected
+            selected = True
+            self._wake()
+
+        channel._impl.confirm_delivery(
+            ack_nack_callback=confirms.on_confirm, callback=on_select_ok
+        )
+        channel._impl.add_on_close_callback(
+            lambda _channel, reason: confirms.fail_all(reason)
+        )
+        self._wait_for(lambda: selected)
+        self._confirms = confirms
+
+    def _flush(self) -> None:
+        # With zero time limit pika writes out everything buffered and returns.
+        self._connection.process_data_events(time_limit=0)
+
+    def _wait_for(
+        self, predicate: Callable[[], bool], timeout: Optional[float] = None
+    ) -> bool:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        self._waiting = True
+        try:
+            while not predicate():
+                if deadline is None:
+                    self._connection.process_data_events(time_limit=None)
+                    continue
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._connection.process_data_events(time_limit=remaining)
+        finally:
+            self._waiting = False
+        return True
+
+    def _wake(self) -> None:
+        # Frames handled by the underlying channel do not interrupt
+        # process_data_events, a no-op callback does.
+        if self._waiting:
+            self._connection.add_callback_threadsafe(_noop)
+
+    def rpc(
+        self,
+        exchange: str,
+        routing_key: str,
+        message: bytes,
+        properties: Optional[BasicProperties] = None,
+        timeout: Optional[int] = 1,
+    ) -> PikaMessage:
+        """Make a call over the connection of the publisher.
+
+        The connection belongs to the calling thread, so the reply is awaited
+        on it. :class:`RpcClient` multiplexes many calls over its own one.
+        """
+        return rpc(
+            self._connection, exchange, routing_key, message, properties, timeout
+        )
+
+
 @contextmanager
-def make_publisher(amqp_url: str) -> Generator[Publisher, None, None]:
+def make_publisher(
+    amqp_url: str, confirm_delivery: bool = False
+) -> Generator[Publisher, None, None]:
     with pika.BlockingConnection(URLParameters(amqp_url)) as conn:
-        with Publisher(conn) as p:
-            yield p
+        publisher = Publisher(conn, confirm_delivery=confirm_delivery)
+        with publisher:
+            yield publisher
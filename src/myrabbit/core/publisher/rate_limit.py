@@ -0,0 +1,165 @@
+import fnmatch
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from enum import Enum
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitMode(Enum):
+    BLOCK = "block"
+    DROP = "drop"
+    RAISE = "raise"
+
+
+class RateLimitExceeded(Exception):
+    pass
+
+
+@dataclass
+class RateLimit:
+    """Token bucket for messages matching ``exchange`` and ``routing_key``.
+
+    Patterns use ``fnmatch`` syntax. ``rate`` is messages per second and
+    ``burst`` the bucket capacity (``rate`` by default, at least one
+    message). In ``BLOCK`` mode publishers wait for a token, but not longer
+    than ``max_wait`` if set.
+    """
+
+    rate: float
+    exchange: str = "*"
+    routing_key: str = "*"
+    burst: Optional[float] = None
+    mode: RateLimitMode = RateLimitMode.BLOCK
+    max_wait: Optional[float] = None
+
+    @property
+    def name(self) -> str:
+        return f"{self.exchange}:{self.routing_key}"
+
+    def matches(self, exchange: str, routing_key: str) -> bool:
+        return fnmatch.fnmatchcase(exchange, self.exchange) and fnmatch.fnmatchcase(
+            routing_key, self.routing_key
+        )
+
+
+@dataclass
+class RateLimitStats:
+    allowed: int = 0
+    throttled: int = 0
+    dropped: int = 0
+    rejected: int = 0
+    throttled_time: float = 0.0
+
+
+class _TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self._rate = rate
+        self._capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self, max_wait: Optional[float]) -> Optional[float]:
+        """Take a token, return how long to wait for it.
+
+        The token is reserved if the wait is within ``max_wait``, otherwise
+        nothing is taken and ``None`` is returned.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self._capacity, self._tokens + (now - self._updated) * self._rate
+            )
+            self._updated = now
+
+            wait = max(0.0, (1 - self._tokens) / self._rate)
+            if max_wait is not None and wait > max_wait:
+                return None
+            # Tokens may go negative, waiting threads are served in order.
+            self._tokens -= 1
+            return wait
+
+
+class RateLimiter:
+    """Client-side publish rate limiter shared by threads of a process.
+
+    The first :class:`RateLimit` matching a message applies to it, messages
+    matching no limit are not limited. A limit has one bucket shared by all
+    messages it matches.
+    """
+
+    def __init__(self, limits: List[RateLimit]):
+        self.limits = limits
+        self._buckets = [
+            # Buckets smaller than a token would never allow a message.
+            _TokenBucket(limit.rate, max(1.0, limit.burst or limit.rate))
+            for limit in limits
+        ]
+        self._stats = {limit.name: RateLimitStats() for limit in limits}
+        self._stats_lock = threading.Lock()
+        self._matches: Dict[Tuple[str, str], Optional[int]] = {}
+
+    def acquire(self, exchange: str, routing_key: str) -> bool:
+        """Wait for permission to publish, return ``False`` to drop the message.
+
+        :raises RateLimitExceeded: for limits in ``RAISE`` mode and for
+            ``BLOCK`` limits when the wait would exceed ``max_wait``.
+        """
+        index = self._match(exchange, routing_key)
+        if index is None:
+            return True
+
+        limit = self.limits[index]
+        max_wait = 0.0 if limit.mode is not RateLimitMode.BLOCK else limit.max_wait
+        wait = self._buckets[index].take(max_wait)
+
+        if wait is None:
+            if limit.mode is RateLimitMode.DROP:
+                self._count(limit, "dropped")
+                logger.debug("Rate limit %s dropped message", limit.name)
+                return False
+            self._count(limit, "rejected")
+            raise RateLimitExceeded(
+                f"Publish rate limit {limit.rate}/s exceeded for {limit.name}"
+            )
+
+        if wait > 0:
+            self._count(limit, "throttled", wait)
+            time.sleep(wait)
+        else:
+            self._count(limit, "allowed")
+        return True
+
+    def stats(self) -> Dict[str, RateLimitStats]:
+        with self._stats_lock:
+            return {name: RateLimitStats(**vars(s)) for name, s in self._stats.items()}
+
+    def _match(self, exchange: str, routing_key: str) -> Optional[int]:
+        key = (exchange, routing_key)
+        try:
+            return self._matches[key]
+        except KeyError:
+            pass
+
+        index = next(
+            (
+                i
+                for i, limit in enumerate(self.limits)
+                if limit.matches(exchange, routing_key)
+            ),
+            None,
+        )
+        if len(self._matches) > 10000:
+            self._matches.clear()
+        self._matches[key] = index
+        return index
+
+    def _count(self, limit: RateLimit, counter: str, wait: float = 0.0) -> None:
+        with self._stats_lock:
+            stats = self._stats[limit.name]
+            setattr(stats, counter, getattr(stats, counter) + 1)
+            stats.throttled_time += wait
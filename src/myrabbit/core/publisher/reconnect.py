@@ -0,0 +1,166 @@
+import logging
+import random
+import threading
+import time
+from dataclasses import dataclass
+from enum import Enum
+from typing import Callable, Iterator, Tuple, Type, TypeVar
+
+from pika.exceptions import AMQPConnectionError
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+@dataclass
+class RetryPolicy:
+    """Exponential backoff with jitter for connection attempts.
+
+    Delays grow from ``initial_delay`` by ``multiplier`` up to ``max_delay``
+    and each one is reduced by a random part of up to ``jitter``, so that
+    many clients do not reconnect in lockstep.
+    """
+
+    max_attempts: int = 1
+    initial_delay: float = 0.1
+    max_delay: float = 10.0
+    multiplier: float = 2.0
+    jitter: float = 0.5
+    retry_on: Tuple[Type[BaseException], ...] = (AMQPConnectionError,)
+
+    def delays(self) -> Iterator[float]:
+        for attempt in range(self.max_attempts - 1):
+            delay = min(self.max_delay, self.initial_delay * self.multiplier ** attempt)
+            yield delay * (1 - self.jitter * random.random())
+
+    def call(self, fn: Callable[[], T]) -> T:
+        delays = self.delays()
+        attempt = 1
+        while True:
+            try:
+                return fn()
+            except self.retry_on as e:
+                delay = next(delays, None)
+                if delay is None:
+                    raise
+                logger.info(
+                    "Attempt %d/%d failed (%r), retrying in %.2f s",
+                    attempt,
+                    self.max_attempts,
+                    e,
+                    delay,
+                )
+                time.sleep(delay)
+                attempt += 1
+
+
+class CircuitState(Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(AMQPConnectionError):
+    pass
+
+
+class CircuitBreaker:
+    """Fails fast while the broker is known to be unavailable.
+
+    After ``failure_threshold`` consecutive failures the circuit opens and
+    calls raise :class:`CircuitOpenError` without touching the network.
+    When ``reset_timeout`` passes a single probe call is let through: its
+    success closes the circuit, its failure opens it again.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout: float = 5.0,
+        failure_exceptions: Tuple[Type[BaseException], ...] = (AMQPConnectionError,),
+    ):
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._failure_exceptions = failure_exceptions
+
+        self._lock = threading.Lock()
+        self._state = CircuitState.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+
+    @property
+    def state(self) -> CircuitState:
+        with self._lock:
+            if self._state is CircuitState.OPEN and self._reset_timeout_passed():
+                return CircuitState.HALF_OPEN
+            return self._state
+
+    def call(self, fn: Callable[[], T]) -> T:
+        probe = self._acquire()
+        try:
+            result = fn()
+        except self._failure_exceptions:
+            self._on_failure(probe)
+            raise
+        except BaseException:
+            # Not a broker failure, let another probe decide.
+            self._release(probe)
+            raise
+
+        self._on_success()
+        return result
+
+    def reset(self) -> None:
+        with self._lock:
+            self._state = CircuitState.CLOSED
+            self._failures = 0
+            self._probing = False
+
+    def _acquire(self) -> bool:
+        """Check that a call may proceed, return ``True`` for a probe call."""
+        with self._lock:
+            if self._state is CircuitState.CLOSED:
+                return False
+
+            if self._state is CircuitState.OPEN and self._reset_timeout_passed():
+                self._state = CircuitState.HALF_OPEN
+
+            if self._state is CircuitState.HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+
+            raise CircuitOpenError(
+                f"Broker is unavailable, circuit is {self._state.value}"
+            )
+
+    def _release(self, probe: bool) -> None:
+        if probe:
+            with self._lock:
+                self._probing = False
+
+    def _on_success(self) -> None:
+        with self._lock:
+            if self._state is not CircuitState.CLOSED:
+                logger.info("Broker is available again, closing circuit")
+            self._state = CircuitState.CLOSED
+            self._failures = 0
+            self._probing = False
+
+    def _on_failure(self, probe: bool) -> None:
+        with self._lock:
+            self._failures += 1
+            if probe or self._failures >= self._failure_threshold:
+                if self._state is not CircuitState.OPEN:
+                    logger.warning(
+                        "Opening circuit after %d failure(s) for %s s",
+                        self._failures,
+                        self._reset_timeout,
+                    )
+                self._state = CircuitState.OPEN
+                self._opened_at = time.monotonic()
+                self._probing = False
+
+    def _reset_timeout_passed(self) -> bool:
+        return time.monotonic() - self._opened_at >= self._reset_timeout
@@ -1,8 +1,14 @@
 import abc
+from typing import Any, Dict, Optional
 
 import pika
 
 from myrabbit.core.publisher import Publisher
+from myrabbit.core.publisher.exchange_cache import ExchangeCache
+from myrabbit.core.publisher.flow_control import FlowControl
+from myrabbit.core.publisher.publisher import BasePublisher
+from myrabbit.core.publisher.rate_limit import RateLimiter
+from myrabbit.core.publisher.reconnect import CircuitBreaker, RetryPolicy
 
 
 class PublisherFactory(abc.ABC):
@@ -11,19 +17,89 @@ class PublisherFactory(abc.ABC):
         pass
 
     @abc.abstractmethod
-    def publisher(self) -> Publisher:
+    def publisher(self) -> BasePublisher:
         pass
 
+    @property
+    def confirm_delivery(self) -> bool:
+        """Whether publishers of the factory wait for broker confirms."""
+        return False
+
 
 class ReconnectingPublisherFactory(PublisherFactory):
-    def __init__(self, amqp_url: str):
+    """Opens a connection per publisher.
+
+    Connection attempts are retried according to ``retry_policy``. With
+    ``circuit_breaker`` set, attempts fail fast with ``CircuitOpenError``
+    while the broker is known to be down.
+
+    ``exchange_cache`` is shared by all publishers of the factory, with
+    ``mandatory`` set it also counts unroutable messages per exchange.
+
+    :attr:`is_blocked` tells whether the broker blocked publishing because of
+    a resource alarm, ``publish_timeout`` is passed to publishers and
+    ``blocked_connection_timeout`` makes pika abort I/O stuck on a blocked
+    connection.
+
+    ``rate_limiter`` limits the publish rate of all publishers of the factory.
+    """
+
+    def __init__(
+        self,
+        amqp_url: str,
+        confirm_delivery: bool = False,
+        confirm_window: int = 1024,
+        retry_policy: Optional[RetryPolicy] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        exchange_cache: Optional[ExchangeCache] = None,
+        mandatory: bool = False,
+        publish_timeout: Optional[float] = None,
+        blocked_connection_timeout: Optional[float] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+    ):
         self._amqp_url = amqp_url
+        self._confirm_delivery = confirm_delivery
+        self._confirm_window = confirm_window
+        self._retry_policy = retry_policy or RetryPolicy()
+        self.circuit_breaker = circuit_breaker
+        self.exchange_cache = exchange_cache
+        self._mandatory = mandatory
+        self._publish_timeout = publish_timeout
+        self._blocked_connection_timeout = blocked_connection_timeout
+        self.flow_control = FlowControl()
+        self.rate_limiter = rate_limiter
 
     def get_connection(self) -> pika.BlockingConnection:
-        # TODO: implement reconnection on expected exceptions
-        #   and reconnection strategy (block, retry times, delays).
+        if self.circuit_breaker is None:
+            return self._retry_policy.call(self._connect)
+        return self.circuit_breaker.call(
+            lambda: self._retry_policy.call(self._connect)
+        )
+
+    @property
+    def confirm_delivery(self) -> bool:
+        return self._confirm_delivery
+
+    @property
+    def is_blocked(self) -> bool:
+        return self.flow_control.is_blocked
+
+    def _connect(self) -> pika.BlockingConnection:
         parameters = pika.URLParameters(self._amqp_url)
+        if self._blocked_connection_timeout is not None:
+            parameters.blocked_connection_timeout = self._blocked_connection_timeout
         return pika.BlockingConnection(parameters)
 
     def publisher(self) -> Publisher:
-        return Publisher(self.get_connection())
+        return Publisher(self.get_connection(), **self._publisher_kwargs())
+
+    def _publisher_kwargs(self) -> Dict[str, Any]:
+        return dict(
+            confirm_delivery=self._confirm_delivery,
+            confirm_window=self._confirm_window,
+            exchange_cache=self.exchange_cache,
+            mandatory=self._mandatory,
+            publish_timeout=self._publish_timeout,
+            flow_control=self.flow_control,
+            rate_limiter=self.rate_limiter,
+        )
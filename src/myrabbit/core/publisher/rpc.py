@@ -1,18 +1,43 @@
+import copy
+import heapq
 import logging
 import threading
-from typing import Optional
+import time
+import uuid
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from dataclasses import dataclass, field
+from types import TracebackType
+from typing import (
+    Any,
+    Deque,
+    Dict,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Type,
+)
 
 import pika
 from pika import BasicProperties
 from pika.adapters.blocking_connection import BlockingChannel
 from pika.channel import Channel
-from pika.exceptions import ChannelWrongStateError, ConnectionWrongStateError
+from pika.exceptions import (
+    AMQPError,
+    ChannelClosedByBroker,
+    ChannelWrongStateError,
+    ConnectionWrongStateError,
+)
 from pika.spec import Basic
 
 from myrabbit.core.consumer.pika_message import PikaMessage
 
 LOGGER = logging.getLogger(__name__)
 
+DIRECT_REPLY_QUEUE = "amq.rabbitmq.reply-to"
+
 
 def _timeout_timer(
     chan: Channel,
@@ -78,7 +103,7 @@ def rpc(
         reply_channel.close()
         stop_timer_event.set()
 
-    direct_reply_queue = "amq.rabbitmq.reply-to"
+    direct_reply_queue = DIRECT_REPLY_QUEUE
     channel: BlockingChannel
 
     with connection.channel() as channel:
@@ -109,3 +134,314 @@ def rpc(
 
     assert isinstance(response, PikaMessage)
     return response
+
+
+class Destination(NamedTuple):
+    exchange: str
+    routing_key: str
+
+
+@dataclass
+class ScatterGatherResult:
+    replies: Dict[Destination, PikaMessage] = field(default_factory=dict)
+    errors: Dict[Destination, BaseException] = field(default_factory=dict)
+    timed_out: List[Destination] = field(default_factory=list)
+
+    @property
+    def complete(self) -> bool:
+        return not self.errors and not self.timed_out
+
+
+class RpcClient:
+    """RPC client multiplexing calls over one connection.
+
+    A single I/O thread owns the connection and one direct reply-to consumer.
+    Calls from any thread are published on that channel and matched with
+    replies by ``correlation_id``. Timeouts of all calls are kept in one heap
+    checked by the I/O thread, so no thread or channel is created per call.
+
+    Because direct reply-to binds replies to the channel, a channel error
+    (e.g. publishing to a missing exchange) fails all calls in flight.
+    """
+
+    def __init__(
+        self,
+        amqp_url: str,
+        default_timeout: Optional[float] = 1,
+        reconnect_delay: float = 1,
+    ):
+        self._amqp_url = amqp_url
+        self._default_timeout = default_timeout
+        self._reconnect_delay = reconnect_delay
+
+        self._lock = threading.Lock()
+        self._pending: Dict[str, "Future[PikaMessage]"] = {}
+        self._deadlines: List[Tuple[float, str]] = []
+        self._outgoing: Deque[Tuple[str, str, bytes, BasicProperties]] = deque()
+
+        self._connection: Optional[pika.BlockingConnection] = None
+        self._thread: Optional[threading.Thread] = None
+        self._closing = False
+
+    def call(
+        self,
+        exchange: str,
+        routing_key: str,
+        message: bytes,
+        properties: Optional[BasicProperties] = None,
+        timeout: Optional[float] = -1,
+    ) -> PikaMessage:
+        """Make a call and wait for the reply.
+
+        :raises TimeoutError: if the reply did not arrive in time.
+        """
+        return self.call_async(
+            exchange, routing_key, message, properties, timeout
+        ).result()
+
+    def call_async(
+        self,
+        exchange: str,
+        routing_key: str,
+        message: bytes,
+        properties: Optional[BasicProperties] = None,
+        timeout: Optional[float] = -1,
+    ) -> "Future[PikaMessage]":
+        """Make a call and return a future resolved with the reply.
+
+        ``timeout`` of ``-1`` means the client default, ``None`` waits forever.
+        """
+        if timeout == -1:
+            timeout = self._default_timeout
+
+        props = properties or BasicProperties()
+        props.reply_to = DIRECT_REPLY_QUEUE
+        if props.correlation_id is None:
+            props.correlation_id = uuid.uuid4().hex
+
+        future: "Future[PikaMessage]" = Future()
+        future.set_running_or_notify_cancel()
+
+        with self._lock:
+            if self._closing:
+                raise RuntimeError("Rpc client is closed")
+            if props.correlation_id in self._pending:
+                raise ValueError(f"Duplicate correlation id {props.correlation_id}")
+
+            self._pending[props.correlation_id] = future
+            if timeout:
+                heapq.heappush(
+                    self._deadlines, (time.monotonic() + timeout, props.correlation_id)
+                )
+            self._outgoing.append((exchange, routing_key, message, props))
+            self._ensure_started()
+
+        self._wakeup()
+        return future
+
+    def scatter_gather(
+        self,
+        destinations: Iterable[Tuple[str, str]],
+        message: bytes,
+        properties: Optional[BasicProperties] = None,
+        timeout: Optional[float] = -1,
+        quorum: Optional[int] = None,
+    ) -> ScatterGatherResult:
+        """Send one request to many ``(exchange, routing_key)`` pairs at once.
+
+        Returns when every destination replied, when ``quorum`` replies were
+        received or when ``timeout`` passed, whichever comes first. Calls that
+        are still in flight at that point are reported as ``timed_out``.
+        """
+        if timeout == -1:
+            timeout = self._default_timeout
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        calls: Dict["Future[PikaMessage]", Tuple[Destination, str]] = {}
+        for exchange, routing_key in destinations:
+            props = copy.copy(properties) if properties else BasicProperties()
+            props.correlation_id = None
+            future = self.call_async(exchange, routing_key, message, props, None)
+            calls[future] = (Destination(exchange, routing_key), props.correlation_id)
+
+        if quorum is None:
+            quorum = len(calls)
+
+        replied = 0
+        not_done = set(calls)
+        while not_done and replied < quorum:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                break
+
+            done, not_done = wait(not_done, remaining, return_when=FIRST_COMPLETED)
+            replied += sum(1 for future in done if future.exception() is None)
+
+        for future in not_done:
+            _, correlation_id = calls[future]
+            self._resolve(correlation_id, exception=TimeoutError("Rpc gather timeout"))
+
+        result = ScatterGatherResult()
+        for future, (destination, _) in calls.items():
+            error = future.exception()
+            if error is None:
+                result.replies[destination] = future.result()
+            elif isinstance(error, TimeoutError):
+                result.timed_out.append(destination)
+            else:
+                result.errors[destination] = error
+        return result
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        with self._lock:
+            self._closing = True
+            thread = self._thread
+
+        self._wakeup()
+        if thread is not None:
+            thread.join(timeout)
+
+    def __enter__(self) -> "RpcClient":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[Exception]],
+        exc_val: Optional[Any],
+        exc_tb: Optional[TracebackType],
+    ) -> None:
+        self.close()
+
+    def _ensure_started(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="myrabbit-rpc-client", daemon=True
+            )
+            self._thread.start()
+
+    def _wakeup(self) -> None:
+        connection = self._connection
+        if connection is None:
+            return
+        try:
+            connection.add_callback_threadsafe(lambda: None)
+        except ConnectionWrongStateError:
+            pass
+
+    def _run(self) -> None:
+        while not self._closing:
+            try:
+                self._serve()
+            except Exception as e:
+                # Calls waiting forever would hang if the thread died.
+                LOGGER.warning(
+                    "Rpc client connection failed: %r",
+                    e,
+                    exc_info=not isinstance(e, AMQPError),
+                )
+                self._fail_pending(e)
+                time.sleep(self._reconnect_delay)
+
+        self._fail_pending(RuntimeError("Rpc client is closed"))
+
+    def _serve(self) -> None:
+        connection = pika.BlockingConnection(pika.URLParameters(self._amqp_url))
+        self._connection = connection
+        try:
+            channel = self._open_reply_channel(connection)
+            while not self._closing:
+                if not channel.is_open:
+                    self._fail_pending(RuntimeError("Rpc reply channel was closed"))
+                    channel = self._open_reply_channel(connection)
+
+                self._publish_outgoing(channel)
+                connection.process_data_events(time_limit=self._time_to_deadline())
+                self._expire_calls()
+        finally:
+            self._connection = None
+            if connection.is_open:
+                connection.close()
+
+    def _open_reply_channel(
+        self, connection: pika.BlockingConnection
+    ) -> BlockingChannel:
+        channel = connection.channel()
+        channel.basic_consume(DIRECT_REPLY_QUEUE, self._on_reply, auto_ack=True)
+        return channel
+
+    def _publish_outgoing(self, channel: BlockingChannel) -> None:
+        while True:
+            with self._lock:
+                if not self._outgoing:
+                    return
+                exchange, routing_key, body, props = self._outgoing.popleft()
+
+            if props.correlation_id not in self._pending:
+                # Timed out before it was sent.
+                continue
+
+            try:
+                channel.basic_publish(exchange, routing_key, body, props)
+            except (ChannelWrongStateError, ChannelClosedByBroker) as e:
+                self._resolve(props.correlation_id, exception=e)
+                return
+
+    def _on_reply(
+        self,
+        channel: BlockingChannel,
+        method: Basic.Deliver,
+        properties: pika.BasicProperties,
+        body: bytes,
+    ) -> None:
+        if not self._resolve(
+            properties.correlation_id,
+            result=PikaMessage(channel, method, properties, body),
+        ):
+            LOGGER.debug("Dropping late rpc reply %s", properties.correlation_id)
+
+    def _time_to_deadline(self) -> float:
+        # Wake up at least once a second to notice that the client is closing.
+        with self._lock:
+            if not self._deadlines:
+                return 1
+            return min(max(self._deadlines[0][0] - time.monotonic(), 0), 1)
+
+    def _expire_calls(self) -> None:
+        now = time.monotonic()
+        expired = []
+        with self._lock:
+            while self._deadlines and self._deadlines[0][0] <= now:
+                _, correlation_id = heapq.heappop(self._deadlines)
+                expired.append(correlation_id)
+
+        for correlation_id in expired:
+            self._resolve(
+                correlation_id, exception=TimeoutError("Rpc wait timeout reached")
+            )
+
+    def _resolve(
+        self,
+        correlation_id: Optional[str],
+        result: Optional[PikaMessage] = None,
+        exception: Optional[BaseException] = None,
+    ) -> bool:
+        with self._lock:
+            future = self._pending.pop(correlation_id or "", None)
+
+        if future is None:
+            return False
+
+        if exception is not None:
+            future.set_exception(exception)
+        else:
+            future.set_result(result)  # type: ignore
+        return True
+
+    def _fail_pending(self, exception: BaseException) -> None:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._deadlines.clear()
+            self._outgoing.clear()
+
+        for future in pending.values():
+            future.set_exception(exception)
@@ -0,0 +1,254 @@
+import bisect
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, TypeVar
+
+import pika
+from pika import BasicProperties
+from pika.exceptions import AMQPConnectionError, ConnectionWrongStateError
+
+from myrabbit.core.consumer.pika_message import PikaMessage
+from myrabbit.core.publisher.pooled_publisher import PooledPublisherFactory
+from myrabbit.core.publisher.publisher import BasePublisher, OutgoingMessage
+from myrabbit.core.publisher.reconnecting_publisher import PublisherFactory
+
+logger = logging.getLogger(__name__)
+
+CONNECTION_ERRORS = (AMQPConnectionError, ConnectionWrongStateError)
+
+T = TypeVar("T")
+
+
+@dataclass
+class NodeHealth:
+    url: str
+    healthy: bool = True
+    failures: int = 0
+    last_failure: float = 0.0
+    last_error: Optional[str] = None
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.md5(key.encode()).digest()[:8], "big")
+
+
+class ShardedPublisher(BasePublisher):
+    """Publisher holding one publisher per node it has sent messages to."""
+
+    def __init__(self, factory: "ShardedPublisherFactory"):
+        self._factory = factory
+        self._publishers: Dict[str, BasePublisher] = {}
+
+    def publish(
+        self,
+        exchange: str,
+        routing_key: str,
+        message: bytes,
+        properties: Optional[BasicProperties] = None,
+    ) -> Optional["Future[None]"]:
+        return self._with_failover(
+            exchange,
+            routing_key,
+            lambda p: p.publish(exchange, routing_key, message, properties),
+        )
+
+    def publish_many(
+        self, messages: Iterable[OutgoingMessage], burst_size: int = 1000
+    ) -> List[Optional["Future[None]"]]:
+        # Messages are grouped by node, order is kept within a node.
+        batch = list(messages)
+        groups: Dict[str, List[int]] = OrderedDict()
+        for i, message in enumerate(batch):
+            node = self._factory.node_for(message.exchange, message.routing_key)
+            groups.setdefault(node, []).append(i)
+
+        futures: List[Optional["Future[None]"]] = [None] * len(batch)
+        for indices in groups.values():
+            first = batch[indices[0]]
+            group = [batch[i] for i in indices]
+            group_futures = self._with_failover(
+                first.exchange,
+                first.routing_key,
+                lambda p: p.publish_many(group, burst_size),
+            )
+            for i, future in zip(indices, group_futures):
+                futures[i] = future
+        return futures
+
+    def wait_for_confirms(self, timeout: Optional[float] = None) -> None:
+        for publisher in list(self._publishers.values()):
+            publisher.wait_for_confirms(timeout)
+
+    def rpc(
+        self,
+        exchange: str,
+        routing_key: str,
+        message: bytes,
+        properties: Optional[BasicProperties] = None,
+        timeout: Optional[int] = 1,
+    ) -> PikaMessage:
+        return self._with_failover(
+            exchange,
+            routing_key,
+            lambda p: p.rpc(exchange, routing_key, message, properties, timeout),
+        )
+
+    def close(self) -> None:
+        publishers, self._publishers = self._publishers, {}
+        for url, publisher in publishers.items():
+            try:
+                publisher.close()
+            except CONNECTION_ERRORS as e:
+                self._factory.mark_failed(url, e)
+
+    def _with_failover(
+        self, exchange: str, routing_key: str, fn: Callable[[BasePublisher], T]
+    ) -> T:
+        error: Optional[Exception] = None
+        for url in self._factory.nodes_for(exchange, routing_key):
+            try:
+                publisher = self._publishers.get(url)
+                if publisher is None:
+                    publisher = self._factory.node_factories[url].publisher()
+                    self._publishers[url] = publisher
+                result = fn(publisher)
+            except CONNECTION_ERRORS as e:
+                logger.warning("Publishing to %s failed: %r", url, e)
+                self._factory.mark_failed(url, e)
+                self._drop(url)
+                error = e
+                continue
+
+            self._factory.mark_healthy(url)
+            return result
+
+        assert error is not None
+        raise error
+
+    def _drop(self, url: str) -> None:
+        publisher = self._publishers.pop(url, None)
+        if publisher is None:
+            return
+        try:
+            publisher.close()
+        except Exception:
+            logger.debug("Error while closing publisher of %s", url, exc_info=True)
+
+
+class ShardedPublisherFactory(PublisherFactory):
+    """Spreads publishing over several broker nodes.
+
+    Every ``(exchange, routing_key)`` pair is mapped to a node by consistent
+    hashing, so adding or removing a node moves only a small share of the
+    keys. When a node fails the next node on the ring is used and the node
+    is skipped for ``retry_after`` seconds. By default each node gets a
+    :class:`PooledPublisherFactory` created with ``kwargs``.
+    """
+
+    def __init__(
+        self,
+        amqp_urls: List[str],
+        virtual_nodes: int = 100,
+        retry_after: float = 5.0,
+        node_factory: Optional[Callable[[str], PublisherFactory]] = None,
+        **kwargs: Any,
+    ):
+        if not amqp_urls:
+            raise ValueError("At least one amqp url is required")
+
+        make_factory = node_factory or (
+            lambda url: PooledPublisherFactory(url, **kwargs)
+        )
+        self.node_factories: Dict[str, PublisherFactory] = OrderedDict(
+            (url, make_factory(url)) for url in amqp_urls
+        )
+        self._retry_after = retry_after
+        self._health = {url: NodeHealth(url) for url in amqp_urls}
+        self._lock = threading.Lock()
+
+        ring: List[Tuple[int, str]] = sorted(
+            (_hash(f"{url}#{i}"), url)
+            for url in amqp_urls
+            for i in range(virtual_nodes)
+        )
+        self._ring_hashes = [h for h, _ in ring]
+        self._ring_urls = [url for _, url in ring]
+
+    def get_connection(self) -> pika.BlockingConnection:
+        error: Optional[Exception] = None
+        for url in self._ordered(list(self.node_factories)):
+            try:
+                connection = self.node_factories[url].get_connection()
+            except CONNECTION_ERRORS as e:
+                self.mark_failed(url, e)
+                error = e
+                continue
+            self.mark_healthy(url)
+            return connection
+
+        assert error is not None
+        raise error
+
+    def publisher(self) -> BasePublisher:
+        return ShardedPublisher(self)
+
+    @property
+    def confirm_delivery(self) -> bool:
+        return all(f.confirm_delivery for f in self.node_factories.values())
+
+    def health(self) -> List[NodeHealth]:
+        with self._lock:
+            return [NodeHealth(**vars(h)) for h in self._health.values()]
+
+    def node_for(self, exchange: str, routing_key: str) -> str:
+        return self.nodes_for(exchange, routing_key)[0]
+
+    def nodes_for(self, exchange: str, routing_key: str) -> List[str]:
+        """Nodes to try for the key: ring order with healthy nodes first."""
+        start = bisect.bisect(self._ring_hashes, _hash(f"{exchange}/{routing_key}"))
+        nodes: List[str] = []
+        for i in range(len(self._ring_urls)):
+            url = self._ring_urls[(start + i) % len(self._ring_urls)]
+            if url not in nodes:
+                nodes.append(url)
+                if len(nodes) == len(self.node_factories):
+                    break
+        return self._ordered(nodes)
+
+    def mark_failed(self, url: str, error: Exception) -> None:
+        with self._lock:
+            health = self._health[url]
+            health.healthy = False
+            health.failures += 1
+            health.last_failure = time.monotonic()
+            health.last_error = repr(error)
+
+    def mark_healthy(self, url: str) -> None:
+        health = self._health[url]
+        if health.healthy:
+            return
+        with self._lock:
+            logger.info("Broker node %s is healthy again", url)
+            health.healthy = True
+
+    def close(self) -> None:
+        for factory in self.node_factories.values():
+            close = getattr(factory, "close", None)
+            if close is not None:
+                close()
+
+    def _ordered(self, nodes: List[str]) -> List[str]:
+        # Unhealthy nodes are tried last, unless it is time to retry them.
+        now = time.monotonic()
+        with self._lock:
+            available = [url for url in nodes if self._is_available(url, now)]
+        return available + [url for url in nodes if url not in available]
+
+    def _is_available(self, url: str, now: float) -> bool:
+        health = self._health[url]
+        return health.healthy or now - health.last_failure >= self._retry_after
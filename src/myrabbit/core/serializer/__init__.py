@@ -1,2 +1,3 @@
+from .compression import Codec, Compressor, decompress, register_codec
 from .json_serializer import JsonSerializer
 from .serializer import Serializer
@@ -0,0 +1,190 @@
+import abc
+import copy
+import fnmatch
+import gzip
+import zlib
+from typing import Dict, Optional, Tuple, Union
+
+from pika import BasicProperties
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+try:
+    import lz4.frame
+except ImportError:  # pragma: no cover
+    lz4 = None
+
+
+class UnknownEncodingError(Exception):
+    pass
+
+
+class Codec(abc.ABC):
+    encoding: str
+
+    @abc.abstractmethod
+    def compress(self, data: bytes) -> bytes:
+        pass
+
+    @abc.abstractmethod
+    def decompress(self, data: bytes) -> bytes:
+        pass
+
+
+class GzipCodec(Codec):
+    encoding = "gzip"
+
+    def __init__(self, level: int = 6):
+        self.level = level
+
+    def compress(self, data: bytes) -> bytes:
+        return gzip.compress(data, self.level)
+
+    def decompress(self, data: bytes) -> bytes:
+        return gzip.decompress(data)
+
+
+class ZlibCodec(Codec):
+    encoding = "deflate"
+
+    def __init__(self, level: int = 6):
+        self.level = level
+
+    def compress(self, data: bytes) -> bytes:
+        return zlib.compress(data, self.level)
+
+    def decompress(self, data: bytes) -> bytes:
+        return zlib.decompress(data)
+
+
+class ZstdCodec(Codec):
+    encoding = "zstd"
+
+    def __init__(self, level: int = 3):
+        if zstandard is None:
+            raise RuntimeError("zstd compression requires `zstandard` package")
+        self._compressor = zstandard.ZstdCompressor(level=level)
+        self._decompressor = zstandard.ZstdDecompressor()
+
+    def compress(self, data: bytes) -> bytes:
+        compressed: bytes = self._compressor.compress(data)
+        return compressed
+
+    def decompress(self, data: bytes) -> bytes:
+        # Frames written by `compress` always carry the content size.
+        decompressed: bytes = self._decompressor.decompress(data)
+        return decompressed
+
+
+class Lz4Codec(Codec):
+    encoding = "lz4"
+
+    def __init__(self, level: int = 0):
+        if lz4 is None:
+            raise RuntimeError("lz4 compression requires `lz4` package")
+        self.level = level
+
+    def compress(self, data: bytes) -> bytes:
+        compressed: bytes = lz4.frame.compress(data, compression_level=self.level)
+        return compressed
+
+    def decompress(self, data: bytes) -> bytes:
+        decompressed: bytes = lz4.frame.decompress(data)
+        return decompressed
+
+
+def available_codecs() -> Dict[str, Codec]:
+    codecs: Dict[str, Codec] = {
+        "gzip": GzipCodec(),
+        "deflate": ZlibCodec(),
+    }
+    if zstandard is not None:
+        codecs["zstd"] = ZstdCodec()
+    if lz4 is not None:
+        codecs["lz4"] = Lz4Codec()
+    return codecs
+
+
+_CODECS = available_codecs()
+
+
+def register_codec(codec: Codec) -> None:
+    """Make a custom codec known to consumers and :class:`Compressor`."""
+    _CODECS[codec.encoding] = codec
+
+
+def get_codec(encoding: str) -> Codec:
+    try:
+        return _CODECS[encoding]
+    except KeyError:
+        raise UnknownEncodingError(f"Unsupported content encoding: {encoding}")
+
+
+def decompress(body: bytes, properties: Optional[BasicProperties]) -> bytes:
+    """Decode message body according to its ``content_encoding``.
+
+    Bodies with an unknown encoding are returned as is, some clients put a
+    charset such as ``utf-8`` there.
+    """
+    encoding = properties.content_encoding if properties else None
+    codec = _CODECS.get(encoding) if encoding else None
+    if codec is None:
+        return body
+    return codec.decompress(body)
+
+
+CodecType = Union[str, Codec]
+
+
+class Compressor:
+    """Compresses outgoing message bodies and sets ``content_encoding``.
+
+    Bodies smaller than ``threshold`` bytes are sent as is. ``exchanges``
+    maps exchange name patterns (``fnmatch`` syntax) to a codec overriding
+    the default one, ``None`` disables compression for matching exchanges.
+    """
+
+    def __init__(
+        self,
+        codec: CodecType = "gzip",
+        threshold: int = 1024,
+        exchanges: Optional[Dict[str, Optional[CodecType]]] = None,
+    ):
+        self.codec = self._resolve(codec)
+        self.threshold = threshold
+        self.exchanges = {
+            pattern: None if c is None else self._resolve(c)
+            for pattern, c in (exchanges or {}).items()
+        }
+
+    def compress(
+        self, exchange: str, body: bytes, properties: BasicProperties
+    ) -> Tuple[bytes, BasicProperties]:
+        """Return the body and its properties, copied if the body is compressed.
+
+        The given properties are never changed, callers may reuse them.
+        """
+        if properties.content_encoding or len(body) < self.threshold:
+            return body, properties
+
+        codec = self.codec_for(exchange)
+        if codec is None:
+            return body, properties
+
+        properties = copy.copy(properties)
+        properties.content_encoding = codec.encoding
+        return codec.compress(body), properties
+
+    def codec_for(self, exchange: str) -> Optional[Codec]:
+        if exchange in self.exchanges:
+            return self.exchanges[exchange]
+        for pattern, codec in self.exchanges.items():
+            if fnmatch.fnmatchcase(exchange, pattern):
+                return codec
+        return self.codec
+
+    def _resolve(self, codec: CodecType) -> Codec:
+        return get_codec(codec) if isinstance(codec, str) else codec
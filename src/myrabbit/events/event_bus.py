@@ -1,13 +1,20 @@
 from functools import wraps
-from typing import Callable, Optional
+from typing import Any, Callable, Hashable, Iterable, List, Optional, Tuple
 
 from pika import BasicProperties
 
+from myrabbit.core.consumer.batch import MessageBatcher
 from myrabbit.core.consumer.callbacks import Callbacks
+from myrabbit.core.consumer.handle_message_strategy import ManualHandle
 from myrabbit.core.consumer.listener import Exchange, Listener, Queue
+from myrabbit.core.consumer.message_handler import MessageHandler
+from myrabbit.core.consumer.partition import PartitionKey
 from myrabbit.core.consumer.pika_message import PikaMessage
+from myrabbit.core.publisher.async_publisher import AsyncPublisher
+from myrabbit.core.publisher.delayed_publisher import DelayedPublisher
+from myrabbit.core.publisher.publisher import OutgoingMessage
 from myrabbit.core.publisher.reconnecting_publisher import PublisherFactory
-from myrabbit.core.serializer import JsonSerializer, Serializer
+from myrabbit.core.serializer import Compressor, JsonSerializer, Serializer, decompress
 from myrabbit.events.event_with_message import EventWithMessage
 from myrabbit.events.listen_event_strategy.base import ListenEventStrategy
 from myrabbit.events.listen_event_strategy.service_pool import ServicePool
@@ -22,9 +29,15 @@ class EventBus:
         default_exchange_params: Optional[dict] = None,
         default_queue_params: Optional[dict] = None,
         callbacks: Optional[Callbacks] = None,
+        async_publisher: Optional[AsyncPublisher] = None,
+        compressor: Optional[Compressor] = None,
+        delayed_publisher: Optional[DelayedPublisher] = None,
     ):
         self._publisher_factory = publisher_factory
+        self._async_publisher = async_publisher
         self._serializer: Serializer = serializer or JsonSerializer()
+        self._compressor = compressor
+        self._delayed_publisher = delayed_publisher
         self.default_exchange_params = default_exchange_params or {}
         self.default_queue_params = default_queue_params or {}
         self._callbacks = callbacks
@@ -38,31 +51,170 @@ class EventBus:
         event_name: str,
         body: Optional[dict] = None,
         properties: Optional[BasicProperties] = None,
+        delay: Optional[float] = None,
     ) -> None:
+        """Publish event, with ``delay`` (seconds) it is delivered later."""
+        message = self._make_message(event_source, event_name, body, properties)
+        if delay:
+            self.delayed_publisher.publish(*message, delay=delay)
+            return
+
+        with self._publisher_factory.publisher() as publisher:
+            publisher.publish(*message)
+
+    @property
+    def delayed_publisher(self) -> DelayedPublisher:
+        if self._delayed_publisher is None:
+            self._delayed_publisher = DelayedPublisher(self._publisher_factory)
+        return self._delayed_publisher
+
+    async def publish_async(
+        self,
+        event_source: str,
+        event_name: str,
+        body: Optional[dict] = None,
+        properties: Optional[BasicProperties] = None,
+    ) -> None:
+        if self._async_publisher is None:
+            raise RuntimeError("EventBus is created without async publisher")
+
+        message = self._make_message(event_source, event_name, body, properties)
+        await self._async_publisher.publish(*message)
+
+    def publish_batch(
+        self,
+        event_source: str,
+        events: Iterable[Tuple[str, Optional[dict], Optional[BasicProperties]]],
+    ) -> None:
+        """Publish many events over one channel.
+
+        ``events`` are ``(event_name, body, properties)`` tuples, they are
+        serialized lazily, so the iterable may be a generator.
+        """
+        messages = (
+            self._make_message(event_source, event_name, body, properties)
+            for event_name, body, properties in events
+        )
+        with self._publisher_factory.publisher() as publisher:
+            publisher.publish_many(messages)
+
+    def _make_message(
+        self,
+        event_source: str,
+        event_name: str,
+        body: Optional[dict] = None,
+        properties: Optional[BasicProperties] = None,
+    ) -> OutgoingMessage:
         properties = properties or BasicProperties()
 
         body = body or {}
         content_type, binary_body = self._serializer.serialize(body)
         properties.content_type = content_type
 
-        with self._publisher_factory.publisher() as publisher:
-            publisher.publish(
-                self._exchange(event_source),
-                self._routing_key(event_name),
-                binary_body,
-                properties,
+        exchange = self._exchange(event_source)
+        if self._compressor is not None:
+            binary_body, properties = self._compressor.compress(
+                exchange, binary_body, properties
             )
 
+        return OutgoingMessage(
+            exchange,
+            self._routing_key(event_name),
+            binary_body,
+            properties,
+        )
+
     def listener(
         self,
         event_destination: str,
         event_source: str,
         event_name: str,
-        callback: Callable[[EventWithMessage], None],
+        callback: Callable[[EventWithMessage], Any],
+        exchange_params: Optional[dict] = None,
+        queue_params: Optional[dict] = None,
+        listen_strategy: Optional[ListenEventStrategy] = None,
+        method_name: Optional[str] = None,
+        listener_params: Optional[dict] = None,
+    ) -> Listener:
+        @wraps(callback)
+        def deserialize_message(message: PikaMessage) -> Any:
+            # Coroutine of an async callback is returned to be awaited.
+            return callback(
+                EventWithMessage(self._deserialize(message), message)
+            )
+
+        return self._make_listener(
+            event_destination,
+            event_source,
+            event_name,
+            callback,
+            deserialize_message,
+            exchange_params,
+            queue_params,
+            listen_strategy,
+            method_name,
+            listener_params or {},
+        )
+
+    def batch_listener(
+        self,
+        event_destination: str,
+        event_source: str,
+        event_name: str,
+        callback: Callable[[List[EventWithMessage]], Any],
+        max_size: int = 100,
+        max_wait: float = 1.0,
+        requeue: bool = True,
         exchange_params: Optional[dict] = None,
         queue_params: Optional[dict] = None,
         listen_strategy: Optional[ListenEventStrategy] = None,
         method_name: Optional[str] = None,
+        listener_params: Optional[dict] = None,
+    ) -> Listener:
+        """Listener calling ``callback`` with lists of events, see MessageBatcher.
+
+        Prefetch count is raised to ``max_size`` so full batches can form.
+        """
+
+        def deserialize_batch(messages: List[PikaMessage]) -> Any:
+            return callback(
+                [
+                    EventWithMessage(self._deserialize(message), message)
+                    for message in messages
+                ]
+            )
+
+        listener_params = {"max_concurrency": 1, **(listener_params or {})}
+        listener_params["prefetch_count"] = max(
+            listener_params.get("prefetch_count") or 0, max_size
+        )
+        auto_ack = listener_params.get("auto_ack", False)
+
+        return self._make_listener(
+            event_destination,
+            event_source,
+            event_name,
+            callback,
+            MessageBatcher(deserialize_batch, max_size, max_wait, requeue, auto_ack),
+            exchange_params,
+            queue_params,
+            listen_strategy,
+            method_name,
+            {**listener_params, "handle_message_strategy": ManualHandle()},
+        )
+
+    def _make_listener(
+        self,
+        event_destination: str,
+        event_source: str,
+        event_name: str,
+        callback: Callable,
+        handle_message: MessageHandler,
+        exchange_params: Optional[dict],
+        queue_params: Optional[dict],
+        listen_strategy: Optional[ListenEventStrategy],
+        method_name: Optional[str],
+        listener_params: dict,
     ) -> Listener:
         listen_strategy = listen_strategy or ServicePool()
 
@@ -82,18 +234,26 @@ class EventBus:
         exchange_params.setdefault("type", "topic")
         exchange_params.setdefault("name", self._exchange(event_source))
 
-        @wraps(callback)
-        def deserialize_message(message: PikaMessage) -> None:
-            callback(
-                EventWithMessage(self._serializer.deserialize(message.body), message)
-            )
-
         return Listener(
             exchange=Exchange(**exchange_params),
             queue=Queue(**queue_params),
             routing_key=event_name,
-            handle_message=deserialize_message,
+            handle_message=handle_message,
             callbacks=self._callbacks,
+            **listener_params,
+        )
+
+    def partition_key(self, event_key: Callable[[Any], Hashable]) -> PartitionKey:
+        """Listener partition key computed from the deserialized event."""
+
+        def key(message: PikaMessage) -> Hashable:
+            return event_key(self._deserialize(message))
+
+        return key
+
+    def _deserialize(self, message: PikaMessage) -> Any:
+        return self._serializer.deserialize(
+            decompress(message.body, message.properties)
         )
 
     def _exchange(self, event_source: str) -> str:
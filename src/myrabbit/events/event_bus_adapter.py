@@ -1,9 +1,10 @@
 from functools import wraps
-from typing import Callable, List, Optional, Type
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple, Type
 
 from pika import BasicProperties
 
 from myrabbit.core.consumer.listener import Listener
+from myrabbit.core.consumer.partition import PartitionKey
 from myrabbit.core.converter import DEFAULT_CONVERTERS, Converter
 from myrabbit.events.event_bus import EventBus
 from myrabbit.events.event_with_message import EventType, EventWithMessage
@@ -28,29 +29,63 @@ class EventBusAdapter:
         event_source: str,
         event: EventType,
         properties: Optional[BasicProperties] = None,
+        delay: Optional[float] = None,
     ) -> None:
         event_name, body = self.get_converter(event).name_and_body(event)
-        self.event_bus.publish(event_source, event_name, body, properties)
+        self.event_bus.publish(event_source, event_name, body, properties, delay)
+
+    async def publish_async(
+        self,
+        event_source: str,
+        event: EventType,
+        properties: Optional[BasicProperties] = None,
+    ) -> None:
+        event_name, body = self.get_converter(event).name_and_body(event)
+        await self.event_bus.publish_async(event_source, event_name, body, properties)
+
+    def publish_batch(
+        self,
+        event_source: str,
+        events: Iterable[Tuple[EventType, Optional[BasicProperties]]],
+    ) -> None:
+        """Publish ``(event, properties)`` pairs in one batch."""
+        converters: Dict[type, Converter] = {}
+
+        def convert(
+            event: EventType, properties: Optional[BasicProperties]
+        ) -> Tuple[str, dict, Optional[BasicProperties]]:
+            event_class = type(event)
+            converter = converters.get(event_class)
+            if converter is None:
+                converter = converters[event_class] = self.get_converter(event)
+            event_name, body = converter.name_and_body(event)
+            return event_name, body, properties
+
+        self.event_bus.publish_batch(
+            event_source,
+            (convert(event, properties) for event, properties in events),
+        )
 
     def listener(
         self,
         event_destination: str,
         event_source: str,
         event_type: Type[EventType],
-        callback: Callable[[EventWithMessage], None],
+        callback: Callable[[EventWithMessage], Any],
         exchange_params: Optional[dict] = None,
         queue_params: Optional[dict] = None,
         listen_strategy: Optional[ListenEventStrategy] = None,
         method_name: Optional[str] = None,
+        listener_params: Optional[dict] = None,
     ) -> Listener:
         converter = self.get_converter(event_type)
 
         @wraps(callback)
-        def instantiate_event(event_with_message: EventWithMessage) -> None:
+        def instantiate_event(event_with_message: EventWithMessage) -> Any:
             event_with_message.event = converter.instantiate(
                 event_type, event_with_message.event
             )
-            callback(event_with_message)
+            return callback(event_with_message)
 
         event_name = converter.name(event_type)
 
@@ -63,4 +98,53 @@ class EventBusAdapter:
             queue_params=queue_params,
             listen_strategy=listen_strategy,
             method_name=method_name,
+            listener_params=listener_params,
+        )
+
+    def batch_listener(
+        self,
+        event_destination: str,
+        event_source: str,
+        event_type: Type[EventType],
+        callback: Callable[[List[EventWithMessage]], Any],
+        max_size: int = 100,
+        max_wait: float = 1.0,
+        requeue: bool = True,
+        exchange_params: Optional[dict] = None,
+        queue_params: Optional[dict] = None,
+        listen_strategy: Optional[ListenEventStrategy] = None,
+        method_name: Optional[str] = None,
+        listener_params: Optional[dict] = None,
+    ) -> Listener:
+        converter = self.get_converter(event_type)
+
+        @wraps(callback)
+        def instantiate_events(events: List[EventWithMessage]) -> Any:
+            for event_with_message in events:
+                event_with_message.event = converter.instantiate(
+                    event_type, event_with_message.event
+                )
+            return callback(events)
+
+        return self.event_bus.batch_listener(
+            event_destination=event_destination,
+            event_source=event_source,
+            event_name=converter.name(event_type),
+            callback=instantiate_events,
+            max_size=max_size,
+            max_wait=max_wait,
+            requeue=requeue,
+            exchange_params=exchange_params,
+            queue_params=queue_params,
+            listen_strategy=listen_strategy,
+            method_name=method_name,
+            listener_params=listener_params,
+        )
+
+    def partition_key(
+        self, event_type: Type[EventType], event_key: Callable[[EventType], Hashable]
+    ) -> PartitionKey:
+        converter = self.get_converter(event_type)
+        return self.event_bus.partition_key(
+            lambda body: event_key(converter.instantiate(event_type, body))
         )
@@ -1,8 +1,9 @@
-from typing import List, Type, Union
+from typing import List, Optional, Type, Union
 
 from myrabbit import CommandBus, EventBus
 from myrabbit.core.consumer.consumer import Consumer, ThreadedConsumer
 from myrabbit.core.consumer.listener import Listener
+from myrabbit.core.consumer.multi_connection_consumer import MultiConnectionConsumer
 from myrabbit.core.consumer.reconnecting_consumer import ReconnectingConsumer
 from myrabbit.core.publisher.reconnecting_publisher import ReconnectingPublisherFactory
 
@@ -47,6 +48,8 @@ def run_services(
     amqp_url: str,
     *services: Union[Service, ServiceBuilder],
     consumer_cls: Type[Consumer] = ThreadedConsumer,
+    consumer_kwargs: Optional[dict] = None,
+    connections: int = 1,
 ) -> None:
     factory = ReconnectingPublisherFactory(amqp_url)
     event_bus = EventBus(factory)
@@ -63,8 +66,26 @@ def run_services(
 
     _print_motd(to_run)
     listeners: List[Listener] = sum([s.listeners for s in to_run], [])
+    if connections > 1:
+        # Every connection reconnects on its own.
+        multi_consumer = MultiConnectionConsumer(
+            amqp_url,
+            listeners,
+            connections=connections,
+            consumer_cls=consumer_cls,
+            consumer_kwargs=consumer_kwargs,
+        )
+        try:
+            multi_consumer.run()
+        except KeyboardInterrupt:
+            multi_consumer.stop()
+        return
+
     consumer = ReconnectingConsumer(
-        consumer_cls, consumer_kwargs=dict(amqp_url=amqp_url, listeners=listeners)
+        consumer_cls,
+        consumer_kwargs=dict(
+            amqp_url=amqp_url, listeners=listeners, **(consumer_kwargs or {})
+        ),
     )
     consumer.run()
 
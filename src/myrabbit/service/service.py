@@ -1,4 +1,8 @@
-from typing import Callable, List, Optional, Type
+import threading
+from contextlib import contextmanager
+from concurrent.futures import Executor
+from datetime import datetime
+from typing import Callable, Generator, Hashable, List, Optional, Tuple, Type, Union
 
 from pika import BasicProperties
 
@@ -8,11 +12,37 @@ from myrabbit.commands.command_bus_adapter import CommandBusAdapter
 from myrabbit.commands.command_with_message import CommandReplyType, CommandType, ReplyWithMessage
 from myrabbit.core.consumer.callbacks import Callback, Callbacks, Middleware
 from myrabbit.core.consumer.listener import Listener
+from myrabbit.core.consumer.partition import PartitionKey, parse_partition_key
 from myrabbit.events.event_with_message import EventType
 from myrabbit.events.listen_event_strategy import ListenEventStrategy
 from myrabbit.service.doc import Doc
 
 
+def _delay_seconds(delay: Optional[float], at: Optional[datetime]) -> Optional[float]:
+    if at is None:
+        return delay
+    if delay is not None:
+        raise ValueError("Either delay or at can be given, not both")
+    return max((at - datetime.now(at.tzinfo)).total_seconds(), 0.0)
+
+
+def _listener_params(
+    prefetch_count: Optional[int],
+    max_concurrency: Optional[int],
+    executor: Optional[Executor],
+    partition_key: Optional[PartitionKey] = None,
+    partitions: Optional[int] = None,
+) -> dict:
+    params = dict(
+        prefetch_count=prefetch_count,
+        max_concurrency=max_concurrency,
+        executor=executor,
+        partition_key=partition_key,
+        partitions=partitions,
+    )
+    return {name: value for name, value in params.items() if value is not None}
+
+
 class Service:
     def __init__(
         self, service_name: str, event_bus: EventBus, command_bus: CommandBus,
@@ -33,6 +63,7 @@ class Service:
         self._command_bus.set_callbacks(self._callbacks)
         self._listeners: List[Listener] = []
         self.doc = Doc()
+        self._batch = threading.local()
 
     def before_request(self, fn: Callback) -> Callback:
         self._callbacks.add_callback("before_request", fn)
@@ -59,14 +90,68 @@ class Service:
         return self._listeners
 
     def publish(
-        self, event: EventType, properties: Optional[BasicProperties] = None
+        self,
+        event: EventType,
+        properties: Optional[BasicProperties] = None,
+        delay: Optional[float] = None,
+        at: Optional[datetime] = None,
     ) -> None:
+        """Publish event.
+
+        Event is delivered after ``delay`` seconds or at ``at`` time if given.
+        """
         properties = properties or BasicProperties()
         properties.app_id = self.service_name
+        delay = _delay_seconds(delay, at)
+
+        batch: Optional[List[Tuple[EventType, BasicProperties]]] = getattr(
+            self._batch, "events", None
+        )
+        if batch is not None and not delay:
+            batch.append((event, properties))
+            if len(batch) == self._batch.flush_every:
+                self._flush_batch()
+            return
+
         self._event_bus_adapter.publish(
+            event_source=self.service_name,
+            event=event,
+            properties=properties,
+            delay=delay,
+        )
+
+    async def publish_async(
+        self, event: EventType, properties: Optional[BasicProperties] = None
+    ) -> None:
+        properties = properties or BasicProperties()
+        properties.app_id = self.service_name
+        await self._event_bus_adapter.publish_async(
             event_source=self.service_name, event=event, properties=properties
         )
 
+    @contextmanager
+    def batch(self, flush_every: Optional[int] = None) -> Generator[None, None, None]:
+        """Collect events published inside the block and publish them at once.
+
+        Events are published when the block exits without an exception, or
+        every ``flush_every`` events if it is given. Batches are per thread.
+        """
+        if getattr(self._batch, "events", None) is not None:
+            raise RuntimeError("Nested batches are not supported")
+
+        self._batch.events = []
+        self._batch.flush_every = flush_every
+        try:
+            yield
+            self._flush_batch()
+        finally:
+            self._batch.events = None
+
+    def _flush_batch(self) -> None:
+        events, self._batch.events = self._batch.events, []
+        if events:
+            self._event_bus_adapter.publish_batch(self.service_name, events)
+
     def send(
         self,
         command_destination: str,
@@ -74,7 +159,49 @@ class Service:
         properties: Optional[BasicProperties] = None,
         reply_to: Optional[str] = None,
         reply_headers: Optional[dict] = None,
+        delay: Optional[float] = None,
+        at: Optional[datetime] = None,
+    ) -> None:
+        """Send command.
+
+        Command is delivered after ``delay`` seconds or at ``at`` time if given.
+        """
+        self._command_bus_adapter.send(
+            self.service_name,
+            command_destination=command_destination,
+            command=command,
+            properties=self._command_properties(
+                command_destination, command, properties, reply_to
+            ),
+            reply_headers=reply_headers,
+            delay=_delay_seconds(delay, at),
+        )
+
+    async def send_async(
+        self,
+        command_destination: str,
+        command: CommandType,
+        properties: Optional[BasicProperties] = None,
+        reply_to: Optional[str] = None,
+        reply_headers: Optional[dict] = None,
     ) -> None:
+        await self._command_bus_adapter.send_async(
+            self.service_name,
+            command_destination=command_destination,
+            command=command,
+            properties=self._command_properties(
+                command_destination, command, properties, reply_to
+            ),
+            reply_headers=reply_headers,
+        )
+
+    def _command_properties(
+        self,
+        command_destination: str,
+        command: CommandType,
+        properties: Optional[BasicProperties],
+        reply_to: Optional[str],
+    ) -> BasicProperties:
         properties = properties or BasicProperties()
         properties.app_id = self.service_name
 
@@ -85,13 +212,7 @@ class Service:
                 command_destination, command_name, reply_to
             )
 
-        self._command_bus_adapter.send(
-            self.service_name,
-            command_destination=command_destination,
-            command=command,
-            properties=properties,
-            reply_headers=reply_headers,
-        )
+        return properties
 
     def on_event(
         self,
@@ -101,8 +222,30 @@ class Service:
         queue_params: Optional[dict] = None,
         listen_strategy: Optional[ListenEventStrategy] = None,
         method_name: Optional[str] = None,
+        prefetch_count: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+        executor: Optional[Executor] = None,
+        partition_by: Union[str, Callable[[EventType], Hashable], None] = None,
+        partitions: Optional[int] = None,
     ) -> Callable:
+        """Register event handler.
+
+        With ``partition_by`` events with the same key are handled in order
+        by concurrent consumers, on one of ``partitions`` serial lanes. The
+        key is ``"routing_key"``, ``"header:<name>"`` or a function of the
+        event.
+        """
         self.doc.add_event(event_source, event_type)
+        partition_key: Optional[PartitionKey] = None
+        if isinstance(partition_by, str):
+            partition_key = parse_partition_key(partition_by)
+        elif partition_by is not None:
+            partition_key = self._event_bus_adapter.partition_key(
+                event_type, partition_by
+            )
+        listener_params = _listener_params(
+            prefetch_count, max_concurrency, executor, partition_key, partitions
+        )
 
         def register_event_listener(fn: Callable) -> Callable:
             self._listeners.append(
@@ -115,19 +258,69 @@ class Service:
                     queue_params=queue_params,
                     listen_strategy=listen_strategy,
                     method_name=method_name,
+                    listener_params=listener_params,
                 )
             )
             return fn
 
         return register_event_listener
 
+    def on_event_batch(
+        self,
+        event_source: str,
+        event_type: Type[EventType],
+        max_size: int = 100,
+        max_wait: float = 1.0,
+        requeue: bool = True,
+        exchange_params: Optional[dict] = None,
+        queue_params: Optional[dict] = None,
+        listen_strategy: Optional[ListenEventStrategy] = None,
+        method_name: Optional[str] = None,
+        prefetch_count: Optional[int] = None,
+        executor: Optional[Executor] = None,
+    ) -> Callable:
+        """Register handler receiving lists of up to ``max_size`` events.
+
+        A batch is handled when full or ``max_wait`` seconds after its first
+        event. Events of a batch are acknowledged together, or rejected
+        together if the handler raises: requeued, or dead-lettered with
+        ``requeue=False``.
+        """
+        self.doc.add_event(event_source, event_type)
+        listener_params = _listener_params(prefetch_count, None, executor)
+
+        def register_event_batch_listener(fn: Callable) -> Callable:
+            self._listeners.append(
+                self._event_bus_adapter.batch_listener(
+                    event_destination=self.service_name,
+                    event_source=event_source,
+                    event_type=event_type,
+                    callback=fn,
+                    max_size=max_size,
+                    max_wait=max_wait,
+                    requeue=requeue,
+                    exchange_params=exchange_params,
+                    queue_params=queue_params,
+                    listen_strategy=listen_strategy,
+                    method_name=method_name,
+                    listener_params=listener_params,
+                )
+            )
+            return fn
+
+        return register_event_batch_listener
+
     def on_command(
         self,
         command_type: Type[CommandType],
         exchange_params: Optional[dict] = None,
         queue_params: Optional[dict] = None,
+        prefetch_count: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+        executor: Optional[Executor] = None,
     ) -> Callable:
         self.doc.add_command(command_type)
+        listener_params = _listener_params(prefetch_count, max_concurrency, executor)
 
         def register_command_listener(fn: Callable) -> Callable:
             self._listeners.append(
@@ -137,6 +330,7 @@ class Service:
                     callback=fn,
                     exchange_params=exchange_params,
                     queue_params=queue_params,
+                    listener_params=listener_params,
                 )
             )
             return fn
@@ -151,8 +345,12 @@ class Service:
         listen_on: Optional[str] = None,
         exchange_params: Optional[dict] = None,
         queue_params: Optional[dict] = None,
+        prefetch_count: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+        executor: Optional[Executor] = None,
     ) -> Callable:
         self.doc.add_command_reply(command_destination, command_type)
+        listener_params = _listener_params(prefetch_count, max_concurrency, executor)
 
         if listen_on:
             queue_params = queue_params or {}
@@ -174,6 +372,7 @@ class Service:
                     reply_type=reply_type,
                     exchange_params=exchange_params,
                     queue_params=queue_params,
+                    listener_params=listener_params,
                 )
             )
             return fn
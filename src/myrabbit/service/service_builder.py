@@ -1,4 +1,5 @@
-from typing import Callable, Optional, Type
+from concurrent.futures import Executor
+from typing import Callable, Hashable, Optional, Type, Union
 
 from myrabbit import CommandBus, EventBus
 from myrabbit.commands.command_with_message import CommandReplyType, CommandType, ReplyWithMessage
@@ -34,6 +35,11 @@ class ServiceBuilder:
         queue_params: Optional[dict] = None,
         listen_strategy: Optional[ListenEventStrategy] = None,
         method_name: Optional[str] = None,
+        prefetch_count: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+        executor: Optional[Executor] = None,
+        partition_by: Union[str, Callable[[EventType], Hashable], None] = None,
+        partitions: Optional[int] = None,
     ) -> Callable:
         def register_event_listener(fn):
             self._calls.append(
@@ -44,21 +50,70 @@ class ServiceBuilder:
                     queue_params,
                     listen_strategy,
                     method_name,
+                    prefetch_count=prefetch_count,
+                    max_concurrency=max_concurrency,
+                    executor=executor,
+                    partition_by=partition_by,
+                    partitions=partitions,
                 )(fn)
             )
             return fn
 
         return register_event_listener
 
+    def on_event_batch(
+        self,
+        event_source: str,
+        event_type: Type[EventType],
+        max_size: int = 100,
+        max_wait: float = 1.0,
+        requeue: bool = True,
+        exchange_params: Optional[dict] = None,
+        queue_params: Optional[dict] = None,
+        listen_strategy: Optional[ListenEventStrategy] = None,
+        method_name: Optional[str] = None,
+        prefetch_count: Optional[int] = None,
+        executor: Optional[Executor] = None,
+    ) -> Callable:
+        def register_event_batch_listener(fn: Callable) -> Callable:
+            self._calls.append(
+                lambda s: s.on_event_batch(
+                    event_source,
+                    event_type,
+                    max_size,
+                    max_wait,
+                    requeue,
+                    exchange_params,
+                    queue_params,
+                    listen_strategy,
+                    method_name,
+                    prefetch_count=prefetch_count,
+                    executor=executor,
+                )(fn)
+            )
+            return fn
+
+        return register_event_batch_listener
+
     def on_command(
         self,
         command_type: Type[CommandType],
         exchange_params: Optional[dict] = None,
         queue_params: Optional[dict] = None,
+        prefetch_count: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+        executor: Optional[Executor] = None,
     ) -> Callable:
         def register_command_listener(fn: Callable) -> Callable:
             self._calls.append(
-                lambda s: s.on_command(command_type, exchange_params, queue_params)(fn)
+                lambda s: s.on_command(
+                    command_type,
+                    exchange_params,
+                    queue_params,
+                    prefetch_count=prefetch_count,
+                    max_concurrency=max_concurrency,
+                    executor=executor,
+                )(fn)
             )
             return fn
 
@@ -72,6 +127,9 @@ class ServiceBuilder:
         listen_on: Optional[str] = None,
         exchange_params: Optional[dict] = None,
         queue_params: Optional[dict] = None,
+        prefetch_count: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+        executor: Optional[Executor] = None,
     ) -> Callable:
         def register_command_listener(
             fn: Callable[[ReplyWithMessage], None]
@@ -84,6 +142,9 @@ class ServiceBuilder:
                     listen_on,
                     exchange_params,
                     queue_params,
+                    prefetch_count=prefetch_count,
+                    max_concurrency=max_concurrency,
+                    executor=executor,
                 )(fn)
             )
             return fn
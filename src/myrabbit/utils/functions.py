@@ -1,3 +1,4 @@
+import asyncio
 import inspect
 from functools import partial
 from typing import Callable, Optional
@@ -24,3 +25,13 @@ def get_method_name(method_name: Optional[str], fn: Callable) -> str:
             f"Can not get method name for object {fn!r}. "
             f"Please, specify method name explicitly.  "
         )
+
+
+def is_coroutine_handler(fn: Callable) -> bool:
+    """Whether ``fn`` or the function it wraps is a coroutine function."""
+    fn = inspect.unwrap(fn)
+    if isinstance(fn, partial):
+        fn = fn.func
+    return asyncio.iscoroutinefunction(fn) or asyncio.iscoroutinefunction(
+        getattr(fn, "__call__", None)
+    )
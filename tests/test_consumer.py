@@ -1,14 +1,28 @@
 import logging
+import os
 import random
+import threading
+import time
+from collections import deque
 from queue import Queue
 from time import sleep
+from unittest.mock import Mock, call
 
+import pytest
+
+from myrabbit.core.consumer.ack_coordinator import AckCoordinator
+from myrabbit.core.consumer.adaptive_prefetch import AdaptivePrefetch
+from myrabbit.core.consumer.batch import MessageBatcher
 from myrabbit.core.consumer.consumer import Consumer
 from myrabbit.core.consumer.handle_message_strategy import ManualHandle
 from myrabbit.core.consumer.listener import Exchange
 from myrabbit.core.consumer.listener import Listener
 from myrabbit.core.consumer.listener import Queue as Q
+from myrabbit.core.consumer.multi_connection_consumer import MultiConnectionConsumer, ShardStrategy
 from myrabbit.core.consumer.pika_message import PikaMessage
+from myrabbit.core.consumer.process_consumer import ProcessPoolConsumer, _RecordingChannel
+from myrabbit.core.consumer.reply import Reply
+from myrabbit.core.consumer.topology import TopologyCache
 from myrabbit.core.publisher.publisher import make_publisher
 
 logger = logging.getLogger(__name__)
@@ -131,3 +145,291 @@ def test_basic_consumer_did_not_acknowledged(rmq_url, run_consumer) -> None:
     message1 = queue.get()
     message2 = queue.get()
     assert message1.body == message2.body == b"test-message"
+
+
+def reply_with_pid(msg: PikaMessage) -> Reply:
+    return Reply(body=str(os.getpid()).encode())
+
+
+def process_pool_listeners():
+    return [
+        Listener(
+            exchange=Exchange(type="topic", name="myrabbit_process_pool_exchange"),
+            queue=Q("test_process_pool_consumer", auto_delete=True),
+            routing_key="test",
+            handle_message=reply_with_pid,
+        )
+    ]
+
+
+def test_process_pool_consumer(rmq_url, run_consumer) -> None:
+    consumer = ProcessPoolConsumer(
+        rmq_url,
+        prefetch_count=4,
+        listeners_path="tests.test_consumer:process_pool_listeners",
+        max_workers=2,
+    )
+
+    with run_consumer(consumer), make_publisher(rmq_url) as publisher:
+        replies = [
+            publisher.rpc(
+                "myrabbit_process_pool_exchange", "test", b"test-message", timeout=5
+            )
+            for _ in range(3)
+        ]
+
+    pids = {int(reply.body) for reply in replies}
+    assert os.getpid() not in pids
+
+
+def test_process_pool_worker_refuses_multiple_acks() -> None:
+    channel = _RecordingChannel()
+
+    with pytest.raises(ValueError):
+        channel.basic_ack(3, multiple=True)
+    with pytest.raises(ValueError):
+        channel.basic_nack(3, multiple=True)
+    channel.basic_ack(3)
+    channel.basic_nack(4, requeue=False)
+
+    assert channel.actions == [
+        ("basic_ack", (3,), {}),
+        ("basic_nack", (4,), {"requeue": False}),
+    ]
+
+
+def test_multi_connection_consumer(rmq_url, run_consumer) -> None:
+    queue: Queue = Queue()
+    exchange = "exchange_" + str(random.randint(100000, 999999))
+
+    listeners = [
+        Listener(
+            exchange=Exchange(type="topic", name=exchange, auto_delete=True),
+            queue=Q(f"queue_{i}_{random.randint(100000, 999999)}", auto_delete=True),
+            routing_key=f"test.{i}",
+            handle_message=queue.put,
+        )
+        for i in range(3)
+    ]
+
+    consumer = MultiConnectionConsumer(
+        rmq_url, listeners, connections=2, strategy=ShardStrategy.WEIGHTED
+    )
+
+    with run_consumer(consumer), make_publisher(rmq_url) as publisher:
+        for i in range(3):
+            publisher.publish(exchange, f"test.{i}", b"test-message")
+        messages = [queue.get(timeout=1) for _ in range(3)]
+
+    assert {message.basic_deliver.routing_key for message in messages} == {
+        "test.0",
+        "test.1",
+        "test.2",
+    }
+    stats = consumer.stats()
+    assert len(stats) == 2
+    assert sum(connection.messages for connection in stats) == 3
+
+
+def test_passive_topology(rmq_url, run_consumer) -> None:
+    queue: Queue = Queue()
+    exchange = "exchange_" + str(random.randint(100000, 999999))
+    queue_name = "queue_" + str(random.randint(100000, 999999))
+
+    def make_listener() -> Listener:
+        return Listener(
+            exchange=Exchange(type="topic", name=exchange, auto_delete=False),
+            queue=Q(queue_name, auto_delete=True),
+            routing_key="test",
+            handle_message=queue.put,
+        )
+
+    cache = TopologyCache()
+    # Missing queue is not declared in passive mode.
+    passive_consumer = Consumer(
+        rmq_url, [make_listener()], topology_cache=cache, passive_topology=True
+    )
+    with run_consumer(passive_consumer):
+        assert not passive_consumer._channels
+
+    consumer = Consumer(rmq_url, [make_listener()], topology_cache=cache)
+    with run_consumer(consumer), make_publisher(rmq_url) as publisher:
+        passive_consumer = Consumer(
+            rmq_url, [make_listener()], topology_cache=cache, passive_topology=True
+        )
+        with run_consumer(passive_consumer):
+            assert len(passive_consumer._channels) == 1
+            publisher.publish(exchange, "test", b"test-message")
+            assert queue.get(timeout=1).body == b"test-message"
+
+
+def test_ack_coordinator_acks_contiguous_head_at_once() -> None:
+    channel = Mock(is_open=True)
+    acks = AckCoordinator(channel)
+    for tag in (1, 2, 3):
+        acks.track(tag)
+
+    acks.ack_many([1, 2, 3])
+
+    assert channel.mock_calls == [call.basic_ack(3, multiple=True)]
+    assert acks.stats.acked == 3
+    assert acks.stats.frames == 1
+
+
+def test_ack_coordinator_acks_out_of_order_tags_one_by_one() -> None:
+    channel = Mock(is_open=True)
+    acks = AckCoordinator(channel)
+    for tag in (1, 2, 3):
+        acks.track(tag)
+
+    acks.ack(2)
+    acks.ack(3)
+    acks.ack(1)
+
+    assert channel.mock_calls == [
+        call.basic_ack(2),
+        call.basic_ack(3),
+        call.basic_ack(1, multiple=False),
+    ]
+    assert acks.stats.acked == 3
+
+
+def test_ack_coordinator_sends_rejects_before_buffered_acks() -> None:
+    channel = Mock(is_open=True)
+    channel.connection.ioloop = Mock(spec=["add_callback_threadsafe", "call_later"])
+    acks = AckCoordinator(channel, batch_size=10)
+    for tag in (1, 2, 3, 4):
+        acks.track(tag)
+
+    # Acks from a worker thread wait for the I/O loop.
+    worker = threading.Thread(target=acks.ack_many, args=([1, 2],))
+    worker.start()
+    worker.join()
+    assert channel.connection.ioloop.add_callback_threadsafe.called
+    assert not channel.basic_ack.called
+    assert acks.pending == 2
+
+    channel.reset_mock()
+    acks.reject(3, requeue=False)
+    acks.ack(4)
+
+    assert channel.mock_calls == [
+        call.basic_reject(3, requeue=False),
+        call.basic_ack(2, multiple=True),
+        call.basic_ack(4, multiple=False),
+    ]
+    assert acks.stats.acked == 3
+    assert acks.stats.rejected == 1
+    assert acks.pending == 0
+
+
+def test_ack_coordinator_drops_acks_of_closed_channel() -> None:
+    channel = Mock(is_open=True)
+    acks = AckCoordinator(channel)
+    acks.track(1)
+    acks.track(2)
+
+    channel.is_open = False
+    acks.ack(1)
+    acks.reject(2)
+
+    assert not channel.basic_ack.called
+    assert not channel.basic_reject.called
+    assert acks.pending == 0
+    assert acks.stats.acked == 0
+
+
+def test_message_batcher_discards_messages_of_closed_channel() -> None:
+    handled = []
+    batcher = MessageBatcher(handled.append, max_size=10, max_wait=60)
+    open_channel, closed_channel = Mock(), Mock()
+    for channel in (open_channel, closed_channel, open_channel):
+        batcher(Mock(channel=channel))
+    assert batcher.pending(open_channel) == 2
+    assert batcher.pending(closed_channel) == 1
+
+    assert batcher.discard(closed_channel) == 1
+    batcher.flush()
+
+    assert [[m.channel for m in batch] for batch in handled] == [
+        [open_channel, open_channel]
+    ]
+    assert batcher.pending(open_channel) == 0
+    assert batcher.pending(closed_channel) == 0
+
+
+def watch_channel(adaptive: AdaptivePrefetch, prefetch_count: int, workers: int = 2):
+    channel = Mock(cancelled=False, acks=None, in_flight=0, backlog=deque())
+    channel.pika_channel.is_open = True
+    adaptive.watch(channel, prefetch_count, workers)
+    return channel
+
+
+def tick(adaptive: AdaptivePrefetch, channel, elapsed: float = 1.0) -> None:
+    state = adaptive._channels[id(channel)]
+    state.last_tick = time.monotonic() - elapsed
+    adaptive._tick(state, 0.0)
+
+
+def test_adaptive_prefetch_uses_worker_capacity_when_saturated() -> None:
+    adaptive = AdaptivePrefetch(refill_time=1.0)
+    channel = watch_channel(adaptive, prefetch_count=5)
+    # More messages are waiting than there are workers.
+    channel.in_flight = 5
+    for _ in range(10):
+        adaptive.record(channel, 0.1)
+
+    tick(adaptive, channel)
+
+    # 2 workers + 2 / 0.1 s * 1 s
+    channel.pika_channel.basic_qos.assert_called_once_with(prefetch_count=22)
+    assert adaptive.decisions[-1].saturated
+    assert adaptive.decisions[-1].old == 5
+    assert adaptive.decisions[-1].new == 22
+    assert channel.pika_channel.connection.ioloop.call_later.call_count == 2
+
+
+def test_adaptive_prefetch_uses_ack_rate_when_unsaturated() -> None:
+    adaptive = AdaptivePrefetch(refill_time=1.0)
+    channel = watch_channel(adaptive, prefetch_count=5)
+    channel.in_flight = 1
+    for _ in range(10):
+        adaptive.record(channel, 0.1)
+
+    tick(adaptive, channel)
+
+    # 2 workers + 10 acks/s * 1 s
+    channel.pika_channel.basic_qos.assert_called_once_with(prefetch_count=12)
+    assert not adaptive.decisions[-1].saturated
+
+
+def test_adaptive_prefetch_clamps_to_bounds() -> None:
+    adaptive = AdaptivePrefetch(min_prefetch=5, max_prefetch=15, refill_time=1.0)
+    fast = watch_channel(adaptive, prefetch_count=5)
+    fast.in_flight = 5
+    for _ in range(10):
+        adaptive.record(fast, 0.1)
+    slow = watch_channel(adaptive, prefetch_count=15)
+    adaptive.record(slow, 1.0)
+
+    tick(adaptive, fast)
+    tick(adaptive, slow, elapsed=10.0)
+
+    fast.pika_channel.basic_qos.assert_called_once_with(prefetch_count=15)
+    slow.pika_channel.basic_qos.assert_called_once_with(prefetch_count=5)
+
+
+def test_adaptive_prefetch_ignores_changes_within_hysteresis() -> None:
+    adaptive = AdaptivePrefetch(refill_time=1.0, hysteresis=0.2)
+    channel = watch_channel(adaptive, prefetch_count=20)
+    channel.in_flight = 5
+    for _ in range(10):
+        adaptive.record(channel, 0.1)
+
+    tick(adaptive, channel)
+
+    assert not channel.pika_channel.basic_qos.called
+    assert not adaptive.decisions
+    [stats] = adaptive.stats()
+    assert stats.prefetch_count == 20
+    assert stats.target == 22
@@ -4,11 +4,13 @@ import queue
 from dataclasses import dataclass
 from functools import partial
 
+from pika import BasicProperties
 from pydantic import BaseModel
 
 from myrabbit import EventBus
 from myrabbit import EventBusAdapter
 from myrabbit.core.consumer.consumer import Consumer
+from myrabbit.core.serializer import Compressor, decompress
 from myrabbit.events.event_with_message import EventWithMessage
 from myrabbit.events.listen_event_strategy import Broadcast
 from myrabbit.events.listen_event_strategy import ServicePool
@@ -200,3 +202,82 @@ def test_events_broadcast(
                 )
                 assert isinstance(message3, EventWithMessage)
                 assert message3.event == {"name": "test-event"}
+
+
+def test_events_publish_batch(
+    rmq_url, run_consumer, event_bus: EventBus, event_bus_adapter: EventBusAdapter
+):
+    q = queue.Queue()
+
+    listeners = [
+        event_bus_adapter.listener("batch-a", "batch-b", DataclassEvent, q.put),
+    ]
+
+    consumer = Consumer(rmq_url, listeners)
+
+    with run_consumer(consumer):
+        event_bus_adapter.publish_batch(
+            "batch-b", [(DataclassEvent(name=str(i)), None) for i in range(10)]
+        )
+
+        received = [q.get(block=True, timeout=1).event for _ in range(10)]
+        assert received == [DataclassEvent(name=str(i)) for i in range(10)]
+
+
+def test_events_compression(rmq_url, run_consumer, publisher_factory):
+    q = queue.Queue()
+
+    compressing_bus = EventBus(
+        publisher_factory,
+        compressor=Compressor("gzip", threshold=100, exchanges={"plain.*": None}),
+    )
+    listeners = [
+        compressing_bus.listener("zip-a", "zip-b", "Document", q.put),
+        compressing_bus.listener("zip-a", "plain", "Document", q.put),
+    ]
+
+    consumer = Consumer(rmq_url, listeners)
+
+    document = {"text": "lorem ipsum " * 1000}
+    with run_consumer(consumer):
+        compressing_bus.publish("zip-b", "Document", document)
+        compressing_bus.publish("zip-b", "Document", {"text": "short"})
+        compressing_bus.publish("plain", "Document", document)
+
+        # Listeners consume separate queues, arrival order is not guaranteed.
+        messages = [q.get(block=True, timeout=1) for _ in range(3)]
+        received = {
+            (m.message.basic_deliver.exchange, m.event == document): m for m in messages
+        }
+        zipped = received[("zip-b.events", True)]
+        short = received[("zip-b.events", False)]
+        plain = received[("plain.events", True)]
+
+        assert zipped.message.properties.content_encoding == "gzip"
+        assert len(zipped.message.body) < len(document["text"])
+
+        assert short.event == {"text": "short"}
+        assert short.message.properties.content_encoding is None
+
+        assert plain.message.properties.content_encoding is None
+
+
+def test_compressor_does_not_change_given_properties():
+    compressor = Compressor("gzip", threshold=100)
+    properties = BasicProperties(content_type="application/json")
+
+    large, large_properties = compressor.compress("a", b"x" * 1000, properties)
+    small, small_properties = compressor.compress("a", b"short", properties)
+
+    assert large_properties.content_encoding == "gzip"
+    assert decompress(large, large_properties) == b"x" * 1000
+    assert properties.content_encoding is None
+    assert small == b"short"
+    assert small_properties.content_encoding is None
+
+
+def test_decompress_passes_unknown_encoding_through():
+    body = b'{"text": "plain"}'
+
+    assert decompress(body, BasicProperties(content_encoding="utf-8")) == body
+    assert decompress(body, BasicProperties(content_encoding="br")) == body
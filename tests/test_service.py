@@ -1,14 +1,21 @@
+import asyncio
 import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 from dataclasses import dataclass
-from typing import Callable
+from typing import Callable, List
 
 import pytest
 
-from myrabbit import EventWithMessage
+from myrabbit import CommandBus, EventBus, EventWithMessage, PublisherFactory
 from myrabbit.commands.command_with_message import CommandWithMessage, ReplyWithMessage
-from myrabbit.core.consumer.consumer import Consumer
+from myrabbit.core.consumer.asyncio_consumer import AsyncioConsumer
+from myrabbit.core.consumer.consumer import Consumer, ThreadedConsumer
 from myrabbit.core.consumer.listener import Listener
 from myrabbit.core.consumer.pika_message import PikaMessage
+from myrabbit.core.publisher import AsyncPublisher
 from myrabbit.service import Service
 
 
@@ -273,3 +280,261 @@ def test_service_commands_reply_headers(
         message: ReplyWithMessage = q.get(block=True, timeout=1)
         assert message.reply == "string-reply"
         assert message.message.properties.headers["X-Saga-Id"] == 100
+
+
+def test_service_batch(
+    make_service: Callable, run_consumer: Callable, rmq_url: str
+) -> None:
+    q: queue.Queue = queue.Queue()
+
+    x: Service = make_service("X")
+    y: Service = make_service("Y")
+
+    @x.on_event("Y", YEvent)
+    def handle_y_event(event: EventWithMessage[YEvent]) -> None:
+        q.put(event)
+
+    consumer = Consumer(rmq_url, x.listeners)
+    with run_consumer(consumer):
+        with y.batch():
+            y.publish(YEvent(name="first"))
+            y.publish(YEvent(name="second"))
+            assert q.empty()
+
+        first: EventWithMessage = q.get(block=True, timeout=1)
+        second: EventWithMessage = q.get(block=True, timeout=1)
+        assert first.event == YEvent(name="first")
+        assert second.event == YEvent(name="second")
+        assert second.message.properties.app_id == "Y"
+
+
+def test_service_publish_and_send_async(
+    make_service: Callable,
+    run_consumer: Callable,
+    rmq_url: str,
+    publisher_factory: PublisherFactory,
+) -> None:
+    q: queue.Queue = queue.Queue()
+
+    x: Service = make_service("X")
+    async_publisher = AsyncPublisher(rmq_url, confirm_delivery=True)
+    y = Service(
+        "Y",
+        EventBus(publisher_factory, async_publisher=async_publisher),
+        CommandBus(publisher_factory, async_publisher=async_publisher),
+    )
+
+    @x.on_event("Y", YEvent)
+    def handle_y_event(event: EventWithMessage[YEvent]) -> None:
+        q.put(event.event)
+
+    @x.on_command(Command)
+    def x_handle_command(command: CommandWithMessage[Command]) -> None:
+        q.put(command.command)
+
+    async def publish() -> None:
+        await asyncio.gather(
+            *(y.publish_async(YEvent(name=str(i))) for i in range(10))
+        )
+        await y.send_async("X", Command(name="async-command"))
+        await async_publisher.close()
+
+    consumer = Consumer(rmq_url, x.listeners)
+    with run_consumer(consumer):
+        asyncio.get_event_loop().run_until_complete(publish())
+
+        received = [q.get(block=True, timeout=1) for _ in range(11)]
+        assert Command(name="async-command") in received
+        assert {e.name for e in received if isinstance(e, YEvent)} == {
+            str(i) for i in range(10)
+        }
+
+
+def test_service_delayed_publish_and_send(
+    make_service: Callable, run_consumer: Callable, rmq_url: str
+) -> None:
+    q: queue.Queue = queue.Queue()
+
+    x: Service = make_service("X")
+    y: Service = make_service("Y")
+    y.event_bus.delayed_publisher.local_threshold = 0.5
+
+    @x.on_event("Y", YEvent)
+    def handle_y_event(event: EventWithMessage[YEvent]) -> None:
+        q.put((time.monotonic(), event.event))
+
+    @x.on_command(Command)
+    def handle_command(command: CommandWithMessage[Command]) -> None:
+        q.put((time.monotonic(), command.command))
+
+    consumer = Consumer(rmq_url, x.listeners)
+    with run_consumer(consumer):
+        started = time.monotonic()
+        y.publish(YEvent(name="broker"), delay=1)
+        y.publish(YEvent(name="local"), delay=0.2)
+        y.send("X", Command(name="scheduled"), at=datetime.now() + timedelta(seconds=1))
+        y.publish(YEvent(name="now"))
+
+        received = [q.get(block=True, timeout=3) for _ in range(4)]
+        delays = {item.name: at - started for at, item in received}
+
+        assert [item.name for _, item in received][:2] == ["now", "local"]
+        assert 0.2 <= delays["local"] < 1
+        assert delays["broker"] >= 1
+        assert delays["scheduled"] >= 0.9
+
+
+def test_service_async_handlers(
+    make_service: Callable, run_consumer: Callable, rmq_url: str
+) -> None:
+    q: queue.Queue = queue.Queue()
+    middleware_calls = []
+
+    x: Service = make_service("X")
+    y: Service = make_service("Y")
+
+    @x.middleware
+    async def async_middleware(callbacks, message: PikaMessage):
+        middleware_calls.append("enter")
+        yield
+        middleware_calls.append("exit")
+
+    @x.on_event("Y", YEvent)
+    async def handle_y_event(event: EventWithMessage[YEvent]) -> None:
+        await asyncio.sleep(0.3)
+        q.put(event.event)
+
+    @x.on_command(Command)
+    async def x_handle_command(command: CommandWithMessage[Command]) -> CommandReply:
+        await asyncio.sleep(0.3)
+        return CommandReply(reply_name=command.command.name)
+
+    @y.on_command_reply("X", Command, CommandReply)
+    def on_reply_from_x(reply: ReplyWithMessage[Command]) -> None:
+        q.put(reply.reply)
+
+    consumer = AsyncioConsumer(rmq_url, x.listeners + y.listeners, prefetch_count=10)
+    with run_consumer(consumer):
+        started = time.monotonic()
+        for i in range(5):
+            y.publish(YEvent(name=f"event-{i}"))
+        y.send("X", Command(name="async-command"))
+
+        received = [q.get(block=True, timeout=2) for _ in range(6)]
+        # Handlers sleeping 0.3 s ran concurrently.
+        assert time.monotonic() - started < 1
+
+    assert CommandReply(reply_name="async-command") in received
+    assert sorted(e.name for e in received if isinstance(e, YEvent)) == [
+        f"event-{i}" for i in range(5)
+    ]
+    assert middleware_calls.count("exit") == 6
+
+
+def test_service_listener_concurrency_settings(
+    make_service: Callable, run_consumer: Callable, rmq_url: str
+) -> None:
+    q: queue.Queue = queue.Queue()
+    lock = threading.Lock()
+    running = 0
+    max_running = 0
+
+    x: Service = make_service("X")
+    y: Service = make_service("Y")
+    command_executor = ThreadPoolExecutor(1, thread_name_prefix="commands")
+
+    @x.on_event("Y", YEvent, prefetch_count=10, max_concurrency=2)
+    def handle_y_event(event: EventWithMessage[YEvent]) -> None:
+        nonlocal running, max_running
+        with lock:
+            running += 1
+            max_running = max(max_running, running)
+        time.sleep(0.1)
+        with lock:
+            running -= 1
+        q.put(event.event)
+
+    @x.on_command(Command, executor=command_executor)
+    def x_handle_command(command: CommandWithMessage[Command]) -> None:
+        q.put(threading.current_thread().name)
+
+    assert x.listeners[0].prefetch_count == 10
+    assert x.listeners[0].max_concurrency == 2
+
+    consumer = ThreadedConsumer(rmq_url, x.listeners)
+    with run_consumer(consumer):
+        for i in range(6):
+            y.publish(YEvent(name=f"event-{i}"))
+        y.send("X", Command(name="command"))
+
+        received = [q.get(block=True, timeout=2) for _ in range(7)]
+
+    assert max_running == 2
+    assert any(
+        isinstance(item, str) and item.startswith("commands") for item in received
+    )
+
+
+def test_service_event_batch(
+    make_service: Callable, run_consumer: Callable, rmq_url: str
+) -> None:
+    q: queue.Queue = queue.Queue()
+    failed = threading.Event()
+
+    x: Service = make_service("X")
+    y: Service = make_service("Y")
+
+    @x.on_event_batch("Y", YEvent, max_size=3, max_wait=0.2)
+    def handle_y_events(events: List[EventWithMessage[YEvent]]) -> None:
+        names = [event.event.name for event in events]
+        if "fail" in names and not failed.is_set():
+            failed.set()
+            raise RuntimeError("Batch failed")
+        q.put(names)
+
+    assert x.listeners[0].prefetch_count == 3
+
+    consumer = ThreadedConsumer(rmq_url, x.listeners)
+    with run_consumer(consumer):
+        for name in ["a", "b", "c", "d"]:
+            y.publish(YEvent(name=name))
+        assert q.get(block=True, timeout=2) == ["a", "b", "c"]
+        # Partial batch is handled after max_wait.
+        assert q.get(block=True, timeout=2) == ["d"]
+
+        y.publish(YEvent(name="fail"))
+        # Failed batch is requeued as a whole.
+        assert q.get(block=True, timeout=2) == ["fail"]
+
+
+def test_service_partitioned_handlers(
+    make_service: Callable, run_consumer: Callable, rmq_url: str
+) -> None:
+    q: queue.Queue = queue.Queue()
+
+    x: Service = make_service("X")
+    y: Service = make_service("Y")
+
+    @x.on_event(
+        "Y",
+        YEvent,
+        prefetch_count=20,
+        partition_by=lambda event: event.name.split("-")[0],
+        partitions=4,
+    )
+    def handle_y_event(event: EventWithMessage[YEvent]) -> None:
+        key, number = event.event.name.split("-")
+        # Later events of a key finish sooner unless handled in order.
+        time.sleep(0.05 / (int(number) + 1))
+        q.put((key, int(number)))
+
+    consumer = ThreadedConsumer(rmq_url, x.listeners)
+    with run_consumer(consumer):
+        for number in range(5):
+            for key in ["a", "b", "c"]:
+                y.publish(YEvent(name=f"{key}-{number}"))
+
+        received = [q.get(block=True, timeout=2) for _ in range(15)]
+
+    for key in ["a", "b", "c"]:
+        assert [number for k, number in received if k == key] == list(range(5))
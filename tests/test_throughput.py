@@ -8,9 +8,17 @@ from typing import Type
 
 import pytest
 
-from myrabbit import EventWithMessage
+from myrabbit import EventBus, EventWithMessage
+from myrabbit.core.consumer.adaptive_prefetch import AdaptivePrefetch
 from myrabbit.core.consumer.consumer import Consumer
 from myrabbit.core.consumer.consumer import ThreadedConsumer
+from myrabbit.core.consumer.listener import Exchange, Listener, Queue
+from myrabbit.core.consumer.topology import TopologyCache
+from myrabbit.core.publisher.pooled_publisher import PooledPublisherFactory
+from myrabbit.core.publisher.reconnecting_publisher import PublisherFactory
+from myrabbit.core.publisher.reconnecting_publisher import ReconnectingPublisherFactory
+from myrabbit.core.serializer import JsonSerializer
+from myrabbit.core.serializer.compression import available_codecs
 from myrabbit.service import Service
 
 
@@ -93,3 +101,311 @@ def test_events_throughput(
 
     assert sent > 0
     assert received > 0
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize(
+    "factory_class", [ReconnectingPublisherFactory, PooledPublisherFactory],
+)
+def test_publish_throughput(
+    factory_class: Type[PublisherFactory], rmq_url: str
+) -> None:
+    """
+    Compares publishing with a connection per message against pooled connections.
+
+    `pytest -s tests/test_throughput.py -m benchmark -k publish_throughput`
+    """
+    logging.getLogger("myrabbit").setLevel(logging.ERROR)
+
+    factory = factory_class(rmq_url)
+    event_bus = EventBus(factory)
+    # Publishing to a missing exchange would time channel reopening instead.
+    with factory.get_connection() as connection:
+        connection.channel().exchange_declare(
+            "Benchmark.events", exchange_type="topic", auto_delete=True
+        )
+    threads_count = 4
+    duration = 5
+    sent = [0] * threads_count
+
+    def publish_messages(idx: int) -> None:
+        deadline = time.monotonic() + duration
+        while time.monotonic() < deadline:
+            event_bus.publish("Benchmark", "EmptyEvent")
+            sent[idx] += 1
+
+    threads = [
+        threading.Thread(target=publish_messages, args=(i,))
+        for i in range(threads_count)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    print(
+        f"{factory_class.__name__}: {sum(sent) / duration:.0f} messages per second "
+        f"with {threads_count} threads"
+    )
+    assert sum(sent) > 0
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("encoding", sorted(available_codecs()))
+def test_compression_tradeoff(encoding: str) -> None:
+    """
+    Shows CPU time spent on compression against the bytes saved.
+
+    `pytest -s tests/test_throughput.py -m benchmark -k compression`
+    """
+    codec = available_codecs()[encoding]
+    _, body = JsonSerializer().serialize(
+        {
+            "items": [
+                {"id": i, "name": f"item-{i}", "tags": ["a", "b"], "price": i * 1.5}
+                for i in range(10000)
+            ]
+        }
+    )
+
+    rounds = 20
+    started = time.perf_counter()
+    for _ in range(rounds):
+        compressed = codec.compress(body)
+    compress_time = (time.perf_counter() - started) / rounds
+
+    started = time.perf_counter()
+    for _ in range(rounds):
+        assert codec.decompress(compressed) == body
+    decompress_time = (time.perf_counter() - started) / rounds
+
+    print(
+        f"{encoding}: {len(body)} -> {len(compressed)} bytes "
+        f"({len(compressed) / len(body):.1%}), "
+        f"compress {compress_time * 1000:.2f} ms, "
+        f"decompress {decompress_time * 1000:.2f} ms"
+    )
+    assert len(compressed) < len(body)
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize(
+    "consumer_class", [Consumer, ThreadedConsumer],
+)
+def test_slow_handlers_throughput(
+    consumer_class: Type[Consumer],
+    make_service: Callable,
+    run_consumer: Callable,
+    rmq_url: str,
+) -> None:
+    """
+    Handlers waiting on I/O run concurrently in ThreadedConsumer, up to prefetch.
+
+    `pytest -s tests/test_throughput.py -m benchmark -k slow_handlers`
+    """
+    logging.getLogger("myrabbit").setLevel(logging.ERROR)
+
+    messages = 200
+    handler_time = 0.01
+    done = threading.Event()
+    received = 0
+    lock = threading.Lock()
+
+    s: Service = make_service("SlowCounter")
+
+    @s.on_event(
+        "SlowCounter",
+        EmptyEvent,
+        exchange_params={"auto_delete": True, "durable": False},
+        queue_params={"auto_delete": True, "durable": False},
+    )
+    def handle(event: EventWithMessage) -> None:
+        nonlocal received
+        sleep(handler_time)
+        with lock:
+            received += 1
+            if received == messages:
+                done.set()
+
+    consumer = consumer_class(rmq_url, s.listeners, prefetch_count=20)
+    with run_consumer(consumer):
+        publisher: Service = make_service("SlowCounter")
+        started = time.monotonic()
+        for _ in range(messages):
+            publisher.publish(EmptyEvent())
+        assert done.wait(messages * handler_time * 2)
+        elapsed = time.monotonic() - started
+
+    print(
+        f"{consumer_class.__name__}: {messages} messages in {elapsed:.2f} s, "
+        f"{messages / elapsed:.0f} messages per second"
+    )
+    if consumer_class is ThreadedConsumer:
+        assert elapsed < messages * handler_time / 2
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("ack_batch_size", [1, 100])
+def test_coalesced_acks(
+    ack_batch_size: int,
+    make_service: Callable,
+    run_consumer: Callable,
+    rmq_url: str,
+) -> None:
+    """
+    Counts ack frames and I/O loop wakeups with and without ack coalescing.
+
+    `pytest -s tests/test_throughput.py -m benchmark -k coalesced_acks`
+    """
+    logging.getLogger("myrabbit").setLevel(logging.ERROR)
+
+    messages = 5000
+    done = threading.Event()
+    received = 0
+    lock = threading.Lock()
+
+    s: Service = make_service("AckCounter")
+
+    @s.on_event(
+        "AckCounter",
+        EmptyEvent,
+        exchange_params={"auto_delete": True, "durable": False},
+        queue_params={"auto_delete": True, "durable": False},
+    )
+    def handle(event: EventWithMessage) -> None:
+        nonlocal received
+        with lock:
+            received += 1
+            if received == messages:
+                done.set()
+
+    consumer = ThreadedConsumer(rmq_url, s.listeners, prefetch_count=200)
+    consumer.ack_batch_size = ack_batch_size
+    with run_consumer(consumer):
+        channel = next(iter(consumer._channels.values()))
+        s.event_bus.publish_batch(
+            "AckCounter", (("EmptyEvent", None, None) for _ in range(messages))
+        )
+        assert done.wait(30)
+        sleep(0.5)
+        stats = channel.acks.stats
+
+    print(
+        f"ack_batch_size={ack_batch_size}: {stats.acked} acks in {stats.frames} "
+        f"frames, {stats.wakeups} I/O loop wakeups"
+    )
+    assert stats.acked == messages
+
+
+@pytest.mark.benchmark
+def test_topology_startup(rmq_url: str) -> None:
+    """
+    Measures time until 200 listeners consume, with cold and warm
+    topology cache.
+
+    `pytest -s tests/test_throughput.py -m benchmark -k topology_startup`
+    """
+    logging.getLogger("myrabbit").setLevel(logging.ERROR)
+
+    listeners = [
+        Listener(
+            exchange=Exchange(
+                name="TopologyBenchmark.events",
+                type="topic",
+                durable=True,
+                auto_delete=False,
+            ),
+            queue=Queue(f"TopologyBenchmark.{i}", durable=True),
+            routing_key=f"event.{i}",
+            handle_message=lambda message: None,
+        )
+        for i in range(200)
+    ]
+    cache = TopologyCache()
+
+    for attempt in ("cold", "warm"):
+        consumer = Consumer(rmq_url, listeners, topology_cache=cache)
+        thread = threading.Thread(target=consumer.run)
+        start = time.monotonic()
+        thread.start()
+        consuming = 0
+        while consuming < len(listeners):
+            if time.monotonic() - start > 60:
+                consumer.stop()
+                thread.join()
+                pytest.fail(
+                    f"Only {consuming} of {len(listeners)} listeners "
+                    f"consume after 60 s ({attempt} cache)"
+                )
+            sleep(0.001)
+            consuming = sum(
+                1
+                for channel in list(consumer._channels.values())
+                if channel.consumer_tag
+            )
+        elapsed = time.monotonic() - start
+        consumer.stop()
+        thread.join()
+
+        print(
+            f"{attempt} cache: {len(listeners)} listeners consuming "
+            f"in {elapsed:.3f} s"
+        )
+
+
+@pytest.mark.benchmark
+def test_adaptive_prefetch(
+    make_service: Callable, run_consumer: Callable, rmq_url: str
+) -> None:
+    """
+    Compares fixed prefetch count of 1 with adaptive prefetch for fast handlers.
+
+    `pytest -s tests/test_throughput.py -m benchmark -k adaptive_prefetch`
+    """
+    logging.getLogger("myrabbit").setLevel(logging.ERROR)
+
+    messages = 3000
+    s: Service = make_service("AdaptivePrefetch")
+    done = threading.Event()
+    received = 0
+    lock = threading.Lock()
+
+    @s.on_event(
+        "AdaptivePrefetch",
+        EmptyEvent,
+        exchange_params={"auto_delete": True, "durable": False},
+        queue_params={"auto_delete": True, "durable": False},
+        max_concurrency=2,
+    )
+    def handle(event: EventWithMessage) -> None:
+        nonlocal received
+        time.sleep(0.001)
+        with lock:
+            received += 1
+            if received == messages:
+                done.set()
+
+    for adaptive_prefetch in (None, AdaptivePrefetch(interval=0.2)):
+        received = 0
+        done.clear()
+        consumer = ThreadedConsumer(
+            rmq_url, s.listeners, adaptive_prefetch=adaptive_prefetch
+        )
+        with run_consumer(consumer):
+            start = time.monotonic()
+            s.event_bus.publish_batch(
+                "AdaptivePrefetch",
+                (("EmptyEvent", None, None) for _ in range(messages)),
+            )
+            assert done.wait(60)
+            elapsed = time.monotonic() - start
+
+        print(
+            f"adaptive={adaptive_prefetch is not None}: "
+            f"{messages / elapsed:.0f} msg/s"
+        )
+        if adaptive_prefetch is not None:
+            for decision in adaptive_prefetch.decisions:
+                print(f"  prefetch {decision.old} -> {decision.new}")
+            assert adaptive_prefetch.decisions, "Prefetch count was never changed"
+            assert adaptive_prefetch.decisions[-1].new > 1